@@ -1,45 +1,98 @@
 import os
 import json
-import pandas as pd
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
-import google.generativeai as genai
+import hashlib
+import logging
+import threading
+import uuid
+from flask import Flask, Response, render_template, request, jsonify, session, redirect, stream_with_context
 from dotenv import load_dotenv
 from datetime import datetime
-import plotly
-import plotly.express as px
-import traceback  # For error tracking
 from database import (
     init_db, 
     add_expense as db_add_expense, 
-    get_budget_insights,
-    set_budget as db_set_budget,
+    bulk_add_expenses,
     get_all_expenses,
     delete_expense as db_delete_expense,
     get_expenses_summary,
+    get_dashboard_stats,
     get_budget_overview,
-    categorize_expense
+    get_notifications,
+    get_data_versions
 )
+from chat_store import create_chat_history_store
+from intent_router import IntentRouter
+from assets import StaticAssets
+from metrics import REGISTRY
+from request_metrics import RequestMetrics, start_log_queue
+from llm_client import LLMClient, ChatSessionCache, FakeModel, ResponseCache
 
 # Load environment variables
 load_dotenv()
 
-# Initialize database
+logger = logging.getLogger('aiwealth')
+
+# Initialize database (a no-op version check once the schema is current)
 init_db()
 
-# Configure Gemini API
-api_key = os.getenv("GEMINI_API_KEY")
+# Gemini is configured lazily on the first request that needs it, so
+# workers start without importing google.generativeai
+_llm = None
+_llm_loaded = False
+_llm_lock = threading.Lock()
 
-if api_key:
-    try:
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-2.0-flash')
-        print("Gemini API configured successfully")
-    except Exception as e:
-        print(f"Warning: Failed to configure Gemini API: {str(e)}")
-        model = None
-else:
-    model = None
-    print("Warning: GEMINI_API_KEY not found in .env file")
+def get_llm():
+    """Return the LLM client, importing and configuring the Gemini SDK on first use
+
+    Set LLM_BACKEND=fake to use a local fake model instead of Gemini.
+    """
+    global _llm, _llm_loaded
+    if _llm_loaded:
+        return _llm
+    
+    with _llm_lock:
+        if _llm_loaded:
+            return _llm
+        
+        api_key = os.getenv("GEMINI_API_KEY")
+        if os.getenv("LLM_BACKEND") == "fake":
+            _llm = LLMClient(FakeModel())
+            logger.info("Using local fake LLM backend")
+        elif api_key:
+            try:
+                import google.generativeai as genai
+                genai.configure(api_key=api_key)
+                _llm = LLMClient(genai.GenerativeModel('gemini-2.0-flash'))
+                logger.info("Gemini API configured successfully")
+            except Exception as e:
+                logger.warning(f"Failed to configure Gemini API: {str(e)}")
+                _llm = None
+        else:
+            logger.warning("GEMINI_API_KEY not found in .env file")
+        
+        _llm_loaded = True
+        return _llm
+
+_chat_sessions = None
+
+def get_chat_sessions():
+    """Return the per-user chat session cache, or None when no LLM is configured"""
+    global _chat_sessions
+    llm = get_llm()
+    if llm and _chat_sessions is None:
+        with _llm_lock:
+            if _chat_sessions is None:
+                _chat_sessions = ChatSessionCache(llm, SYSTEM_PROMPT)
+    return _chat_sessions
+
+# Analyses are reused until the expense summary (and so the prompt) changes
+analysis_cache = ResponseCache(
+    'analyze_expenses',
+    ttl=int(os.getenv('ANALYSIS_CACHE_TTL', str(24 * 3600))),
+    max_entries=int(os.getenv('ANALYSIS_CACHE_SIZE', '200'))
+)
+
+LIMITED_MODE_RESPONSE = "I'm currently running in limited mode. Please configure a Gemini API key to enable all features."
+CHAT_ERROR_RESPONSE = "I'm sorry, I encountered an error processing your request."
 
 # Initialize system prompt with financial advisor context
 SYSTEM_PROMPT = """
@@ -68,220 +121,219 @@ If asked about specific investments or complex tax situations, kindly explain th
 app = Flask(__name__)
 app.secret_key = os.getenv("SECRET_KEY", "aiwealth-secret-key")
 
-# Store chat histories in memory
-chat_histories = {}
+# Fingerprinted static URLs and gzip/Brotli response compression
+assets = StaticAssets(app)
 
-def parse_expense_message(message):
-    """Extract expense details from chat messages like 'Add $45 for groceries'"""
-    message = message.lower().strip()
-    
-    print(f"Attempting to parse expense from: '{message}'")
-    
-    # Look for expense patterns
-    expense_triggers = ["add", "spent", "paid", "bought", "purchased"]
-    has_trigger = any(trigger in message for trigger in expense_triggers)
-    has_amount = "$" in message
-    has_description = any(connector in message for connector in ["for", "on", "at"])
-    
-    if has_trigger and has_amount and has_description:
-        try:
-            # Extract amount using dollar sign as reference
-            parts = message.split("$")
-            amount_part = parts[1].split()[0].replace(',', '')
-            # Handle decimal points
-            amount = float(amount_part)
-            
-            # Extract description - everything after "for" or "on"
-            if "for" in message:
-                description_part = message.split("for")[1].strip()
-            elif "on" in message:
-                description_part = message.split("on")[1].strip()
-            elif "at" in message:
-                description_part = message.split("at")[1].strip()
-            else:
-                description_part = message.split("$")[1].split(None, 1)[1].strip() if len(message.split("$")[1].split()) > 1 else "misc expense"
-            
-            # Use the database categorization function
-            category = categorize_expense(description_part)
-            
-            print(f"Successfully parsed expense: ${amount} for {description_part} (Category: {category})")
-            
-            return {
-                "amount": amount,
-                "description": description_part,
-                "category": category
-            }
-        except Exception as e:
-            print(f"Error parsing expense message: {str(e)}")
-            return None
-    
-    print("Message does not match expense pattern")
-    return None
+# Per-route latency, status and DB/LLM time, exported at /metrics; log
+# records are written by a background thread instead of the request thread
+request_metrics = RequestMetrics(app)
+start_log_queue()
+
+# Per-user chat histories (in-memory LRU or SQLite, see CHAT_HISTORY_BACKEND)
+chat_store = create_chat_history_store()
+
+# Regex grammars for commands that can be answered without the LLM
+intent_router = IntentRouter()
+
+def current_user_id():
+    """The session's user; all expense, budget and notification data is scoped to it
+
+    Visitors without one get a random id on their first request, whichever
+    route that is, so no two sessions share data.
+    """
+    if 'user_id' not in session:
+        session['user_id'] = f"user_{uuid.uuid4().hex}"
+    return session['user_id']
 
 @app.route('/')
 def index():
     # Generate a session ID if none exists
-    if 'user_id' not in session:
-        session['user_id'] = f"user_{datetime.now().strftime('%Y%m%d%H%M%S')}"
-    
-    # Initialize chat history for this user if needed
-    user_id = session['user_id']
-    if user_id not in chat_histories:
-        chat_histories[user_id] = []
+    current_user_id()
     
     return render_template('index.html')
 
 @app.route('/chat', methods=['POST'])
 def chat():
     user_message = request.json.get('message', '')
-    user_id = session.get('user_id', 'default_user')
+    user_id = current_user_id()
     
     if not user_message:
         return jsonify({"response": "No message provided"})
     
     try:
-        # Check if message is about adding an expense
-        expense_info = parse_expense_message(user_message)
-        if expense_info:
-            # Add expense to the database
-            expense_id = db_add_expense(
-                expense_info['amount'],
-                expense_info['description'],
-                expense_info['category']
-            )
-            
-            # Send response about added expense
-            category_name = expense_info['category'].capitalize()
-            response_text = f"I've added your expense of ${expense_info['amount']:.2f} for {expense_info['description']} in the {category_name} category. You can view your spending breakdown in the dashboard."
-            
-            # Store response in chat history
-            if user_id not in chat_histories:
-                chat_histories[user_id] = []
-            
-            chat_histories[user_id].append({"role": "user", "parts": [user_message]})
-            chat_histories[user_id].append({"role": "model", "parts": [response_text]})
-            
-            return jsonify({"response": response_text})
-        
-        # Parse budget setting commands
-        if ("set budget" in user_message.lower() or "set a budget" in user_message.lower()) and "for" in user_message.lower() and "to" in user_message.lower():
-            message = user_message.lower()
-            # Extract category and amount
-            split_for = message.split("for")[1]
-            category_part = split_for.split("to")[0].strip()
-            amount_part = split_for.split("to")[1].strip()
-            
-            # Remove dollar sign if present
-            if "$" in amount_part:
-                amount_part = amount_part.replace("$", "")
-            
-            try:
-                amount = float(amount_part.replace(',', ''))
-                
-                # Store budget in database
-                db_set_budget(category_part, amount)
-                
-                response_text = f"I've set your budget for {category_part} to ${amount:.2f}."
-                
-                # Store response in chat history
-                if user_id not in chat_histories:
-                    chat_histories[user_id] = []
-                
-                chat_histories[user_id].append({"role": "user", "parts": [user_message]})
-                chat_histories[user_id].append({"role": "model", "parts": [response_text]})
-                
-                return jsonify({"response": response_text})
-            except ValueError:
-                pass
+        # Expense and budget commands are answered without the LLM
+        command_response = handle_chat_command(user_id, user_message)
+        if command_response:
+            return jsonify({"response": command_response})
         
         # Regular chat processing for non-expense messages
-        if user_id not in chat_histories:
-            chat_histories[user_id] = []
-        
-        # Add the user message to chat history
-        chat_histories[user_id].append({"role": "user", "parts": [user_message]})
+        bot_response = ''.join(stream_llm_reply(user_id, user_message))
         
-        # If the Gemini API is configured
-        if model:
-            # If this is the first message, include the system prompt
-            if len(chat_histories[user_id]) == 1:
-                response = model.generate_content([SYSTEM_PROMPT, user_message])
-            else:
-                # Create conversation context from chat history
-                convo = model.start_chat(history=chat_histories[user_id][:-1])
-                response = convo.send_message(user_message)
+        return jsonify({"response": bot_response})
+    
+    except Exception:
+        logger.exception("Error in chat route")
+        return jsonify({"response": CHAT_ERROR_RESPONSE})
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    user_message = request.json.get('message', '')
+    user_id = current_user_id()
+    
+    if not user_message:
+        return jsonify({"response": "No message provided"})
+    
+    def events():
+        try:
+            command_response = handle_chat_command(user_id, user_message)
+            if command_response:
+                yield sse_event({"delta": command_response})
+                yield sse_event({"response": command_response}, event='done')
+                return
             
-            # Add the AI response to chat history
-            bot_response = response.text
-        else:
+            # Forward chunks to the browser as soon as the model produces them
+            parts = []
+            for chunk in stream_llm_reply(user_id, user_message):
+                parts.append(chunk)
+                yield sse_event({"delta": chunk})
+            yield sse_event({"response": ''.join(parts)}, event='done')
+        except Exception:
+            logger.exception("Error in chat stream")
+            yield sse_event({"response": CHAT_ERROR_RESPONSE}, event='error')
+    
+    return Response(
+        stream_with_context(events()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def sse_event(data, event=None):
+    """Format one Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+def handle_chat_command(user_id, user_message):
+    """Answer finance commands locally via the intent router, returning None for anything else"""
+    routed = intent_router.dispatch(user_message, user_id)
+    if routed is None:
+        return None
+    
+    intent, response_text = routed
+    
+    # Store response in chat history
+    chat_store.append(user_id, "user", user_message)
+    chat_store.append(user_id, "model", response_text)
+    invalidate_chat_session(user_id)
+    
+    return response_text
+
+def invalidate_chat_session(user_id):
+    """Make the next LLM turn rebuild its session from the stored history"""
+    if _chat_sessions:
+        _chat_sessions.invalidate(user_id)
+
+def stream_llm_reply(user_id, user_message):
+    """Yield the model's reply in chunks and record the exchange in chat history"""
+    parts = []
+    try:
+        sessions = get_chat_sessions()
+        if not sessions:
             # If Gemini API is not configured, use a fallback response
-            bot_response = "I'm currently running in limited mode. Please configure a Gemini API key to enable all features."
-        
-        chat_histories[user_id].append({"role": "model", "parts": [bot_response]})
+            chunks = [LIMITED_MODE_RESPONSE]
+        else:
+            # Reuse the user's live chat session; history is only read to rebuild it
+            chunks = sessions.stream_reply(user_id, lambda: chat_store.get(user_id), user_message)
         
-        return jsonify({"response": bot_response})
-    
-    except Exception as e:
-        print(f"Error in chat route: {str(e)}")
-        traceback.print_exc()
-        return jsonify({"response": f"I'm sorry, I encountered an error processing your request."})
+        for chunk in chunks:
+            parts.append(chunk)
+            yield chunk
+    finally:
+        # Store both turns together so history stays paired even if the reply failed
+        chat_store.append(user_id, "user", user_message)
+        chat_store.append(user_id, "model", ''.join(parts) or CHAT_ERROR_RESPONSE)
 
 @app.route('/dashboard')
 def dashboard():
-    user_id = session.get('user_id', 'default_user')
+    # The page is a static shell; its data comes from the /api/* endpoints
+    return render_template('dashboard.html')
+
+def conditional_json(scopes, build):
+    """Serve ``build()`` as JSON with an ETag, or a bodiless 304 if the client's copy is current
+
+    The ETag combines the user's data_versions counters for ``scopes`` with
+    the request's query string and today's date (periods and trends are
+    relative to today), so the data is only queried when it changed.
+    """
+    user_id = current_user_id()
+    versions = get_data_versions(user_id)
+    fingerprint = '|'.join([user_id, request.full_path, datetime.now().strftime('%Y-%m-%d')] +
+                           [f"{scope}={versions.get(scope, 0)}" for scope in scopes])
+    etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:20]
     
+    # Weak comparison, since compression marks the ETags it sends as weak
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Clients may keep the body but must revalidate it on every use
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route('/api/expenses')
+def api_expenses():
+    args = request.args
     try:
-        # Get expenses from database
-        expenses = get_all_expenses()
-        
-        if not expenses:
-            print("No expense data found in database")
-            return render_template('dashboard.html', has_data=False)
-        
-        # Process expense data for the dashboard
-        df = pd.DataFrame(expenses)
-        
-        # Create category summary
-        category_summary = df.groupby('category')['amount'].sum().reset_index()
-        
-        # Prepare data for Chart.js
-        categories = category_summary['category'].tolist()
-        amounts = category_summary['amount'].tolist()
-        
-        # Get total expenses and top categories
-        total_expenses = df['amount'].sum()
-        top_categories = category_summary.sort_values('amount', ascending=False).head(3)
-        
-        # Get budget information
-        budget_overview = get_budget_overview()
-                
-        # Calculate monthly average (if dates are available)
-        monthly_avg = total_expenses
-        if 'date' in df.columns:
-            df['date'] = pd.to_datetime(df['date'])
-            # Get date range in days, convert to months
-            date_range = (df['date'].max() - df['date'].min()).days
-            months = max(1, date_range / 30)
-            monthly_avg = total_expenses / months
-        
-        # Prepare data for the template
-        return render_template(
-            'dashboard.html',
-            has_data=True,
-            categories=categories,
-            amounts=amounts,
-            total_expenses=total_expenses,
-            top_categories=top_categories.to_dict('records'),
-            monthly_avg=monthly_avg,
-            expenses=expenses,
-            budget_overview=budget_overview
+        # Out-of-range paging values are clamped rather than rejected
+        limit = max(1, min(args.get('limit', 100, type=int), 500))
+        offset = max(0, args.get('offset', 0, type=int))
+        return conditional_json(['expenses'], lambda: get_all_expenses(
+            limit=limit,
+            offset=offset,
+            category=args.get('category') or None,
+            date_from=args.get('date_from') or None,
+            date_to=args.get('date_to') or None,
+            cursor=args.get('cursor') or None,
+            include_total=args.get('include_total', 'true') != 'false',
+            user_id=current_user_id()
+        ))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/summary')
+def api_summary():
+    args = request.args
+    user_id = current_user_id()
+    try:
+        def build():
+            summary = get_expenses_summary(
+                period=args.get('period') or None,
+                date_from=args.get('date_from') or None,
+                date_to=args.get('date_to') or None,
+                user_id=user_id
+            )
+            summary['stats'] = get_dashboard_stats(user_id=user_id)
+            return summary
+        return conditional_json(['expenses'], build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route('/api/budgets')
+def api_budgets():
+    user_id = current_user_id()
+    return conditional_json(['budgets'], lambda: get_budget_overview(user_id=user_id))
+
+@app.route('/api/notifications')
+def api_notifications():
+    args = request.args
+    return conditional_json(['notifications'], lambda: {
+        "notifications": get_notifications(
+            limit=min(args.get('limit', 5, type=int), 100),
+            include_read=args.get('include_read') == 'true',
+            user_id=current_user_id()
         )
-    except Exception as e:
-        print(f"Error in dashboard route: {str(e)}")
-        traceback.print_exc()
-        return render_template('dashboard.html', has_data=False, 
-                              error=f"Error generating dashboard: {str(e)}")
-    
+    })
+
 @app.route('/add_expense', methods=['POST'])
 def add_expense():
     try:
@@ -291,31 +343,56 @@ def add_expense():
         description = request.form.get('description', '')
         
         # Add expense to database
-        db_add_expense(amount, description, category)
+        db_add_expense(amount, description, category, user_id=current_user_id())
         
         return redirect('/dashboard')
     except ValueError:
         return "Invalid amount value", 400
     except Exception as e:
-        print(f"Error adding expense: {str(e)}")
-        traceback.print_exc()
+        logger.exception("Error adding expense")
         return f"Error adding expense: {str(e)}", 500
 
 @app.route('/delete_expense/<int:expense_id>', methods=['POST'])
 def delete_expense(expense_id):
     try:
         # Delete expense from database
-        db_delete_expense(expense_id)
+        db_delete_expense(expense_id, user_id=current_user_id())
         return redirect('/dashboard')
     except Exception as e:
-        print(f"Error deleting expense: {str(e)}")
+        logger.exception("Error deleting expense")
         return f"Error deleting expense: {str(e)}", 500
 
+@app.route('/import', methods=['POST'])
+def import_expenses():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"error": "No file uploaded"}), 400
+    
+    # Parsers are imported on first upload to keep them out of worker startup
+    from importers import iter_csv_expenses, iter_ofx_expenses
+    
+    # Pick a parser from the explicit format field or the file extension
+    file_format = (request.form.get('format') or upload.filename.rsplit('.', 1)[-1]).lower()
+    if file_format in ('ofx', 'qfx'):
+        rows = iter_ofx_expenses(upload.stream)
+    elif file_format == 'csv':
+        rows = iter_csv_expenses(upload.stream)
+    else:
+        return jsonify({"error": f"Unsupported import format: {file_format}"}), 400
+    
+    try:
+        # Rows are parsed and inserted as the upload is read
+        result = bulk_add_expenses(rows, user_id=current_user_id())
+        return jsonify(result)
+    except Exception as e:
+        logger.exception("Error importing expenses")
+        return jsonify({"error": f"Error importing expenses: {str(e)}"}), 500
+
 @app.route('/analyze_expenses', methods=['POST'])
 def analyze_expenses():
     try:
         # Get expense summary from database
-        expense_summary_data = get_expenses_summary()
+        expense_summary_data = get_expenses_summary(user_id=current_user_id())
         
         if not expense_summary_data or expense_summary_data['total_expenses'] == 0:
             return jsonify({"response": "No expense data available to analyze"})
@@ -336,22 +413,26 @@ def analyze_expenses():
         expense_summary += "\nCan you analyze my spending and provide recommendations?"
         
         # Send this data to the AI for analysis
-        if model:
-            response = model.generate_content([
+        llm = get_llm()
+        if llm:
+            ai_response = analysis_cache.get_or_generate([
                 "You are a financial advisor analyzing expense data. Provide specific insights and recommendations.",
                 expense_summary
-            ])
-            ai_response = response.text
+            ], llm.generate)
         else:
             ai_response = "AI analysis is currently unavailable. Please configure a Gemini API key to enable this feature."
         
         return jsonify({"response": ai_response})
     
-    except Exception as e:
-        print(f"Error analyzing expenses: {str(e)}")
-        traceback.print_exc()
+    except Exception:
+        logger.exception("Error analyzing expenses")
         return jsonify({"response": "I'm sorry, I encountered an error while analyzing your expenses."})
 
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for request, query and pool metrics"""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     init_db()
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,133 @@
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import request
+
+try:
+    import brotli  # optional: enables Content-Encoding: br
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as-is; compressing them saves too little
+COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', '1024'))
+
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', '6'))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', '5'))
+
+COMPRESSIBLE_MIMETYPES = {
+    'text/html', 'text/css', 'text/plain', 'text/javascript',
+    'application/javascript', 'application/json', 'image/svg+xml',
+}
+
+# Fingerprinted static URLs never change content, so browsers may keep them for a year
+STATIC_MAX_AGE = 365 * 24 * 3600
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+class StaticAssets:
+    """Fingerprinted static URLs, long-lived caching and response compression
+
+    ``url_for('static', filename=...)`` gains a ``v=<content hash>`` query
+    argument, so a changed file gets a new URL and unchanged ones can be
+    cached as immutable. Every compressible response at least
+    ``min_size`` bytes long is gzip- or Brotli-encoded according to the
+    client's Accept-Encoding; compressed static files are kept in memory.
+    Streamed responses such as the chat SSE stream are left alone.
+    """
+
+    def __init__(self, app=None, min_size=COMPRESSION_MIN_SIZE):
+        self.min_size = min_size
+        self.encodings = ['br', 'gzip'] if brotli else ['gzip']
+        self._lock = threading.Lock()
+        self._fingerprints = {}  # filename -> (mtime, digest)
+        self._compressed = {}  # (filename, digest, encoding) -> bytes
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        app.url_defaults(self._add_fingerprint)
+        app.after_request(self._finalize_response)
+
+    def fingerprint(self, filename):
+        """Return a short content hash of a static file, or None if it does not exist"""
+        path = os.path.join(self.app.static_folder, filename)
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return None
+
+        with self._lock:
+            cached = self._fingerprints.get(filename)
+        if cached and cached[0] == mtime:
+            return cached[1]
+
+        with open(path, 'rb') as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:12]
+        with self._lock:
+            self._fingerprints[filename] = (mtime, digest)
+        return digest
+
+    def _add_fingerprint(self, endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            digest = self.fingerprint(values['filename'])
+            if digest:
+                values['v'] = digest
+
+    def _finalize_response(self, response):
+        if request.endpoint == 'static':
+            filename = (request.view_args or {}).get('filename')
+            digest = self.fingerprint(filename) if filename else None
+            if digest and request.args.get('v') == digest:
+                response.headers['Cache-Control'] = f'public, max-age={STATIC_MAX_AGE}, immutable'
+            else:
+                response.headers['Cache-Control'] = 'no-cache'
+            if response.status_code == 200 and digest:
+                # Static files are served as file streams; read them so they can be encoded
+                response.direct_passthrough = False
+                self.compress_response(response, cache_key=(filename, digest))
+            return response
+
+        if not response.is_streamed:
+            self.compress_response(response)
+        return response
+
+    def compress_response(self, response, cache_key=None):
+        """Encode ``response`` in place if the client accepts it and it is worth it"""
+        if (response.status_code != 200
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES
+                or 'Content-Encoding' in response.headers):
+            return response
+
+        response.vary.add('Accept-Encoding')
+        encoding = request.accept_encodings.best_match(self.encodings)
+        if not encoding:
+            return response
+
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        key = cache_key + (encoding,) if cache_key else None
+        with self._lock:
+            body = self._compressed.get(key) if key else None
+        if body is None:
+            body = compress(data, encoding)
+            if key:
+                with self._lock:
+                    self._compressed[key] = body
+        if len(body) >= len(data):
+            return response
+
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+        # The encoded body is a different representation of the same data
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
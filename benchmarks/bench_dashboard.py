@@ -0,0 +1,92 @@
+"""Compare the old pandas dashboard aggregation with get_dashboard_stats
+
+Usage: python benchmarks/bench_dashboard.py [rows]
+
+Each mode runs in its own subprocess so the reported peak RSS includes
+import cost (pandas) and per-request allocations, not the other mode's.
+The pandas mode is skipped when pandas is not installed.
+"""
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import database  # noqa: E402
+
+REQUESTS = 20
+
+def populate(rows):
+    categories = list(database.CATEGORY_KEYWORDS) + ['other']
+    now = datetime.now()
+    database.bulk_add_expenses(
+        {
+            'amount': round(random.uniform(1, 200), 2),
+            'description': 'bench',
+            'category': random.choice(categories),
+            'date': (now - timedelta(seconds=random.randint(0, 365 * 86400))).strftime('%Y-%m-%d %H:%M:%S')
+        }
+        for _ in range(rows)
+    )
+
+def pandas_request(rows):
+    """What the dashboard route did before: load every expense into a DataFrame"""
+    import pandas as pd
+    expenses = database.get_all_expenses(limit=rows, include_total=False)['expenses']
+    df = pd.DataFrame(expenses)
+    category_summary = df.groupby('category')['amount'].sum().reset_index()
+    category_summary['category'].tolist()
+    category_summary['amount'].tolist()
+    total_expenses = df['amount'].sum()
+    category_summary.sort_values('amount', ascending=False).head(3).to_dict('records')
+    df['date'] = pd.to_datetime(df['date'])
+    date_range = (df['date'].max() - df['date'].min()).days
+    return total_expenses / max(1, date_range / 30)
+
+def sql_request(rows):
+    return database.get_dashboard_stats()['monthly_avg']
+
+def run_mode(mode, rows):
+    handler = pandas_request if mode == 'pandas' else sql_request
+    start = time.perf_counter()
+    handler(rows)
+    first = time.perf_counter() - start
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        handler(rows)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{mode:<7} first {first * 1000:8.1f} ms  median {timings[len(timings) // 2] * 1000:8.2f} ms  peak RSS {rss_mb:7.1f} MB")
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == '--mode':
+        database.DB_PATH = os.environ['BENCH_DB']
+        run_mode(sys.argv[2], int(os.environ['BENCH_ROWS']))
+        return
+
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+        print(f"Populating {rows:,} expenses...")
+        populate(rows)
+        database.get_pool().close_all()
+
+        env = dict(os.environ, BENCH_DB=database.DB_PATH, BENCH_ROWS=str(rows))
+        for mode in ('pandas', 'sql'):
+            if mode == 'pandas':
+                try:
+                    import pandas  # noqa: F401
+                except ImportError:
+                    print("pandas  skipped (not installed)")
+                    continue
+            subprocess.run([sys.executable, __file__, '--mode', mode], env=env, check=True)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""Cost of materializing large expense pages, TEXT dates versus epoch integers
+
+Usage: python benchmarks/bench_expense_rows.py [rows]
+
+Builds a throwaway database with ``rows`` expenses (100,000 by default) and
+times one page holding all of them three ways: the SQLite fetch alone, the
+legacy row loop (dates read back as TEXT, then strptime/strftime per row)
+and get_all_expenses with the cached day formatter. A date range filter on
+the integer column is timed against the same range compared as TEXT.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import database  # noqa: E402
+
+def populate(path, rows):
+    categories = list(database.CATEGORY_IDS.values())
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    batch = []
+    for _ in range(rows):
+        date = now - timedelta(seconds=random.randint(0, 365 * 86400))
+        batch.append((random.randint(100, 20000), 'bench', random.choice(categories),
+                      database.to_epoch(date)))
+        if len(batch) == 50000:
+            conn.executemany('INSERT INTO expenses (amount, description, category_id, date) VALUES (?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany('INSERT INTO expenses (amount, description, category_id, date) VALUES (?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+def fetch_only(rows):
+    with database.db_connection() as conn:
+        conn.execute('''
+            SELECT id, amount, description, category_id, date FROM expenses
+            WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT ?
+        ''', (database.DEFAULT_USER_ID, rows)).fetchall()
+
+def legacy_page(rows):
+    """What get_all_expenses did while dates were 'YYYY-MM-DD HH:MM:SS' strings"""
+    with database.db_connection() as conn:
+        result = conn.execute('''
+            SELECT id, amount, description, category_id, datetime(date, 'unixepoch') AS date FROM expenses
+            WHERE user_id = ? ORDER BY date DESC, id DESC LIMIT ?
+        ''', (database.DEFAULT_USER_ID, rows)).fetchall()
+    return [{
+        'id': row['id'],
+        'amount': float(row['amount']),
+        'description': row['description'],
+        'category': row['category_id'],
+        'date': row['date'],
+        'formatted_date': datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y')
+    } for row in result]
+
+def epoch_page(rows):
+    return database.get_all_expenses(limit=rows, include_total=False)
+
+def range_count(as_text):
+    start = datetime.now() - timedelta(days=90)
+    column, bound = ("datetime(date, 'unixepoch')", start.strftime('%Y-%m-%d %H:%M:%S')) if as_text \
+        else ('date', database.to_epoch(start))
+    with database.db_connection() as conn:
+        conn.execute(f'SELECT COUNT(*), SUM(amount) FROM expenses WHERE user_id = ? AND {column} >= ?',
+                     (database.DEFAULT_USER_ID, bound)).fetchone()
+
+def timed(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.DB_QUERY_PROFILING = False
+        database.init_db()
+        print(f"Populating {rows:,} expenses...")
+        populate(database.DB_PATH, rows)
+
+        print(f"{'step':<24} {'ms':>10} {'us/row':>8}")
+        for name, func, args in (
+            ('sqlite fetch', fetch_only, (rows,)),
+            ('legacy TEXT page', legacy_page, (rows,)),
+            ('epoch page', epoch_page, (rows,)),
+            ('90-day range, TEXT', range_count, (True,)),
+            ('90-day range, INTEGER', range_count, (False,)),
+        ):
+            elapsed = timed(func, *args)
+            print(f"{name:<24} {elapsed:>10.1f} {elapsed * 1000 / rows:>8.2f}")
+        database.get_pool().close_all()
+
+if __name__ == '__main__':
+    main()
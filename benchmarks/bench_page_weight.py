@@ -0,0 +1,84 @@
+"""Page weight of the chat and dashboard pages, first and repeat visits
+
+Usage: python benchmarks/bench_page_weight.py [expenses]
+
+Loads each page through Flask's test client against a throwaway database
+with ``expenses`` rows (500 by default), follows its local stylesheets and
+scripts plus the API calls the dashboard makes, and reports bytes on the
+wire with and without gzip. A repeat visit revalidates the API calls with
+their ETags and skips fingerprinted assets, which are cached as immutable.
+Exits non-zero if a page still loads scripts or styles from a CDN.
+"""
+import os
+import random
+import re
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault('LLM_BACKEND', 'fake')
+import database  # noqa: E402
+
+PAGES = {
+    '/': [],
+    '/dashboard': ['/api/summary', '/api/expenses?limit=100&include_total=false',
+                   '/api/budgets', '/api/notifications'],
+}
+
+ASSET_PATTERN = re.compile(r'<(?:script|link)\b[^>]*?(?:src|href)="([^"]+)"')
+
+def populate(rows):
+    categories = list(database.CATEGORY_KEYWORDS) + ['other']
+    database.bulk_add_expenses(
+        {'amount': round(random.uniform(1, 200), 2), 'description': f'bench expense {i}',
+         'category': random.choice(categories)}
+        for i in range(rows)
+    )
+
+def fetch(client, url, encoding, etag=None):
+    headers = {'Accept-Encoding': encoding}
+    if etag:
+        headers['If-None-Match'] = etag
+    response = client.get(url, headers=headers)
+    return response, len(response.data)
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    database.DB_PATH = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    import app  # noqa: E402  (imported after DB_PATH so init_db uses the throwaway file)
+    populate(rows)
+    client = app.app.test_client()
+
+    failures = []
+    print(f"{'page':<12} {'identity':>10} {'gzip':>10} {'repeat':>10}  requests")
+    for page, api_calls in PAGES.items():
+        html = client.get(page).get_data(as_text=True)
+        assets = ASSET_PATTERN.findall(html)
+        external = [url for url in assets if url.startswith(('http:', 'https:', '//'))]
+        if external:
+            failures.append(f"{page} loads external assets: {', '.join(external)}")
+        local = [url for url in assets if url.startswith('/static/')]
+
+        totals = {'identity': 0, 'gzip': 0, 'repeat': 0}
+        for url in [page] + local + api_calls:
+            for encoding in ('identity', 'gzip'):
+                response, size = fetch(client, url, encoding)
+                totals[encoding] += size
+
+            # Repeat visit: immutable assets come from the browser cache,
+            # everything else is revalidated with its ETag
+            if url in local and 'immutable' in response.headers.get('Cache-Control', ''):
+                continue
+            _, size = fetch(client, url, 'gzip', response.headers.get('ETag'))
+            totals['repeat'] += size
+
+        print(f"{page:<12} {totals['identity']:>10,} {totals['gzip']:>10,} {totals['repeat']:>10,}  "
+              f"{1 + len(local) + len(api_calls)}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
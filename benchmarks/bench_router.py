@@ -0,0 +1,96 @@
+"""Measure the chat intent router on a labelled corpus of user messages
+
+Usage: python benchmarks/bench_router.py [iterations]
+
+Reports how many messages per second ``IntentRouter.match`` parses, which
+share of the corpus is answered locally instead of by the LLM, and any
+message whose routed intent differs from its label. Exits non-zero on a
+misroute so the corpus doubles as a regression check for the grammars.
+"""
+import os
+import sys
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from intent_router import IntentRouter  # noqa: E402
+
+# (message, expected intent or None for messages that must reach the LLM)
+CORPUS = [
+    ("Add $45 for groceries", 'add_expense'),
+    ("add 12.50 for lunch", 'add_expense'),
+    ("I spent $1,200 on rent.", 'add_expense'),
+    ("I just paid $60 for the electricity bill", 'add_expense'),
+    ("spent 30 dollars at the cinema", 'add_expense'),
+    ("Please log $8 for coffee", 'add_expense'),
+    ("bought new shoes for $89.99", 'add_expense'),
+    ("I purchased a train ticket for $23", 'add_expense'),
+    ("Set budget for food to $400", 'set_budget'),
+    ("set a budget for entertainment to 150", 'set_budget'),
+    ("Set my transportation budget to $250", 'set_budget'),
+    ("change the shopping budget to $300", 'set_budget'),
+    ("What's my budget?", 'show_budget'),
+    ("show me my budgets", 'show_budget'),
+    ("What is my food budget", 'show_budget'),
+    ("how much is left in my entertainment budget?", 'show_budget'),
+    ("show budget for utilities", 'show_budget'),
+    ("Show my expenses", 'list_expenses'),
+    ("list my last 10 expenses", 'list_expenses'),
+    ("show me recent expenses for food", 'list_expenses'),
+    ("what are my latest expenses?", 'list_expenses'),
+    ("Create a savings goal called vacation of $3000 by 2027-06-01", 'add_savings_goal'),
+    ("add a savings goal for new laptop of $1,500", 'add_savings_goal'),
+    ("I want to save $5000 for a car by 2028-01-01", 'add_savings_goal'),
+    ("Add $200 to my vacation goal", 'update_savings_goal'),
+    ("put $50 into the emergency fund", 'update_savings_goal'),
+    ("update my vacation goal to $900", 'update_savings_goal'),
+    ("Show my notifications", 'read_notifications'),
+    ("any new alerts?", 'read_notifications'),
+    ("check unread notifications", 'read_notifications'),
+    ("How can I save more money each month?", None),
+    ("What is a good budget for a family of four?", None),
+    ("Should I pay off my credit card or invest?", None),
+    ("Explain the 50/30/20 rule", None),
+    ("I spent too much on food last month, any tips?", None),
+    ("What's the difference between a Roth IRA and a 401k?", None),
+    ("Can you help me plan for retirement?", None),
+    ("how do I set a budget for the first time?", None),
+    ("is it smart to add more to my emergency fund?", None),
+    ("hello!", None),
+]
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    router = IntentRouter()
+
+    misrouted = []
+    intents = Counter()
+    for message, expected in CORPUS:
+        matched = router.match(message)
+        intent = matched[0] if matched else None
+        intents[intent or 'llm'] += 1
+        if intent != expected:
+            misrouted.append((message, expected, intent))
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for message, _ in CORPUS:
+            router.match(message)
+    elapsed = time.perf_counter() - start
+    total = iterations * len(CORPUS)
+
+    local = len(CORPUS) - intents['llm']
+    print(f"Corpus: {len(CORPUS)} messages, {local} answered locally "
+          f"({local / len(CORPUS):.0%} kept off the LLM)")
+    for intent, count in sorted(intents.items()):
+        print(f"  {intent:<20} {count}")
+    print(f"Throughput: {total / elapsed:,.0f} messages/s "
+          f"({elapsed / total * 1e6:.1f} us per message)")
+
+    for message, expected, intent in misrouted:
+        print(f"MISROUTED: {message!r} expected {expected} got {intent}")
+    if misrouted:
+        raise SystemExit(1)
+
+if __name__ == '__main__':
+    main()
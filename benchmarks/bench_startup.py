@@ -0,0 +1,82 @@
+"""Import-time profile and cold-start budget check for app.py
+
+Usage: python benchmarks/bench_startup.py [module] [budget_ms]
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+against a throwaway database, twice: a cold start that has to create the
+schema and a warm start against the then-current file. Prints the slowest
+top-level imports of the warm start and exits non-zero when its total
+exceeds the budget or when a module that should be lazy was imported at
+startup, so it can gate CI and serverless deployments.
+"""
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.join(os.path.dirname(__file__), '..')
+
+# Modules that must only be imported on first use
+LAZY_MODULES = ('pandas', 'plotly', 'google.generativeai')
+
+DEFAULT_BUDGET_MS = 800
+
+def profile_imports(module, db_path):
+    """Return [(cumulative_us, module_name, depth)] parsed from -X importtime
+
+    database.DB_PATH is pointed at ``db_path`` first, so init_db() at import
+    time never touches the database in the working tree.
+    """
+    code = f'import sys, database; database.DB_PATH = sys.argv[1]; import {module}'
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code, db_path],
+        cwd=ROOT, capture_output=True, text=True,
+        env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1')
+    )
+    if result.returncode != 0:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Importing {module} failed")
+
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((int(cumulative), name.strip(), depth))
+    return entries
+
+def main():
+    module = sys.argv[1] if len(sys.argv) > 1 else 'app'
+    budget_ms = float(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_BUDGET_MS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'startup.db')
+        cold = profile_imports(module, db_path)
+        entries = profile_imports(module, db_path)
+
+    def total(entries):
+        return sum(cumulative for cumulative, _, depth in entries if depth == 0) / 1000
+
+    top_level = sorted((entry for entry in entries if entry[2] == 0), reverse=True)
+    total_ms = total(entries)
+
+    print(f"Slowest top-level imports for '{module}' (warm start):")
+    for cumulative, name, _ in top_level[:10]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print(f"Cold start (new database): {total(cold):.1f} ms")
+    print(f"Warm start: {total_ms:.1f} ms (budget {budget_ms:.0f} ms)")
+
+    imported = {name for _, name, _ in entries}
+    eager = [name for name in LAZY_MODULES if name in imported]
+    failures = []
+    if eager:
+        failures.append(f"modules imported eagerly: {', '.join(eager)}")
+    if total_ms > budget_ms:
+        failures.append(f"import time {total_ms:.1f} ms exceeds budget {budget_ms:.0f} ms")
+    if failures:
+        raise SystemExit("FAIL: " + "; ".join(failures))
+    print("OK")
+
+if __name__ == '__main__':
+    main()
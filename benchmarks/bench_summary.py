@@ -0,0 +1,81 @@
+"""Compare the legacy strftime() summary queries with get_expenses_summary
+
+Usage: python benchmarks/bench_summary.py [rows]
+
+Builds a throwaway database with ``rows`` expenses (1,000,000 by default)
+spread over three years and times both implementations for each period.
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import database  # noqa: E402
+
+LEGACY_FILTERS = {
+    'week': "WHERE datetime(date, 'unixepoch') >= date('now', '-7 days')",
+    'month': "WHERE strftime('%Y-%m', date, 'unixepoch') = strftime('%Y-%m', 'now')",
+    'year': "WHERE strftime('%Y', date, 'unixepoch') = strftime('%Y', 'now')",
+}
+
+def populate(path, rows):
+    categories = list(database.CATEGORY_IDS.values())
+    now = datetime.now()
+    conn = sqlite3.connect(path)
+    batch = []
+    for _ in range(rows):
+        date = now - timedelta(seconds=random.randint(0, 3 * 365 * 86400))
+        batch.append((random.randint(100, 20000), 'bench', random.choice(categories),
+                      database.to_epoch(date)))
+        if len(batch) == 50000:
+            conn.executemany('INSERT INTO expenses (amount, description, category_id, date) VALUES (?, ?, ?, ?)', batch)
+            batch = []
+    if batch:
+        conn.executemany('INSERT INTO expenses (amount, description, category_id, date) VALUES (?, ?, ?, ?)', batch)
+    conn.commit()
+    conn.execute('ANALYZE')
+    conn.close()
+
+def legacy_summary(period):
+    date_filter = LEGACY_FILTERS.get(period, "")
+    with database.db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f'SELECT SUM(amount) FROM expenses {date_filter}')
+        cursor.fetchone()
+        cursor.execute(f'SELECT category_id, SUM(amount) AS amount FROM expenses {date_filter} GROUP BY category_id ORDER BY amount DESC')
+        cursor.fetchall()
+        cursor.execute('''
+            SELECT date(date, 'unixepoch') AS day, SUM(amount) FROM expenses
+            WHERE datetime(date, 'unixepoch') >= date('now', '-30 days') GROUP BY day ORDER BY day
+        ''')
+        cursor.fetchall()
+
+def timed(func, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    with tempfile.TemporaryDirectory() as tmp:
+        database.DB_PATH = os.path.join(tmp, 'bench.db')
+        database.init_db()
+        print(f"Populating {rows:,} expenses...")
+        populate(database.DB_PATH, rows)
+
+        print(f"{'period':<8} {'legacy ms':>10} {'new ms':>10} {'speedup':>8}")
+        for period in ('week', 'month', 'year', None):
+            legacy = timed(legacy_summary, period)
+            new = timed(database.get_expenses_summary, period)
+            print(f"{period or 'all':<8} {legacy:>10.1f} {new:>10.1f} {legacy / new:>7.1f}x")
+        database.get_pool().close_all()
+
+if __name__ == '__main__':
+    main()
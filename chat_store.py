@@ -0,0 +1,255 @@
+import os
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+import time
+from collections import OrderedDict
+
+import database
+
+# Longest rolling summary kept for turns that were compacted away
+SUMMARY_MAX_CHARS = 1500
+
+# Characters kept from each dropped message when building the summary
+SUMMARY_SNIPPET_CHARS = 120
+
+SUMMARY_PREFIX = "Summary of our earlier conversation:"
+
+def summarize_turns(previous_summary, dropped_turns, max_chars=SUMMARY_MAX_CHARS):
+    """Fold dropped turns into a compact extractive summary
+
+    Each dropped user question and model answer contributes a short snippet.
+    When the summary grows past ``max_chars`` the oldest text is cut, so the
+    summary stays a fixed-size window over the older part of the chat.
+    """
+    lines = [previous_summary] if previous_summary else []
+    for turn in dropped_turns:
+        text = ' '.join(' '.join(turn['parts']).split())
+        if len(text) > SUMMARY_SNIPPET_CHARS:
+            text = text[:SUMMARY_SNIPPET_CHARS - 3] + '...'
+        speaker = 'User' if turn['role'] == 'user' else 'AIWealth'
+        lines.append(f"{speaker}: {text}")
+
+    summary = '\n'.join(lines)
+    if len(summary) > max_chars:
+        summary = summary[-max_chars:]
+        summary = summary[summary.find('\n') + 1:] if '\n' in summary else summary
+    return summary
+
+def with_summary(summary, turns):
+    """Prepend the rolling summary as a user/model exchange the LLM can read"""
+    if not summary:
+        return list(turns)
+    return [
+        {"role": "user", "parts": [f"{SUMMARY_PREFIX}\n{summary}"]},
+        {"role": "model", "parts": ["Thanks, I'll keep that context in mind."]}
+    ] + list(turns)
+
+def estimate_tokens(text):
+    """Rough token count (about four characters per token) for prompt budgeting"""
+    return len(text) // 4 + 1
+
+def turn_tokens(turn):
+    return sum(estimate_tokens(part) for part in turn['parts'])
+
+def build_history_window(system_prompt, history, token_budget):
+    """Build the history sent to the model for a new chat session
+
+    The window always starts with the system prompt and the rolling summary
+    (if any), then adds the most recent user/model pairs, newest first,
+    until ``token_budget`` is used up.
+    """
+    window = [
+        {"role": "user", "parts": [system_prompt]},
+        {"role": "model", "parts": ["Understood. I'm ready to help with your finances."]}
+    ]
+    if history and history[0]['parts'][0].startswith(SUMMARY_PREFIX):
+        window.extend(history[:2])
+        history = history[2:]
+
+    remaining = token_budget - sum(turn_tokens(turn) for turn in window)
+    recent = []
+    index = len(history)
+    while index >= 2:
+        pair = history[index - 2:index]
+        cost = turn_tokens(pair[0]) + turn_tokens(pair[1])
+        if cost > remaining:
+            break
+        recent[:0] = pair
+        remaining -= cost
+        index -= 2
+
+    # Only whole exchanges are kept, so the window never starts on a model turn
+    return window + recent
+
+class ChatHistoryStore(ABC):
+    """Interface for per-user chat histories in Gemini's role/parts format
+
+    Histories of users who never come back are removed by purge_expired,
+    which stores run themselves every ``purge_every`` appends. That sweep
+    is limited to the appending user's partition; a full sweep across
+    every partition belongs in a maintenance job
+    (``python database.py purge-chat-history`` for the SQLite store).
+    """
+
+    def __init__(self, max_turns=40, ttl=6 * 3600, purge_every=500):
+        self.max_turns = max_turns
+        # Compact down to half the cap so compaction is not run on every turn
+        self.keep_turns = max(2, (max_turns // 2) // 2 * 2)
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._writes_lock = threading.Lock()
+        self._writes = 0
+
+    @abstractmethod
+    def get(self, user_id):
+        """Return the user's history, oldest first, including any summary"""
+
+    @abstractmethod
+    def append(self, user_id, role, text):
+        """Record one turn ('user' or 'model') for a user"""
+
+    @abstractmethod
+    def clear(self, user_id):
+        """Forget a user's history"""
+
+    @abstractmethod
+    def purge_expired(self, user_id=None):
+        """Drop histories idle for longer than the TTL, returning how many
+
+        With ``user_id`` a store may only sweep the partition holding that user.
+        """
+
+    def _count_write(self, user_id):
+        """Run purge_expired on every ``purge_every``-th append; call without holding store locks"""
+        if not self.ttl or not self.purge_every:
+            return 0
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % self.purge_every == 0
+        return self.purge_expired(user_id) if due else 0
+
+class MemoryChatHistoryStore(ChatHistoryStore):
+    """Per-process LRU store with per-user turn caps and a total size cap
+
+    Sessions idle for ``ttl`` seconds expire. When more than ``max_users``
+    sessions exist or their text exceeds ``max_bytes``, the least recently
+    used sessions are evicted.
+    """
+
+    def __init__(self, max_turns=40, ttl=6 * 3600, purge_every=500, max_users=1000, max_bytes=16 * 1024 * 1024):
+        super().__init__(max_turns, ttl, purge_every)
+        self.max_users = max_users
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # user_id -> {'turns', 'summary', 'size', 'touched'}
+        self._total_bytes = 0
+
+    def _session(self, user_id, create=False):
+        """Look up a live session and mark it recently used; caller holds the lock"""
+        session = self._sessions.get(user_id)
+        now = time.monotonic()
+        if session and self.ttl and now - session['touched'] > self.ttl:
+            self._drop(user_id)
+            session = None
+        if session is None and create:
+            session = {'turns': [], 'summary': None, 'size': 0, 'touched': now}
+            self._sessions[user_id] = session
+        if session is not None:
+            session['touched'] = now
+            self._sessions.move_to_end(user_id)
+        return session
+
+    def _drop(self, user_id):
+        session = self._sessions.pop(user_id, None)
+        if session:
+            self._total_bytes -= session['size']
+
+    def get(self, user_id):
+        with self._lock:
+            session = self._session(user_id)
+            if session is None:
+                return []
+            return with_summary(session['summary'], session['turns'])
+
+    def append(self, user_id, role, text):
+        with self._lock:
+            session = self._session(user_id, create=True)
+            session['turns'].append({"role": role, "parts": [text]})
+            session['size'] += len(text)
+            self._total_bytes += len(text)
+
+            # Compact after a model reply so the kept turns still start with a user turn
+            if role == 'model' and len(session['turns']) > self.max_turns:
+                cut = len(session['turns']) - self.keep_turns
+                dropped, session['turns'] = session['turns'][:cut], session['turns'][cut:]
+                old_size = session['size']
+                session['summary'] = summarize_turns(session['summary'], dropped)
+                session['size'] = len(session['summary']) + sum(len(turn['parts'][0]) for turn in session['turns'])
+                self._total_bytes += session['size'] - old_size
+
+            # Evict least recently used sessions, never the one just written
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_users or self._total_bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._sessions))
+                self._drop(oldest)
+        self._count_write(user_id)
+
+    def clear(self, user_id):
+        with self._lock:
+            self._drop(user_id)
+
+    def purge_expired(self, user_id=None):
+        # One in-process partition, so every sweep is a full one
+        if not self.ttl:
+            return 0
+        with self._lock:
+            now = time.monotonic()
+            expired = [user_id for user_id, session in self._sessions.items()
+                       if now - session['touched'] > self.ttl]
+            for user_id in expired:
+                self._drop(user_id)
+            return len(expired)
+
+    def stats(self):
+        """Return the number of live sessions and their total text size"""
+        with self._lock:
+            return {'users': len(self._sessions), 'bytes': self._total_bytes}
+
+class SQLiteChatHistoryStore(ChatHistoryStore):
+    """Store backed by the chat_messages table, shared by every app worker"""
+
+    def get(self, user_id):
+        summary, turns = database.get_chat_history(user_id)
+        return with_summary(summary, turns)
+
+    def append(self, user_id, role, text):
+        database.add_chat_message(user_id, role, text)
+        if role == 'model':
+            database.compact_chat_history(user_id, self.max_turns, self.keep_turns, summarize_turns)
+        try:
+            self._count_write(user_id)
+        except sqlite3.Error:
+            # Purging is housekeeping; the next interval will retry
+            pass
+
+    def clear(self, user_id):
+        database.delete_chat_history(user_id=user_id)
+
+    def purge_expired(self, user_id=None):
+        if not self.ttl:
+            return 0
+        return database.delete_chat_history(idle_seconds=self.ttl, shard_of=user_id)
+
+CHAT_HISTORY_BACKENDS = {
+    'memory': MemoryChatHistoryStore,
+    'sqlite': SQLiteChatHistoryStore,
+}
+
+def create_chat_history_store(backend=None, **options):
+    """Build the store named by ``backend`` or the CHAT_HISTORY_BACKEND env var"""
+    backend = backend or os.getenv('CHAT_HISTORY_BACKEND', 'memory')
+    if backend not in CHAT_HISTORY_BACKENDS:
+        raise ValueError(f"Unknown chat history backend: {backend}")
+    return CHAT_HISTORY_BACKENDS[backend](**options)
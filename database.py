@@ -1,9 +1,23 @@
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 from contextlib import contextmanager
+from functools import lru_cache
 import logging
 import decimal
+import base64
+import binascii
+import calendar
+import hashlib
 import json
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from metrics import REGISTRY, record_request_time
 
 # Configure logging
 logging.basicConfig(
@@ -15,6 +29,53 @@ logger = logging.getLogger('finance_db')
 # Database configuration
 DB_PATH = 'database.db'
 
+# Owner of rows created without an explicit user, and of all data that
+# existed before storage became per-user (matches app.py's fallback)
+DEFAULT_USER_ID = 'default_user'
+
+# Bump whenever init_db() gains new tables, columns, indexes or triggers
+SCHEMA_VERSION = 10
+
+# Pragmas applied to every new connection. WAL lets dashboard readers keep
+# going while an expense is being written; busy_timeout makes writers from
+# other processes wait for the lock instead of failing immediately.
+STORAGE_PROFILES = {
+    'balanced': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'mmap_size': 64 * 1024 * 1024,
+        'cache_size': -16000,  # negative values are KiB
+        'busy_timeout': 5000,
+        'temp_store': 'MEMORY',
+    },
+    'durable': {
+        'journal_mode': 'WAL',
+        'synchronous': 'FULL',
+        'mmap_size': 0,
+        'cache_size': -8000,
+        'busy_timeout': 10000,
+        'temp_store': 'DEFAULT',
+    },
+    'legacy': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL',
+        'busy_timeout': 5000,
+    },
+}
+STORAGE_PROFILE = os.getenv('AIWEALTH_DB_PROFILE', 'balanced')
+
+# Connections a pool may have open at once (checked out or idle), and how
+# long an acquire waits for one to be released before failing
+DB_POOL_MAX_OPEN = int(os.getenv('AIWEALTH_DB_POOL_MAX_OPEN', '32'))
+DB_POOL_TIMEOUT = float(os.getenv('AIWEALTH_DB_POOL_TIMEOUT', '10'))
+
+def apply_storage_profile(conn, profile):
+    """Apply the pragmas of a named storage profile to a connection"""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage profile: {profile}")
+    for pragma, value in STORAGE_PROFILES[profile].items():
+        conn.execute(f"PRAGMA {pragma} = {value}")
+
 # Custom JSON encoder for Decimal type and datetime to help with UI display
 class CustomJSONEncoder(json.JSONEncoder):
     def default(self, obj):
@@ -24,13 +85,545 @@ class CustomJSONEncoder(json.JSONEncoder):
             return obj.strftime('%Y-%m-%d %H:%M:%S')
         return super().default(obj)
 
+# Per-statement profiling of pooled connections (DB_QUERY_PROFILING=0 turns it off)
+DB_QUERY_PROFILING = os.getenv('DB_QUERY_PROFILING', '1') != '0'
+
+# Statements slower than this are logged together with their EXPLAIN QUERY PLAN
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '100'))
+
+QUERY_SECONDS = REGISTRY.histogram(
+    'aiwealth_db_query_seconds', 'Time per SQL statement including fetching its rows', ['function'])
+FUNCTION_SECONDS = REGISTRY.histogram(
+    'aiwealth_db_function_seconds', 'Time a database.py function held a connection', ['function'])
+FUNCTION_SQLITE_SECONDS = REGISTRY.histogram(
+    'aiwealth_db_function_sqlite_seconds', 'Part of the function time spent inside SQLite', ['function'])
+FUNCTION_PYTHON_SECONDS = REGISTRY.histogram(
+    'aiwealth_db_function_python_seconds', 'Part of the function time spent in Python, e.g. formatting rows', ['function'])
+SLOW_QUERIES = REGISTRY.counter(
+    'aiwealth_db_slow_queries_total', 'Statements slower than DB_SLOW_QUERY_MS', ['function'])
+
+class QueryProfile:
+    """Statement timings collected during one db_connection() block"""
+
+    def __init__(self, function):
+        self.function = function
+        self.started = time.perf_counter()
+        self.sqlite_seconds = 0.0
+        self.statements = 0
+        self.cursors = []
+
+    def record(self, conn, sql, parameters, seconds, many):
+        self.sqlite_seconds += seconds
+        self.statements += 1
+        QUERY_SECONDS.observe(seconds, function=self.function)
+        if seconds * 1000 < DB_SLOW_QUERY_MS:
+            return
+
+        SLOW_QUERIES.inc(function=self.function)
+        statement = ' '.join(sql.split())
+        plan = ''
+        if not many and statement.split(' ', 1)[0].upper() in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+            try:
+                rows = conn.cursor(sqlite3.Cursor).execute(f'EXPLAIN QUERY PLAN {sql}', parameters).fetchall()
+                plan = ''.join(f"\n    {row['detail']}" for row in rows)
+            except sqlite3.Error as e:
+                plan = f"\n    (no plan: {e})"
+        logger.warning(f"Slow query in {self.function} ({seconds * 1000:.1f} ms): {statement}{plan}")
+
+    def finish(self):
+        for cursor in self.cursors:
+            cursor.finish_statement()
+        total = time.perf_counter() - self.started
+        FUNCTION_SECONDS.observe(total, function=self.function)
+        FUNCTION_SQLITE_SECONDS.observe(self.sqlite_seconds, function=self.function)
+        FUNCTION_PYTHON_SECONDS.observe(max(0.0, total - self.sqlite_seconds), function=self.function)
+        # Only SQLite time is charged to the request, so nested connections are not counted twice
+        record_request_time('db', self.sqlite_seconds, self.statements)
+
+class ProfiledCursor(sqlite3.Cursor):
+    """Cursor timing each statement from execute() until its rows are fetched"""
+
+    _statement = None  # [sql, parameters, seconds, many] until recorded
+
+    def finish_statement(self):
+        statement, self._statement = self._statement, None
+        if statement is not None and self.connection.profile is not None:
+            self.connection.profile.record(self.connection, *statement)
+
+    def _run(self, method, sql, parameters, many):
+        profile = self.connection.profile
+        if profile is None:
+            return method(self, sql, parameters)
+        self.finish_statement()
+        if self not in profile.cursors:
+            profile.cursors.append(self)
+        start = time.perf_counter()
+        try:
+            return method(self, sql, parameters)
+        finally:
+            self._statement = [sql, parameters, time.perf_counter() - start, many]
+
+    def execute(self, sql, parameters=()):
+        return self._run(sqlite3.Cursor.execute, sql, parameters, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._run(sqlite3.Cursor.executemany, sql, seq_of_parameters, True)
+
+    def _timed_fetch(self, method, *args):
+        if self._statement is None:
+            return method(self, *args)
+        start = time.perf_counter()
+        try:
+            return method(self, *args)
+        finally:
+            self._statement[2] += time.perf_counter() - start
+
+    def fetchone(self):
+        return self._timed_fetch(sqlite3.Cursor.fetchone)
+
+    def fetchmany(self, size=None):
+        return self._timed_fetch(sqlite3.Cursor.fetchmany, size or self.arraysize)
+
+    def fetchall(self):
+        return self._timed_fetch(sqlite3.Cursor.fetchall)
+
+    def __next__(self):
+        return self._timed_fetch(sqlite3.Cursor.__next__)
+
+class ProfiledConnection(sqlite3.Connection):
+    """Connection whose cursors report to ``profile`` while one is attached"""
+
+    profile = None
+    db_path = None
+
+    def cursor(self, factory=ProfiledCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+# Frames skipped when naming the database.py function that opened a connection
+_CONNECTION_HELPERS = {'_pooled_connection', 'db_connection', 'write_connection', '__enter__', 'map_shards'}
+
+def _calling_function():
+    frame = sys._getframe(2)
+    while frame is not None:
+        code = frame.f_code
+        if code.co_filename == __file__ and code.co_name not in _CONNECTION_HELPERS:
+            return code.co_name
+        frame = frame.f_back
+    return 'external'
+
+class ConnectionPool:
+    """Pool of reusable SQLite connections with per-thread affinity.
+
+    Connections released by a thread are handed back to that same thread
+    first, so a request that touches the database several times reuses one
+    connection (and its parsed schema) instead of reconnecting each time.
+    At most ``max_open`` connections exist at once, checked out or idle;
+    further acquires wait up to ``acquire_timeout`` seconds for one to be
+    released. At most ``max_size`` idle connections are kept; connections
+    idle for longer than ``max_idle`` seconds are closed on the next
+    acquire, and only those idle for over ``health_check_after`` seconds
+    are probed before being handed out again.
+    """
+
+    def __init__(self, db_path, profile='balanced', max_size=8, max_idle=300.0, max_open=None,
+                 acquire_timeout=None, health_check_after=30.0):
+        self.db_path = db_path
+        self.profile = profile
+        self.max_size = max_size
+        self.max_idle = max_idle
+        self.max_open = max(max_size, max_open if max_open is not None else DB_POOL_MAX_OPEN)
+        self.acquire_timeout = acquire_timeout if acquire_timeout is not None else DB_POOL_TIMEOUT
+        self.health_check_after = health_check_after
+        self._lock = threading.Lock()
+        # Signalled whenever a connection goes idle or a slot frees up
+        self._available = threading.Condition(self._lock)
+        # Serializes writers in this process so they queue up here rather
+        # than contend for the SQLite write lock
+        self.write_lock = threading.Lock()
+        self._idle = []  # (connection, owner thread id, released at)
+        self._open = 0  # connections checked out or idle
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'discarded': 0, 'waits': 0, 'timeouts': 0}
+        self.closed = False
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, factory=ProfiledConnection)
+        conn.db_path = self.db_path
+        conn.row_factory = sqlite3.Row  # Enable column access by name
+        apply_storage_profile(conn, self.profile)
+        return conn
+
+    def _evict_idle(self, now):
+        """Close idle connections past max_idle; caller holds the lock"""
+        expired = [entry for entry in self._idle if now - entry[2] > self.max_idle]
+        for entry in expired:
+            self._idle.remove(entry)
+            entry[0].close()
+            self._open -= 1
+            self._stats['evictions'] += 1
+        if expired:
+            self._available.notify(len(expired))
+
+    def _take_idle(self, thread_id):
+        """Pop an idle (connection, released at), preferring one last used by this thread; caller holds the lock"""
+        for index in range(len(self._idle) - 1, -1, -1):
+            if self._idle[index][1] == thread_id:
+                conn, _, released_at = self._idle.pop(index)
+                return conn, released_at
+        conn, _, released_at = self._idle.pop()
+        return conn, released_at
+
+    def _checkout(self):
+        """Take an idle connection or reserve a slot for a new one, waiting while the pool is full
+
+        Returns (connection, released at), or (None, None) once a slot has
+        been reserved for the caller to connect.
+        """
+        thread_id = threading.get_ident()
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._lock:
+            waited = False
+            while True:
+                now = time.monotonic()
+                self._evict_idle(now)
+                if self._idle:
+                    return self._take_idle(thread_id)
+                if self._open < self.max_open:
+                    self._open += 1
+                    return None, None
+                if not waited:
+                    self._stats['waits'] += 1
+                    waited = True
+                if now >= deadline or not self._available.wait(deadline - now):
+                    if not self._idle and self._open >= self.max_open:
+                        self._stats['timeouts'] += 1
+                        raise sqlite3.OperationalError(
+                            f"No database connection available after {self.acquire_timeout}s "
+                            f"({self.max_open} open)")
+
+    def _discard(self, conn):
+        """Close a connection that will not return to the pool and free its slot"""
+        conn.close()
+        with self._lock:
+            self._open -= 1
+            self._available.notify()
+
+    @staticmethod
+    def _is_healthy(conn):
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Return a pooled connection, opening a new one on a pool miss
+
+        Blocks while ``max_open`` connections are checked out and raises
+        sqlite3.OperationalError if none is released within acquire_timeout.
+        """
+        while True:
+            conn, released_at = self._checkout()
+            if conn is None:
+                break
+            # Recently used connections are trusted; long-idle ones are probed
+            if time.monotonic() - released_at <= self.health_check_after or self._is_healthy(conn):
+                conn.row_factory = sqlite3.Row
+                with self._lock:
+                    self._stats['hits'] += 1
+                return conn
+            self._discard(conn)
+            with self._lock:
+                self._stats['discarded'] += 1
+
+        with self._lock:
+            self._stats['misses'] += 1
+        try:
+            return self._connect()
+        except BaseException:
+            with self._lock:
+                self._open -= 1
+                self._available.notify()
+            raise
+
+    def release(self, conn):
+        """Return a connection to the pool, closing it if the pool is full"""
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self.closed and len(self._idle) < self.max_size:
+                self._idle.append((conn, threading.get_ident(), time.monotonic()))
+                self._available.notify()
+                return
+        self._discard(conn)
+
+    def close_all(self):
+        """Close every idle connection held by the pool"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._available.notify_all()
+        for conn, _, _ in idle:
+            conn.close()
+
+    def close(self):
+        """Close idle connections and stop keeping released ones"""
+        self.closed = True
+        self.close_all()
+
+    def stats(self):
+        """Return hit/miss counters and current pool occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = len(self._idle)
+            stats['open'] = self._open
+        requests = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / requests, 3) if requests else 0.0
+        stats['max_size'] = self.max_size
+        stats['max_open'] = self.max_open
+        return stats
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool(user_id=None):
+    """Return the connection pool holding ``user_id``'s data
+
+    Without a user, or with DB_SHARDING=none, this is the process-wide pool
+    for DB_PATH, rebuilt if the configuration changed. Otherwise the tenant
+    router picks (and if needed creates) the user's shard.
+    """
+    global _pool
+    if user_id is not None and DB_SHARDING != 'none':
+        return get_tenant_router().pool_for(user_id)
+    with _pool_lock:
+        if _pool is None or _pool.db_path != DB_PATH or _pool.profile != STORAGE_PROFILE:
+            if _pool is not None:
+                _pool.close()
+            _pool = ConnectionPool(DB_PATH, STORAGE_PROFILE)
+        return _pool
+
+# How user data is split across SQLite files: 'none' keeps everything in
+# DB_PATH, 'user' gives every user a file of their own, 'hash' spreads users
+# over DB_SHARD_COUNT files. Each file has its own write lock, so writers
+# on different shards never wait for each other.
+DB_SHARDING = os.getenv('AIWEALTH_DB_SHARDING', 'none')
+DB_SHARD_COUNT = int(os.getenv('AIWEALTH_DB_SHARD_COUNT', '16'))
+
+# Shards kept open at once, idle connections kept per open shard, and
+# connections per shard open at once. With WAL each connection holds three
+# descriptors, so the router needs at most
+# DB_MAX_OPEN_SHARDS * DB_SHARD_POOL_MAX_OPEN * 3 of them.
+DB_MAX_OPEN_SHARDS = int(os.getenv('AIWEALTH_DB_MAX_OPEN_SHARDS', '64'))
+DB_SHARD_POOL_SIZE = int(os.getenv('AIWEALTH_DB_SHARD_POOL_SIZE', '2'))
+DB_SHARD_POOL_MAX_OPEN = int(os.getenv('AIWEALTH_DB_SHARD_POOL_MAX_OPEN', '4'))
+
+_SAFE_SHARD_NAME = re.compile(r'[A-Za-z0-9_-]{1,64}')
+
+class TenantRouter:
+    """Maps users to shard files and keeps an LRU of their connection pools
+
+    Shard files live in ``<DB_PATH without .db>-shards/``. A shard is created
+    and brought to SCHEMA_VERSION the first time this process touches it;
+    when more than ``max_open`` shards are open, the least recently used
+    one's pool is closed (connections still checked out from it are closed
+    when released).
+    """
+
+    def __init__(self, db_path, profile='balanced', mode='user', shard_count=DB_SHARD_COUNT,
+                 max_open=DB_MAX_OPEN_SHARDS, pool_size=DB_SHARD_POOL_SIZE, pool_max_open=DB_SHARD_POOL_MAX_OPEN):
+        if mode not in ('user', 'hash'):
+            raise ValueError(f"Unknown sharding mode: {mode}")
+        self.db_path = db_path
+        self.profile = profile
+        self.mode = mode
+        self.shard_count = shard_count
+        self.max_open = max_open
+        self.pool_size = pool_size
+        self.pool_max_open = pool_max_open
+        self.shard_dir = os.path.splitext(db_path)[0] + '-shards'
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self._pools = OrderedDict()  # shard name -> ConnectionPool, least recently used first
+        self._stats = {'opened': 0, 'evicted': 0, 'migrated': 0}
+
+    def shard_for(self, user_id):
+        """Name of the shard holding ``user_id``; stable across processes"""
+        if self.mode == 'hash':
+            return f"shard-{zlib.crc32(user_id.encode('utf-8')) % self.shard_count:03d}"
+        if _SAFE_SHARD_NAME.fullmatch(user_id):
+            return f"user-{user_id}"
+        return f"user-{hashlib.sha1(user_id.encode('utf-8')).hexdigest()[:24]}"
+
+    def path_for(self, shard):
+        return os.path.join(self.shard_dir, f"{shard}.db")
+
+    def shards(self):
+        """Names of every shard file on disk"""
+        try:
+            names = os.listdir(self.shard_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-3] for name in names if name.endswith('.db'))
+
+    def pool_for(self, user_id):
+        return self.pool_for_shard(self.shard_for(user_id))
+
+    def pool_for_shard(self, shard):
+        """Return the open pool of ``shard``, creating and migrating the file on first use"""
+        with self._lock:
+            pool = self._pools.get(shard)
+            if pool is not None:
+                self._pools.move_to_end(shard)
+                return pool
+
+        # Only one thread opens a shard; the pool is published once its schema is current
+        with self._create_lock:
+            with self._lock:
+                pool = self._pools.get(shard)
+                if pool is not None:
+                    self._pools.move_to_end(shard)
+                    return pool
+
+            os.makedirs(self.shard_dir, exist_ok=True)
+            pool = ConnectionPool(self.path_for(shard), self.profile, max_size=self.pool_size,
+                                  max_open=self.pool_max_open)
+            if _migrate_pool(pool):
+                self._stats['migrated'] += 1
+
+            with self._lock:
+                self._pools[shard] = pool
+                self._stats['opened'] += 1
+                evicted = []
+                while len(self._pools) > self.max_open:
+                    evicted.append(self._pools.popitem(last=False)[1])
+                    self._stats['evicted'] += 1
+        for old in evicted:
+            old.close()
+        return pool
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), OrderedDict()
+        for pool in pools:
+            pool.close()
+
+    def stats(self):
+        """Return open/evicted/migrated shard counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = len(self._pools)
+        stats['max_open'] = self.max_open
+        return stats
+
+_router = None
+
+def get_tenant_router():
+    """Return the process-wide tenant router, rebuilding it if the configuration changed"""
+    global _router
+    with _pool_lock:
+        if (_router is None or _router.db_path != DB_PATH or _router.profile != STORAGE_PROFILE
+                or _router.mode != DB_SHARDING):
+            if _router is not None:
+                _router.close()
+            _router = TenantRouter(DB_PATH, STORAGE_PROFILE, DB_SHARDING)
+        return _router
+
+def _migrate_pool(pool):
+    """Bring the database behind ``pool`` to SCHEMA_VERSION; returns True if it ran DDL"""
+    conn = pool.acquire()
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] >= SCHEMA_VERSION:
+            return False
+        with pool.write_lock:
+            conn.execute('BEGIN IMMEDIATE')
+            _create_schema(conn.cursor())
+            conn.commit()
+        return True
+    finally:
+        pool.release(conn)
+
+def map_shards(func, write=False):
+    """Call ``func(conn)`` on every database holding user data, returning {shard: result}
+
+    For cross-tenant admin reports and maintenance. Without sharding there
+    is one entry, '' for DB_PATH. ``write=True`` runs each call inside a
+    write transaction; ``func`` commits.
+    """
+    if DB_SHARDING == 'none':
+        pools = [('', get_pool())]
+    else:
+        router = get_tenant_router()
+        pools = ((shard, router.pool_for_shard(shard)) for shard in router.shards())
+
+    results = {}
+    for shard, pool in pools:
+        if write:
+            with pool.write_lock, _pooled_connection(pool) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                results[shard] = func(conn)
+        else:
+            with _pooled_connection(pool) as conn:
+                results[shard] = func(conn)
+    return results
+
+def fan_out_query(sql, params=()):
+    """Run a read query on every shard and return all rows as dicts with a 'shard' key"""
+    def run(conn):
+        return [dict(row) for row in conn.execute(sql, params)]
+
+    rows = []
+    for shard, shard_rows in map_shards(run).items():
+        for row in shard_rows:
+            row['shard'] = shard
+            rows.append(row)
+    return rows
+
+def get_pool_stats():
+    """Expose connection pool hit/miss counters for monitoring"""
+    stats = get_pool().stats()
+    if DB_SHARDING != 'none':
+        stats['shards'] = get_tenant_router().stats()
+    return stats
+
+def _collect_pool_metrics():
+    stats = get_pool_stats()
+    yield ('aiwealth_db_pool_requests_total', 'counter', 'Connection pool acquisitions by outcome',
+           ('outcome',), {(outcome,): stats[outcome] for outcome in ('hits', 'misses')})
+    yield ('aiwealth_db_pool_closed_total', 'counter', 'Pooled connections closed by reason',
+           ('reason',), {(reason,): stats[reason] for reason in ('evictions', 'discarded')})
+    yield ('aiwealth_db_pool_idle_connections', 'gauge', 'Idle connections held by the pool',
+           (), {(): stats['idle']})
+    yield ('aiwealth_db_pool_open_connections', 'gauge', 'Connections of the pool checked out or idle',
+           (), {(): stats['open']})
+    yield ('aiwealth_db_pool_waits_total', 'counter', 'Acquisitions that waited for a connection, by outcome',
+           ('outcome',), {('waited',): stats['waits'], ('timed_out',): stats['timeouts']})
+    if 'shards' in stats:
+        shards = stats['shards']
+        yield ('aiwealth_db_open_shards', 'gauge', 'Shard databases with an open connection pool',
+               (), {(): shards['open']})
+        yield ('aiwealth_db_shards_total', 'counter', 'Shard pools opened, evicted from the LRU, or migrated',
+               ('event',), {(event,): shards[event] for event in ('opened', 'evicted', 'migrated')})
+
+REGISTRY.add_collector(_collect_pool_metrics)
+
 @contextmanager
-def db_connection():
-    """Context manager for database connections to ensure proper closing"""
+def _pooled_connection(pool):
+    """Context manager handing out a connection of ``pool`` and returning it on exit
+
+    With DB_QUERY_PROFILING on, statements run on the connection are timed
+    and attributed to the database.py function that opened it.
+    """
     conn = None
+    profile = QueryProfile(_calling_function()) if DB_QUERY_PROFILING else None
     try:
-        conn = sqlite3.connect(DB_PATH)
-        conn.row_factory = sqlite3.Row  # Enable column access by name
+        conn = pool.acquire()
+        conn.profile = profile
         yield conn
     except sqlite3.Error as e:
         logger.error(f"Database connection error: {e}")
@@ -39,83 +632,204 @@ def db_connection():
         raise
     finally:
         if conn:
-            conn.close()
+            if profile is not None:
+                profile.finish()
+                conn.profile = None
+            pool.release(conn)
+
+def db_connection(user_id=None):
+    """Context manager handing out a pooled connection to ``user_id``'s database"""
+    return _pooled_connection(get_pool(user_id))
+
+@contextmanager
+def write_connection(user_id=None):
+    """Context manager for mutations: one writer at a time, inside BEGIN IMMEDIATE
+
+    Writers wait their turn on the pool's write lock, then take the SQLite
+    write lock up front so the transaction cannot fail half-way with
+    "database is locked". With sharding, the lock is per shard. Callers
+    commit explicitly; anything left uncommitted is rolled back when the
+    connection is released.
+    """
+    pool = get_pool(user_id)
+    with pool.write_lock:
+        with _pooled_connection(pool) as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+
+# Tables whose writes bump each data_versions scope
+DATA_VERSION_SCOPES = {
+    'expenses': ('expenses',),
+    'budgets': ('budgets', 'budget_periods'),
+    'notifications': ('notifications',),
+}
+
+def get_data_versions(user_id=DEFAULT_USER_ID):
+    """Return the change counter of every data scope of a user, e.g. {'expenses': 42, ...}"""
+    with db_connection(user_id) as conn:
+        return {row['scope']: row['version'] for row in conn.execute(
+            'SELECT scope, version FROM data_versions WHERE user_id = ?', (user_id,))}
+
+def get_schema_version():
+    """Return the schema version recorded in the database header"""
+    with db_connection() as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+# Tables whose primary key or unique constraint gained user_id; SQLite cannot
+# alter constraints, so _migrate_user_scope renames them and init_db copies
+# their rows into the new definitions
+_LEGACY_USER_SCOPE_TABLES = {
+    'budgets': ('category_id', 'limit_amount', 'period'),
+    'budget_periods': ('category_id', 'period_start', 'limit_amount', 'spent_amount', 'alert_level'),
+    'savings_goals': ('id', 'goal_name', 'target_amount', 'current_savings', 'deadline', 'created_at'),
+}
+
+def _table_columns(cursor, table):
+    cursor.execute('SELECT name FROM pragma_table_info(?)', (table,))
+    return {row[0] for row in cursor.fetchall()}
+
+def _migrate_user_scope(cursor):
+    """Prepare a database from before per-user storage for the user-scoped schema
+
+    Existing rows are assigned to DEFAULT_USER_ID. Tables that only needed a
+    column get it via ALTER TABLE; tables whose keys changed are renamed to
+    ``<name>_legacy`` (returned, for _copy_legacy_rows); derived tables and
+    all triggers are dropped, since init_db recreates and backfills them.
+    """
+    expense_columns = _table_columns(cursor, 'expenses')
+    if not expense_columns or 'user_id' in expense_columns:
+        return []
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")
+    for (trigger,) in cursor.fetchall():
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    for index in ('idx_expenses_category', 'idx_expenses_date', 'idx_expenses_category_date',
+                  'idx_notifications_unread', 'idx_budget_periods_start'):
+        cursor.execute(f'DROP INDEX IF EXISTS {index}')
+    
+    for table in ('expenses', 'notifications', 'notifications_archive'):
+        if _table_columns(cursor, table):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER_ID}'")
+    for table in ('row_counts', 'expense_daily_rollup', 'data_versions'):
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    
+    legacy_tables = []
+    for table in _LEGACY_USER_SCOPE_TABLES:
+        if _table_columns(cursor, table):
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+            legacy_tables.append(table)
+    logger.info(f"Migrating to per-user storage; existing data now belongs to '{DEFAULT_USER_ID}'")
+    return legacy_tables
+
+def _copy_legacy_rows(cursor, tables):
+    """Move rows of tables renamed by _migrate_user_scope into their new definitions"""
+    for table in tables:
+        _insert_converted(cursor, f'{table}_legacy', table, _LEGACY_USER_SCOPE_TABLES[table],
+                          {'user_id': DEFAULT_USER_ID})
+        cursor.execute(f'DROP TABLE {table}_legacy')
+
+# Columns rebuilt as INTEGER, with the conversion each needs: TEXT
+# timestamps became epoch seconds (schema version 8), REAL money became
+# cents (9) and category names became ids into categories (10)
+_INTEGER_CONVERSIONS = {
+    'epoch': "COALESCE(CAST(strftime('%s', {column}) AS INTEGER), {now})",
+    'cents': "CAST(ROUND({column} * 100) AS INTEGER)",
+    'category': "(SELECT id FROM categories WHERE categories.name = category)",
+}
+_INTEGER_COLUMNS = {
+    'expenses': {'date': 'epoch', 'amount': 'cents', 'category_id': 'category'},
+    'notifications': {'created_at': 'epoch'},
+    'notifications_archive': {'created_at': 'epoch', 'archived_at': 'epoch'},
+    'budgets': {'limit_amount': 'cents', 'category_id': 'category'},
+    'budget_periods': {'limit_amount': 'cents', 'spent_amount': 'cents', 'category_id': 'category'},
+    'savings_goals': {'target_amount': 'cents', 'current_savings': 'cents'},
+}
+
+def _column_types(cursor, table):
+    cursor.execute('SELECT name, type FROM pragma_table_info(?)', (table,))
+    return {name: column_type.upper() for name, column_type in cursor.fetchall()}
+
+def _insert_converted(cursor, source, table, columns, constants=None):
+    """Copy ``columns`` of ``table`` from the legacy table ``source``, converting as _INTEGER_COLUMNS says
+
+    ``category_id`` is read from the legacy ``category`` name; names missing
+    from categories are added first. ``constants`` fills extra columns.
+    """
+    types = _column_types(cursor, source)
+    conversions = _INTEGER_COLUMNS.get(table, {})
+    if 'category_id' in columns and 'category' in types:
+        cursor.execute(f'SELECT DISTINCT category FROM {source}')
+        created = {}
+        for (name,) in cursor.fetchall():
+            _category_id(cursor, name, created)
+
+    expressions = [
+        _INTEGER_CONVERSIONS[conversions[column]].format(column=column, now=EPOCH_NOW_SQL)
+        if column in conversions and types.get(column) != 'INTEGER' else column
+        for column in columns
+    ]
+    constants = constants or {}
+    cursor.execute(f'''
+        INSERT INTO {table} ({', '.join([*constants, *columns])})
+        SELECT {', '.join(['?'] * len(constants) + expressions)} FROM {source}
+    ''', list(constants.values()))
+
+def _migrate_integer_columns(cursor):
+    """Rename tables whose timestamps, amounts or categories are not INTEGER yet to ``<name>_legacy``
+
+    SQLite cannot change a column's type, so each table is rebuilt: its
+    triggers and indexes are dropped here and _copy_retyped_rows moves the
+    rows into the new definition. The daily rollup is derived data and is
+    simply dropped, to be backfilled from the converted expenses. Returns
+    the renamed tables.
+    """
+    legacy_tables = []
+    for table, columns in _INTEGER_COLUMNS.items():
+        types = _column_types(cursor, table)
+        if not types or all(types.get(column) == 'INTEGER' for column in columns):
+            continue
 
-def init_db():
-    """Initialize the database with all necessary tables"""
+        cursor.execute('''
+            SELECT type, name FROM sqlite_master
+            WHERE tbl_name = ? AND type IN ('trigger', 'index') AND sql IS NOT NULL
+        ''', (table,))
+        for kind, name in cursor.fetchall():
+            cursor.execute(f'DROP {kind.upper()} IF EXISTS {name}')
+        cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+        legacy_tables.append(table)
+
+    rollup = _column_types(cursor, 'expense_daily_rollup')
+    if rollup and (rollup.get('total_amount') != 'INTEGER' or 'category_id' not in rollup):
+        cursor.execute('DROP TABLE expense_daily_rollup')
+    if legacy_tables:
+        logger.info(f"Converting timestamps, amounts and categories of {', '.join(legacy_tables)} to integers")
+    return legacy_tables
+
+def _copy_retyped_rows(cursor, table, legacy_tables):
+    """Move the rows of a table renamed by _migrate_integer_columns into its new definition"""
+    if table not in legacy_tables:
+        return
+    source = f'{table}_legacy'
+    legacy_columns = _table_columns(cursor, source)
+    columns = [column for column in sorted(_table_columns(cursor, table))
+               if column in legacy_columns or (column == 'category_id' and 'category' in legacy_columns)]
+    _insert_converted(cursor, source, table, columns)
+    cursor.execute(f'DROP TABLE {source}')
+
+def init_db(force=False):
+    """Initialize the database with all necessary tables
+
+    The DDL only runs when the recorded schema version is older than
+    SCHEMA_VERSION (or ``force`` is set), so calling this at every process
+    start costs a single PRAGMA read. With sharding this covers DB_PATH;
+    shard files are created and migrated by the tenant router on first use.
+    """
     try:
-        with db_connection() as conn:
-            cursor = conn.cursor()
-            
-            # Create tables with proper constraints and indices
-            
-            # Expenses table with improved schema
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS expenses (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    amount REAL NOT NULL CHECK (amount > 0),
-                    description TEXT NOT NULL,
-                    category TEXT NOT NULL,
-                    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Add index for frequent queries
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_category ON expenses(category)')
-            cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses(date)')
-            
-            # Budgets table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS budgets (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    category TEXT UNIQUE NOT NULL,
-                    limit_amount REAL NOT NULL CHECK (limit_amount >= 0),
-                    spent_amount REAL DEFAULT 0 CHECK (spent_amount >= 0),
-                    period TEXT DEFAULT 'monthly'
-                )
-            ''')
-            
-            # Savings goals table
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS savings_goals (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    goal_name TEXT UNIQUE NOT NULL,
-                    target_amount REAL NOT NULL CHECK (target_amount > 0),
-                    current_savings REAL DEFAULT 0 CHECK (current_savings >= 0),
-                    deadline DATE,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Notifications table with improved schema
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS notifications (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    message TEXT NOT NULL,
-                    status TEXT DEFAULT 'unread' CHECK (status IN ('read', 'unread')),
-                    type TEXT DEFAULT 'info' CHECK (type IN ('info', 'warning', 'alert')),
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            # Create default budgets if they don't exist
-            default_budgets = [
-                ("food", 500),
-                ("housing", 1500),
-                ("transport", 300),
-                ("entertainment", 200),
-                ("shopping", 300),
-                ("health", 300),
-                ("other", 200)
-            ]
-            
-            for category, amount in default_budgets:
-                cursor.execute('''
-                    INSERT OR IGNORE INTO budgets (category, limit_amount)
-                    VALUES (?, ?)
-                ''', (category, amount))
-            
+        if not force and get_schema_version() >= SCHEMA_VERSION:
+            return True
+        
+        with write_connection() as conn:
+            _create_schema(conn.cursor())
             conn.commit()
             logger.info("Database initialized successfully")
             return True
@@ -123,108 +837,726 @@ def init_db():
         logger.error(f"Database initialization error: {e}")
         return False
 
-def categorize_expense(description):
-    """Categorize expense using keyword matching with improved algorithm"""
-    if not description:
-        return "other"
-        
-    # More comprehensive category mapping
-    categories = {
-        "food": ["groceries", "restaurant", "snack", "food", "lunch", "dinner", "breakfast", 
-                "cafe", "coffee", "meal", "takeout", "delivery", "dine"],
-        "housing": ["rent", "mortgage", "utilities", "electricity", "water", "gas bill", "internet",
-                  "repair", "maintenance", "property", "furniture", "home", "apartment"],
-        "transport": ["gas", "uber", "bus", "car", "taxi", "train", "subway", "lyft", "fuel",
-                    "transit", "transportation", "commute", "vehicle", "maintenance", "parking"],
-        "entertainment": ["movie", "game", "concert", "theater", "netflix", "subscription", "streaming",
-                        "hobby", "leisure", "event", "ticket", "show", "music", "sports"],
-        "shopping": ["clothes", "electronics", "shoes", "amazon", "online", "mall", "retail", "purchase",
-                   "clothing", "accessory", "device", "gadget", "appliance"],
-        "health": ["doctor", "medical", "medicine", "pharmacy", "healthcare", "dental", "vision",
-                 "fitness", "gym", "wellness", "hospital", "prescription"]
-    }
+def _create_schema(cursor):
+    """Create or migrate every table, index and trigger, then record SCHEMA_VERSION
+
+    Runs inside the caller's write transaction. Users get their default
+    budgets lazily, on their first budget read or spend.
+    """
+    # Databases from before per-user storage get user_id columns first
+    legacy_tables = _migrate_user_scope(cursor)
+    # and tables with TEXT timestamps or REAL amounts are rebuilt with INTEGER columns
+    retyped_tables = _migrate_integer_columns(cursor)
+
+    # Create tables with proper constraints and indices
+
+    # Category names, stored once; every other table refers to categories
+    # by id. Built-in categories get the same ids in every database
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS categories (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+    ''')
+    cursor.executemany('INSERT OR IGNORE INTO categories (id, name) VALUES (?, ?)',
+                       [(category_id, name) for name, category_id in CATEGORY_IDS.items()])
+
+    # Expenses table with improved schema; every row belongs to one user.
+    # date is local wall-clock epoch seconds (see to_epoch), amount is in cents
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS expenses (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER_ID}',
+            amount INTEGER NOT NULL CHECK (amount > 0),
+            description TEXT NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            date INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # Copied before the triggers below exist, so counters and rollups are kept as they are
+    _copy_retyped_rows(cursor, 'expenses', retyped_tables)
+    
+    # Every query is scoped to one user, so indexes lead with user_id
+    # and a user's rows are one contiguous index range
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses(user_id, date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_expenses_user_category_date ON expenses(user_id, category_id, date)')
+    
+    # Per-user row counters maintained by triggers so unfiltered totals need no scan
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS row_counts (
+            user_id TEXT NOT NULL,
+            table_name TEXT NOT NULL,
+            row_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, table_name)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO row_counts (user_id, table_name, row_count)
+        SELECT user_id, 'expenses', COUNT(*) FROM expenses GROUP BY user_id
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_count_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT INTO row_counts (user_id, table_name, row_count)
+            VALUES (NEW.user_id, 'expenses', 1)
+            ON CONFLICT(user_id, table_name) DO UPDATE SET row_count = row_count + 1;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_count_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            UPDATE row_counts SET row_count = row_count - 1
+            WHERE user_id = OLD.user_id AND table_name = 'expenses';
+        END
+    ''')
+    
+    # Per-user, per-day, per-category rollup kept current by triggers so
+    # summaries never need to re-aggregate the whole expenses table.
+    # Amounts are cents, so the running totals are exact
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+            user_id TEXT NOT NULL,
+            day TEXT NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            total_amount INTEGER NOT NULL DEFAULT 0,
+            expense_count INTEGER NOT NULL DEFAULT 0,
+            min_amount INTEGER,
+            max_amount INTEGER,
+            PRIMARY KEY (user_id, day, category_id)
+        ) WITHOUT ROWID
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_insert
+        AFTER INSERT ON expenses
+        BEGIN
+            INSERT INTO expense_daily_rollup
+                (user_id, day, category_id, total_amount, expense_count, min_amount, max_amount)
+            VALUES (NEW.user_id, date(NEW.date, 'unixepoch'), NEW.category_id, NEW.amount, 1, NEW.amount, NEW.amount)
+            ON CONFLICT(user_id, day, category_id) DO UPDATE SET
+                total_amount = total_amount + excluded.total_amount,
+                expense_count = expense_count + 1,
+                min_amount = MIN(min_amount, excluded.min_amount),
+                max_amount = MAX(max_amount, excluded.max_amount);
+        END
+    ''')
+    # MIN/MAX cannot be undone incrementally, so a delete recomputes
+    # just the affected group via idx_expenses_user_category_date; the
+    # day's bounds are integer arithmetic on the epoch
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_expenses_rollup_delete
+        AFTER DELETE ON expenses
+        BEGIN
+            DELETE FROM expense_daily_rollup
+            WHERE user_id = OLD.user_id AND day = date(OLD.date, 'unixepoch') AND category_id = OLD.category_id;
+            INSERT INTO expense_daily_rollup
+                (user_id, day, category_id, total_amount, expense_count, min_amount, max_amount)
+            SELECT OLD.user_id, date(OLD.date, 'unixepoch'), OLD.category_id,
+                   SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+            FROM expenses
+            WHERE user_id = OLD.user_id AND category_id = OLD.category_id
+              AND date >= OLD.date - OLD.date % {SECONDS_PER_DAY}
+              AND date < OLD.date - OLD.date % {SECONDS_PER_DAY} + {SECONDS_PER_DAY}
+            HAVING COUNT(*) > 0;
+        END
+    ''')
+    
+    # Backfill the rollup for databases created before it existed
+    cursor.execute('SELECT EXISTS(SELECT 1 FROM expense_daily_rollup), EXISTS(SELECT 1 FROM expenses)')
+    has_rollup, has_expenses = cursor.fetchone()
+    if has_expenses and not has_rollup:
+        _rebuild_rollups(cursor)
+    
+    # Budgets table, one row per user and category; limits are in cents
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS budgets (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER_ID}',
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            limit_amount INTEGER NOT NULL CHECK (limit_amount >= 0),
+            period TEXT DEFAULT 'monthly',
+            UNIQUE (user_id, category_id)
+        )
+    ''')
+    _copy_retyped_rows(cursor, 'budgets', retyped_tables)
+    
+    # Spend per category per budget period (week, month or year,
+    # following budgets.period). limit_amount is the limit in force
+    # for that period and alert_level the highest threshold reached,
+    # so notifications fire only when a threshold is crossed.
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS budget_periods (
+            user_id TEXT NOT NULL,
+            category_id INTEGER NOT NULL REFERENCES categories(id),
+            period_start TEXT NOT NULL,
+            limit_amount INTEGER NOT NULL,
+            spent_amount INTEGER NOT NULL DEFAULT 0,
+            alert_level INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, category_id, period_start)
+        ) WITHOUT ROWID
+    ''')
+    _copy_retyped_rows(cursor, 'budget_periods', retyped_tables)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_budget_periods_user_start ON budget_periods(user_id, period_start)')
+    
+    # Savings goals table; goal names are unique per user, amounts are cents
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS savings_goals (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER_ID}',
+            goal_name TEXT NOT NULL,
+            target_amount INTEGER NOT NULL CHECK (target_amount > 0),
+            current_savings INTEGER DEFAULT 0 CHECK (current_savings >= 0),
+            deadline DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, goal_name)
+        )
+    ''')
+    _copy_retyped_rows(cursor, 'savings_goals', retyped_tables)
+    
+    # Notifications table with improved schema; created_at is UTC epoch seconds
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS notifications (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER_ID}',
+            message TEXT NOT NULL,
+            status TEXT DEFAULT 'unread' CHECK (status IN ('read', 'unread')),
+            type TEXT DEFAULT 'info' CHECK (type IN ('info', 'warning', 'alert')),
+            created_at INTEGER NOT NULL DEFAULT {EPOCH_NOW_SQL}
+        )
+    ''')
+    _copy_retyped_rows(cursor, 'notifications', retyped_tables)
+    # Unread notifications are the only ones listed on every page load
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_notifications_user_unread
+        ON notifications(user_id, created_at) WHERE status = 'unread'
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_notifications_user_created ON notifications(user_id, created_at)')
+    
+    # Read notifications are moved here by compact_notifications()
+    cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS notifications_archive (
+            id INTEGER PRIMARY KEY,
+            user_id TEXT NOT NULL DEFAULT '{DEFAULT_USER_ID}',
+            message TEXT NOT NULL,
+            type TEXT,
+            created_at INTEGER,
+            archived_at INTEGER NOT NULL DEFAULT {EPOCH_NOW_SQL}
+        )
+    ''')
+    _copy_retyped_rows(cursor, 'notifications_archive', retyped_tables)
+    
+    # Chat history shared by every app worker
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id TEXT NOT NULL,
+            role TEXT NOT NULL CHECK (role IN ('user', 'model')),
+            content TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_chat_messages_user ON chat_messages(user_id, id)')
+    
+    # Rolling summary of chat turns that were compacted away
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS chat_summaries (
+            user_id TEXT PRIMARY KEY,
+            summary TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
     
-    description = description.lower()
-    max_matches = 0
-    best_category = "other"
+    # LLM responses keyed by a hash of the prompt, shared across restarts
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            cache_key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_used REAL NOT NULL,
+            hits INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_used ON llm_response_cache(last_used)')
     
-    for category, keywords in categories.items():
-        matches = sum(1 for keyword in keywords if keyword in description)
-        if matches > max_matches:
-            max_matches = matches
-            best_category = category
+    # Per-user, per-scope change counters bumped by triggers; API
+    # responses use them as ETags so unchanged data can be answered
+    # with a 304, and one user's writes never invalidate another's
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS data_versions (
+            user_id TEXT NOT NULL,
+            scope TEXT NOT NULL,
+            version INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, scope)
+        ) WITHOUT ROWID
+    ''')
+    for scope, tables in DATA_VERSION_SCOPES.items():
+        for table in tables:
+            for event in ('INSERT', 'UPDATE', 'DELETE'):
+                row = 'OLD' if event == 'DELETE' else 'NEW'
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS trg_{table}_version_{event.lower()}
+                    AFTER {event} ON {table}
+                    BEGIN
+                        INSERT INTO data_versions (user_id, scope, version)
+                        VALUES ({row}.user_id, '{scope}', 1)
+                        ON CONFLICT(user_id, scope) DO UPDATE SET version = version + 1;
+                    END
+                ''')
     
-    return best_category
+    # Rows of tables rebuilt by _migrate_user_scope belong to the default user
+    _copy_legacy_rows(cursor, legacy_tables)
+    
+    # Converted rows serialize differently, so no cached API response may be reused
+    if retyped_tables:
+        cursor.execute('UPDATE data_versions SET version = version + 1')
+    
+    # Backfill per-period spend for databases created before budget_periods,
+    # and recompute it exactly once amounts became cents
+    cursor.execute('SELECT EXISTS(SELECT 1 FROM budget_periods), EXISTS(SELECT 1 FROM expenses)')
+    has_periods, has_expenses = cursor.fetchone()
+    if has_expenses and (not has_periods or 'budget_periods' in retyped_tables):
+        _rebuild_budget_periods(cursor)
+    
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+def _rebuild_rollups(cursor):
+    """Recompute expense_daily_rollup from the expenses table"""
+    cursor.execute('DELETE FROM expense_daily_rollup')
+    cursor.execute('''
+        INSERT INTO expense_daily_rollup
+            (user_id, day, category_id, total_amount, expense_count, min_amount, max_amount)
+        SELECT user_id, date(date, 'unixepoch'), category_id, SUM(amount), COUNT(*), MIN(amount), MAX(amount)
+        FROM expenses
+        GROUP BY user_id, date(date, 'unixepoch'), category_id
+    ''')
+    return cursor.rowcount
 
-def add_expense(amount, description, category=None, date=None):
-    """Add an expense with improved validation and error handling"""
+def _rebuild_budget_periods(cursor):
+    """Recompute per-period budget spend from the daily rollup
+
+    Limits already recorded for a period are kept; periods that have no row
+    yet take the category's current limit.
+    """
+    cursor.execute('UPDATE budget_periods SET spent_amount = 0')
+    cursor.execute(f'''
+        INSERT INTO budget_periods (user_id, category_id, period_start, limit_amount, spent_amount)
+        SELECT r.user_id, r.category_id, {_period_start_sql('b.period', 'r.day')}, b.limit_amount, SUM(r.total_amount)
+        FROM expense_daily_rollup r
+        JOIN budgets b ON b.user_id = r.user_id AND b.category_id = r.category_id
+        WHERE true
+        GROUP BY 1, 2, 3
+        ON CONFLICT(user_id, category_id, period_start) DO UPDATE SET
+            spent_amount = excluded.spent_amount
+    ''')
+    periods = cursor.rowcount
+    cursor.execute(f"UPDATE budget_periods SET alert_level = {_alert_level_sql('spent_amount', 'limit_amount')}")
+    return periods
+
+def rebuild_rollups():
+    """Rebuild the daily rollup, budget period spend and row counters of every shard to repair any drift"""
+    def rebuild(conn):
+        cursor = conn.cursor()
+        groups = _rebuild_rollups(cursor)
+        _rebuild_budget_periods(cursor)
+        cursor.execute("DELETE FROM row_counts WHERE table_name = 'expenses'")
+        cursor.execute('''
+            INSERT INTO row_counts (user_id, table_name, row_count)
+            SELECT user_id, 'expenses', COUNT(*) FROM expenses GROUP BY user_id
+        ''')
+        conn.commit()
+        return groups
+    
+    try:
+        groups = sum(map_shards(rebuild, write=True).values())
+        logger.info(f"Rebuilt expense rollup ({groups} day/category groups)")
+        return groups
+    except sqlite3.Error as e:
+        logger.error(f"Error rebuilding rollups: {e}")
+        raise
+
+# Keyword mapping used to auto-categorize expense descriptions
+CATEGORY_KEYWORDS = {
+    "food": ["groceries", "restaurant", "snack", "food", "lunch", "dinner", "breakfast", 
+            "cafe", "coffee", "meal", "takeout", "delivery", "dine"],
+    "housing": ["rent", "mortgage", "utilities", "electricity", "water", "gas bill", "internet",
+              "repair", "maintenance", "property", "furniture", "home", "apartment"],
+    "transport": ["gas", "uber", "bus", "car", "taxi", "train", "subway", "lyft", "fuel",
+                "transit", "transportation", "commute", "vehicle", "maintenance", "parking"],
+    "entertainment": ["movie", "game", "concert", "theater", "netflix", "subscription", "streaming",
+                    "hobby", "leisure", "event", "ticket", "show", "music", "sports"],
+    "shopping": ["clothes", "electronics", "shoes", "amazon", "online", "mall", "retail", "purchase",
+               "clothing", "accessory", "device", "gadget", "appliance"],
+    "health": ["doctor", "medical", "medicine", "pharmacy", "healthcare", "dental", "vision",
+             "fitness", "gym", "wellness", "hospital", "prescription"]
+}
+
+def _build_category_matcher(category_keywords):
+    """Compile all keywords into one word-bounded alternation regex
+
+    Longer keywords are tried first so "gas bill" wins over "gas". A plural
+    suffix is tolerated so "movies" still matches "movie".
+    """
+    keyword_categories = {}
+    for category, keywords in category_keywords.items():
+        for keyword in keywords:
+            keyword_categories.setdefault(keyword, []).append(category)
+    alternation = '|'.join(
+        re.escape(keyword) for keyword in sorted(keyword_categories, key=len, reverse=True)
+    )
+    pattern = re.compile(rf"\b({alternation})(?:e?s)?\b")
+    return pattern, keyword_categories
+
+_CATEGORY_PATTERN, _KEYWORD_CATEGORIES = _build_category_matcher(CATEGORY_KEYWORDS)
+_CATEGORY_ORDER = {category: index for index, category in enumerate(CATEGORY_KEYWORDS)}
+
+@lru_cache(maxsize=4096)
+def _categorize_normalized(description):
+    """Categorize an already lower-cased description (memoized)"""
+    matched_keywords = set(_CATEGORY_PATTERN.findall(description))
+    if not matched_keywords:
+        return "other"
+
+    counts = {}
+    for keyword in matched_keywords:
+        for category in _KEYWORD_CATEGORIES[keyword]:
+            counts[category] = counts.get(category, 0) + 1
+
+    # Most distinct keyword hits wins; ties go to the earlier category
+    return min(counts, key=lambda category: (-counts[category], _CATEGORY_ORDER[category]))
+
+# Categories are dictionary-encoded: expenses, budgets, budget periods and
+# the daily rollup store a small integer id into the categories table.
+# Built-in categories have the same id in every database and shard, so
+# categorize_expense needs no query; other names get ids from
+# CUSTOM_CATEGORY_MIN_ID up the first time they are used.
+CATEGORY_IDS = {name: category_id for category_id, name in enumerate(list(CATEGORY_KEYWORDS) + ['other'], start=1)}
+OTHER_CATEGORY_ID = CATEGORY_IDS['other']
+CUSTOM_CATEGORY_MIN_ID = 100
+
+# Seconds a process trusts its id <-> name cache before re-reading it, which
+# bounds how long a rename made by another process goes unnoticed
+CATEGORY_CACHE_TTL = 60
+
+_category_lock = threading.Lock()
+_category_caches = {}  # database path -> (loaded at, names by id, ids by name)
+
+def _load_categories(conn):
+    """Read the categories of ``conn``'s database, caching them unless inside a write
+
+    The cache only ever holds committed rows; a write transaction sees its
+    own uncommitted categories, which would outlive a rollback.
+    """
+    rows = conn.execute('SELECT id, name FROM categories').fetchall()
+    cache = (time.monotonic(), {row[0]: row[1] for row in rows}, {row[1]: row[0] for row in rows})
+    if not conn.in_transaction:
+        with _category_lock:
+            _category_caches[conn.db_path] = cache
+    return cache
+
+def _category_cache(conn):
+    with _category_lock:
+        cache = _category_caches.get(conn.db_path)
+    if cache is None or time.monotonic() - cache[0] > CATEGORY_CACHE_TTL:
+        cache = _load_categories(conn)
+    return cache
+
+def _category_names(conn, category_ids=()):
+    """Return {id: name} for ``conn``'s database, re-reading it once if any of ``category_ids`` is unknown"""
+    names = _category_cache(conn)[1]
+    if not names.keys() >= set(category_ids):
+        names = _load_categories(conn)[1]
+    return names
+
+def _category_id(cursor, category, resolved=None):
+    """Id of a category given by id or name, creating named categories on first use
+
+    ``resolved`` memoizes names looked up within one transaction, e.g. a
+    bulk import, since new ones are not in the process cache yet.
+    """
+    if isinstance(category, int):
+        if category not in _category_names(cursor.connection, [category]):
+            raise ValueError(f"Unknown category id: {category}")
+        return category
+
+    category_id = _category_cache(cursor.connection)[2].get(category)
+    if category_id is None and resolved is not None:
+        category_id = resolved.get(category)
+    if category_id is None:
+        cursor.execute('''
+            INSERT OR IGNORE INTO categories (id, name)
+            SELECT MAX(COALESCE(MAX(id), 0) + 1, ?), ? FROM categories
+        ''', (CUSTOM_CATEGORY_MIN_ID, category))
+        cursor.execute('SELECT id FROM categories WHERE name = ?', (category,))
+        category_id = cursor.fetchone()[0]
+        if resolved is not None:
+            resolved[category] = category_id
+    return category_id
+
+# Filter matching a category name against a category_id column; the lookup
+# runs once per statement and the comparison stays on integers
+CATEGORY_NAME_FILTER = "{column} = (SELECT id FROM categories WHERE name = {name})"
+
+def category_name(category_id, user_id=DEFAULT_USER_ID):
+    """Return the name of a category id, as seen by ``user_id``'s database"""
+    with db_connection(user_id) as conn:
+        return _category_names(conn, [category_id]).get(category_id)
+
+def rename_category(name, new_name):
+    """Rename a category in every database
+
+    Rows refer to categories by id, so this updates one row per database
+    instead of every expense and budget. Other processes see the new name
+    within CATEGORY_CACHE_TTL seconds. Returns the number of rows renamed.
+    """
+    def rename(conn):
+        cursor = conn.cursor()
+        cursor.execute('UPDATE categories SET name = ? WHERE name = ?', (new_name, name))
+        renamed = cursor.rowcount
+        if renamed:
+            # Responses embed category names, so cached ones are stale
+            cursor.execute('UPDATE data_versions SET version = version + 1')
+        conn.commit()
+        return renamed
+
+    try:
+        if not new_name or not new_name.strip():
+            raise ValueError("Category name cannot be empty")
+        try:
+            renamed = sum(map_shards(rename, write=True).values())
+        except sqlite3.IntegrityError:
+            raise ValueError(f"A category named '{new_name}' already exists") from None
+        finally:
+            with _category_lock:
+                _category_caches.clear()
+        if not renamed:
+            raise ValueError(f"Category '{name}' not found")
+        logger.info(f"Renamed category '{name}' to '{new_name}'")
+        return renamed
+    except (ValueError, sqlite3.Error) as e:
+        logger.error(f"Error renaming category: {e}")
+        raise
+
+def categorize_expense(description):
+    """Categorize expense using the precompiled keyword matcher, returning its category id"""
+    if not description:
+        return OTHER_CATEGORY_ID
+    return CATEGORY_IDS[_categorize_normalized(description.lower())]
+
+def categorize_many(descriptions):
+    """Categorize a batch of descriptions, returning category ids in input order"""
+    results = []
+    seen = {}
+    for description in descriptions:
+        key = description.lower() if description else ""
+        if key not in seen:
+            seen[key] = CATEGORY_IDS[_categorize_normalized(key)] if key else OTHER_CATEGORY_ID
+        results.append(seen[key])
+    return results
+
+# Expense dates are stored as INTEGER seconds since 1970-01-01 of the local
+# wall-clock time (no timezone shift), so SQLite's 'unixepoch' modifier
+# turns them back into the same local date. Notification timestamps are
+# real UTC epochs, as CURRENT_TIMESTAMP was UTC.
+SECONDS_PER_DAY = 86400
+
+# Column default giving the current UTC epoch (unixepoch() needs SQLite 3.38)
+EPOCH_NOW_SQL = "(CAST(strftime('%s', 'now') AS INTEGER))"
+
+def to_epoch(value):
+    """Convert a datetime, 'YYYY-MM-DD[ HH:MM:SS]' string or epoch to integer epoch seconds
+
+    Raises ValueError for strings that are not ISO dates.
+    """
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip())
+    return calendar.timegm(value.timetuple())
+
+@lru_cache(maxsize=4096)
+def _format_day(day):
+    """('YYYY-MM-DD', 'Mon DD, YYYY', 'Mon DD') for a day number since the epoch (memoized)"""
+    date = datetime(1970, 1, 1) + timedelta(days=day)
+    return date.strftime('%Y-%m-%d'), date.strftime('%b %d, %Y'), date.strftime('%b %d')
+
+def format_epoch(timestamp):
+    """Format epoch seconds as 'YYYY-MM-DD HH:MM:SS'
+
+    Only the date part goes through strftime, once per distinct day; the
+    time of day is plain integer arithmetic.
+    """
+    day, seconds = divmod(timestamp, SECONDS_PER_DAY)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{_format_day(day)[0]} {hours:02d}:{minutes:02d}:{seconds:02d}"
+
+# Money is stored as integer cents: sums and running totals are exact, and
+# rows are turned into dollars once, as they leave this module
+def to_cents(amount):
+    """Convert a dollar amount (number or numeric string) to integer cents, rounding half up"""
+    try:
+        cents = (decimal.Decimal(str(amount).strip()) * 100).to_integral_value(decimal.ROUND_HALF_UP)
+        return int(cents)
+    except (decimal.InvalidOperation, OverflowError, ValueError):
+        raise ValueError(f"Invalid amount: {amount!r}") from None
+
+def to_dollars(cents):
+    """Convert integer cents to a float dollar amount for API responses"""
+    return cents / 100
+
+def format_dollars(cents):
+    """Dollar text for messages: '500' for whole amounts, '12.50' otherwise"""
+    return str(cents // 100) if cents % 100 == 0 else f"{cents / 100:.2f}"
+
+def _normalize_expense_date(date, strict=False):
+    """Return date as integer epoch seconds, defaulting to now for missing dates
+
+    Unparseable dates also default to now unless ``strict``, which raises
+    ValueError for them instead.
+    """
+    if date is None:
+        return to_epoch(datetime.now())
+    try:
+        return to_epoch(date)
+    except (TypeError, ValueError):
+        if strict:
+            raise ValueError(f"Invalid date: {date!r}") from None
+        return to_epoch(datetime.now())
+
+# Budget usage thresholds (percent of the limit), highest first, and the
+# notification type sent when spending crosses each one
+BUDGET_ALERT_THRESHOLDS = ((120, 'alert'), (100, 'warning'), (80, 'info'))
+
+# Budgets every user starts with; categories first seen in an expense get
+# DEFAULT_BUDGET_LIMIT
+DEFAULT_BUDGETS = {
+    "food": 500,
+    "housing": 1500,
+    "transport": 300,
+    "entertainment": 200,
+    "shopping": 300,
+    "health": 300,
+    "other": 200
+}
+DEFAULT_BUDGET_LIMIT = 300
+# Default limits in cents by category id
+_DEFAULT_BUDGET_CENTS = {CATEGORY_IDS[category]: amount * 100 for category, amount in DEFAULT_BUDGETS.items()}
+
+def _ensure_default_budgets(cursor, user_id):
+    """Create any missing default budgets for a user"""
+    cursor.executemany('''
+        INSERT OR IGNORE INTO budgets (user_id, category_id, limit_amount)
+        VALUES (?, ?, ?)
+    ''', [(user_id, category_id, cents) for category_id, cents in _DEFAULT_BUDGET_CENTS.items()])
+
+# SQL giving the first day of the budget period containing a date, by budgets.period
+BUDGET_PERIOD_STARTS = {
+    'weekly': "date({date}, 'weekday 0', '-6 days')",
+    'monthly': "strftime('%Y-%m-01', {date})",
+    'yearly': "strftime('%Y-01-01', {date})",
+}
+
+def _period_start_sql(period, date):
+    """SQL expression for the start of the ``period`` window containing ``date``
+
+    Unknown period names fall back to monthly, the column's default.
+    """
+    cases = ' '.join(f"WHEN '{name}' THEN {expression.format(date=date)}"
+                     for name, expression in BUDGET_PERIOD_STARTS.items() if name != 'monthly')
+    return f"(CASE {period} {cases} ELSE {BUDGET_PERIOD_STARTS['monthly'].format(date=date)} END)"
+
+def _alert_level_sql(spent, limit):
+    """SQL expression giving the highest threshold that ``spent`` has reached"""
+    cases = ' '.join(f"WHEN {spent} * 100 >= {limit} * {threshold} THEN {threshold}"
+                     for threshold, _ in BUDGET_ALERT_THRESHOLDS)
+    return f"(CASE WHEN {limit} <= 0 THEN 0 {cases} ELSE 0 END)"
+
+def _budget_alert_message(category, limit_amount, percentage):
+    """Notification text for a category that reached a budget threshold (``limit_amount`` in cents)"""
+    if percentage < 100:
+        return f"Heads up: You've used {percentage}% of your {category} budget of ${format_dollars(limit_amount)}."
+    return (f"Alert: You've exceeded your {category} budget of ${format_dollars(limit_amount)} "
+            f"(currently at {percentage}%)!")
+
+def _record_budget_spend(cursor, user_id, category_id, amount, date):
+    """Add spend (cents) to the budget period containing ``date`` (epoch seconds), notifying on a threshold crossing
+
+    The first write in a new period creates its row with the category's
+    current limit, which is how budgets roll over. The upsert recomputes
+    alert_level and RETURNING hands back the new row together with the
+    level before this spend, so crossing detection needs no extra SELECT.
+    Only the highest newly crossed threshold of the current period is
+    notified; staying over budget adds no further rows. Returns True when
+    a notification was created.
+    """
+    _roll_budget_periods(cursor, user_id)
+    cursor.execute('''
+        INSERT OR IGNORE INTO budgets (user_id, category_id, limit_amount) VALUES (?, ?, ?)
+    ''', (user_id, category_id, _DEFAULT_BUDGET_CENTS.get(category_id, DEFAULT_BUDGET_LIMIT * 100)))
+    cursor.execute(f'''
+        INSERT INTO budget_periods (user_id, category_id, period_start, limit_amount, spent_amount, alert_level)
+        SELECT user_id, category_id, {_period_start_sql('period', "datetime(:date, 'unixepoch')")}, limit_amount, :amount,
+               {_alert_level_sql(':amount', 'limit_amount')}
+        FROM budgets WHERE user_id = :user_id AND category_id = :category_id
+        ON CONFLICT(user_id, category_id, period_start) DO UPDATE SET
+            spent_amount = spent_amount + excluded.spent_amount,
+            alert_level = {_alert_level_sql('(spent_amount + excluded.spent_amount)', 'limit_amount')}
+        RETURNING limit_amount, spent_amount, alert_level,
+            {_alert_level_sql('(spent_amount - :amount)', 'limit_amount')} AS previous_level,
+            period_start = (
+                SELECT {_period_start_sql('period', ':now')} FROM budgets
+                WHERE user_id = :user_id AND category_id = :category_id
+            ) AS is_current
+    ''', {'user_id': user_id, 'category_id': category_id, 'amount': amount, 'date': date,
+          'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+    budget = cursor.fetchone()
+
+    # Backdated expenses update their own period but never raise alerts
+    if not budget['is_current'] or budget['alert_level'] <= budget['previous_level']:
+        return False
+
+    notification_type = dict(BUDGET_ALERT_THRESHOLDS)[budget['alert_level']]
+    percentage = round(budget['spent_amount'] / budget['limit_amount'] * 100)
+    category = _category_names(cursor.connection, [category_id])[category_id]
+    cursor.execute('''
+        INSERT INTO notifications (user_id, message, status, type)
+        VALUES (?, ?, 'unread', ?)
+    ''', (user_id, _budget_alert_message(category, budget['limit_amount'], percentage), notification_type))
+    return True
+
+def add_expense(amount, description, category=None, date=None, user_id=DEFAULT_USER_ID):
+    """Add an expense for ``user_id`` with improved validation and error handling"""
     try:
         # Validate inputs
-        if not amount or float(amount) <= 0:
+        cents = to_cents(amount) if amount else 0
+        if cents <= 0:
             raise ValueError("Amount must be a positive number")
         
         if not description:
             raise ValueError("Description cannot be empty")
         
         # Auto-categorize if not provided
-        if category is None or category.strip() == "":
+        if category is None or (isinstance(category, str) and category.strip() == ""):
             category = categorize_expense(description)
         
-        # Handle date properly
-        if date is None:
-            date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        elif isinstance(date, str):
-            # Ensure date string is in correct format
-            try:
-                datetime.strptime(date, '%Y-%m-%d %H:%M:%S')
-            except ValueError:
-                try:
-                    # Try alternative format
-                    date = datetime.strptime(date, '%Y-%m-%d').strftime('%Y-%m-%d %H:%M:%S')
-                except ValueError:
-                    # If all fails, use current date
-                    date = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        date = _normalize_expense_date(date)
         
-        with db_connection() as conn:
+        with write_connection(user_id) as conn:
             cursor = conn.cursor()
             
-            # Use transaction to ensure database consistency
-            cursor.execute('BEGIN TRANSACTION')
-            
             # Insert the expense
+            category_id = _category_id(cursor, category)
             cursor.execute('''
-                INSERT INTO expenses (amount, description, category, date) 
-                VALUES (?, ?, ?, ?)
-            ''', (amount, description, category, date))
+                INSERT INTO expenses (user_id, amount, description, category_id, date) 
+                VALUES (?, ?, ?, ?, ?)
+            ''', (user_id, cents, description, category_id, date))
             
             expense_id = cursor.lastrowid
             
-            # Update budget in a single query
-            cursor.execute('''
-                INSERT INTO budgets (category, limit_amount, spent_amount)
-                VALUES (?, 300, ?)
-                ON CONFLICT(category) DO UPDATE SET
-                spent_amount = spent_amount + ?
-            ''', (category, amount, amount))
-            
-            # Check budget status and create notification if needed
-            cursor.execute('''
-                SELECT limit_amount, spent_amount FROM budgets WHERE category = ?
-            ''', (category,))
-            
-            budget = cursor.fetchone()
-            if budget and budget['spent_amount'] > budget['limit_amount']:
-                percentage = round((budget['spent_amount'] / budget['limit_amount']) * 100)
-                
-                # Decide notification type based on severity
-                notification_type = 'warning'
-                if percentage > 120:
-                    notification_type = 'alert'
-                
-                cursor.execute('''
-                    INSERT INTO notifications (message, status, type)
-                    VALUES (?, 'unread', ?)
-                ''', (f"Alert: You've exceeded your {category} budget of ${budget['limit_amount']} (currently at {percentage}%)!", notification_type))
+            # Update the budget and detect threshold crossings in one statement
+            _record_budget_spend(cursor, user_id, category_id, cents, date)
             
             conn.commit()
             logger.info(f"Added expense: ${amount} for {description} in {category}")
@@ -234,94 +1566,260 @@ def add_expense(amount, description, category=None, date=None):
         logger.error(f"Error adding expense: {e}")
         raise
 
-def get_all_expenses(limit=100, offset=0, category=None, date_from=None, date_to=None):
-    """Get expenses with filtering and pagination for UI"""
+# Rows inserted per executemany() call during bulk imports
+BULK_INSERT_CHUNK_SIZE = 500
+
+def bulk_add_expenses(expenses, user_id=DEFAULT_USER_ID):
+    """Insert many expenses for ``user_id`` in one transaction
+
+    ``expenses`` is any iterable of dicts with ``amount`` and ``description``
+    and optional ``category`` and ``date`` keys. It is consumed in chunks, so
+    a generator over an uploaded file is never fully materialized. Invalid
+    rows, including ones whose date cannot be parsed, are skipped and
+    reported. Budget periods are updated with one statement per category
+    and day, and only thresholds crossed in the current period are notified.
+    Rows the importers mark ``credit`` (money coming in) are counted as
+    skipped, and as ``credits``, without an error entry.
+    """
+    inserted = 0
+    skipped = []
+    credits = 0
+    daily_totals = {}
+    resolved = {}
+
+    try:
+        with write_connection(user_id) as conn:
+            cursor = conn.cursor()
+            chunk = []
+
+            for row_number, expense in enumerate(expenses, start=1):
+                if expense.get('credit'):
+                    credits += 1
+                    continue
+                try:
+                    amount = to_cents(expense.get('amount') or 0)
+                    if amount <= 0:
+                        raise ValueError("Amount must be a positive number")
+                    description = (expense.get('description') or '').strip()
+                    if not description:
+                        raise ValueError("Description cannot be empty")
+                    category = (expense.get('category') or '').strip().lower() or None
+                    date = _normalize_expense_date(expense.get('date') or None, strict=True)
+                except (AttributeError, TypeError, ValueError) as e:
+                    skipped.append({'row': row_number, 'error': str(e)})
+                    continue
+
+                chunk.append([amount, description, category, date])
+                if len(chunk) >= BULK_INSERT_CHUNK_SIZE:
+                    inserted += _insert_expense_chunk(cursor, user_id, chunk, daily_totals, resolved)
+                    chunk = []
+
+            if chunk:
+                inserted += _insert_expense_chunk(cursor, user_id, chunk, daily_totals, resolved)
+
+            notifications = _apply_bulk_budget_totals(cursor, user_id, daily_totals)
+            names = _category_names(conn, {category_id for category_id, _ in daily_totals})
+            category_totals = {}
+            for (category_id, _), total in daily_totals.items():
+                category = names[category_id]
+                category_totals[category] = category_totals.get(category, 0) + total
+
+            conn.commit()
+            logger.info(f"Bulk imported {inserted} expenses ({len(skipped)} invalid, {credits} credits skipped)")
+
+            return {
+                'inserted': inserted,
+                'skipped': len(skipped) + credits,
+                'credits': credits,
+                'errors': skipped[:50],
+                'categories': {category: to_dollars(total) for category, total in category_totals.items()},
+                'notifications': notifications
+            }
+    except sqlite3.Error as e:
+        logger.error(f"Error bulk adding expenses: {e}")
+        raise
+
+def _insert_expense_chunk(cursor, user_id, chunk, daily_totals, resolved):
+    """Categorize and insert a chunk of validated rows, accumulating per-category daily totals"""
+    uncategorized = [row for row in chunk if row[2] is None]
+    for row, category_id in zip(uncategorized, categorize_many(row[1] for row in uncategorized)):
+        row[2] = category_id
+    for row in chunk:
+        if isinstance(row[2], str):
+            row[2] = _category_id(cursor, row[2], resolved)
+
+    cursor.executemany('''
+        INSERT INTO expenses (user_id, amount, description, category_id, date)
+        VALUES (?, ?, ?, ?, ?)
+    ''', [(user_id, *row) for row in chunk])
+
+    for amount, _, category_id, date in chunk:
+        key = (category_id, date - date % SECONDS_PER_DAY)
+        daily_totals[key] = daily_totals.get(key, 0) + amount
+    return len(chunk)
+
+def _apply_bulk_budget_totals(cursor, user_id, daily_totals):
+    """Add aggregated spend to budget periods in date order, returning the notification count"""
+    return sum(_record_budget_spend(cursor, user_id, category_id, total, day)
+               for (category_id, day), total in sorted(daily_totals.items(), key=lambda item: item[0][1]))
+
+def _get_row_count(cursor, table_name, user_id):
+    """Read a user's trigger-maintained row count, falling back to COUNT(*)"""
+    cursor.execute('SELECT row_count FROM row_counts WHERE user_id = ? AND table_name = ?', (user_id, table_name))
+    row = cursor.fetchone()
+    if row is not None:
+        return row[0]
+    cursor.execute(f'SELECT COUNT(*) FROM {table_name} WHERE user_id = ?', (user_id,))
+    return cursor.fetchone()[0]
+
+def encode_cursor(direction, date, expense_id):
+    """Build an opaque pagination cursor pointing at an expense row"""
+    payload = json.dumps([direction, date, expense_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor from encode_cursor into (direction, epoch date, expense_id)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        direction, date, expense_id = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        return direction, int(date), int(expense_id)
+    except (TypeError, ValueError, binascii.Error) as e:
+        raise ValueError(f"Invalid pagination cursor: {cursor!r}") from e
+
+def get_all_expenses(limit=100, offset=0, category=None, date_from=None, date_to=None,
+                     cursor=None, include_total=True, user_id=DEFAULT_USER_ID):
+    """Get a user's expenses with filtering and pagination for UI
+
+    Pages are ordered newest first. Passing a ``next_cursor`` or
+    ``prev_cursor`` from a previous page seeks on (date, id) through the
+    (user_id, date) index instead of skipping ``offset`` rows, so deep pages
+    cost the same as the first one. ``include_total=False`` skips counting
+    matching rows; the unfiltered total is read from a trigger-maintained
+    counter. ``date_from``/``date_to`` are ISO dates or datetimes and are
+    compared as epoch seconds; rows carry the raw ``timestamp`` next to
+    the formatted dates.
+    """
+    if limit < 1 or offset < 0:
+        raise ValueError(f"Invalid pagination: limit={limit}, offset={offset}")
+    
     try:
         query = '''
-            SELECT id, amount, description, category, date 
+            SELECT id, amount, description, category_id, date 
             FROM expenses 
-            WHERE 1=1
+            WHERE user_id = ?
         '''
-        params = []
+        filters = ""
+        params = [user_id]
         
         # Apply filters if provided
         if category:
-            query += " AND category = ?"
+            filters += " AND " + CATEGORY_NAME_FILTER.format(column='category_id', name='?')
             params.append(category)
         
-        if date_from:
-            query += " AND date >= ?"
-            params.append(date_from)
-        
-        if date_to:
-            query += " AND date <= ?"
-            params.append(date_to)
-        
-        query += " ORDER BY date DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        with db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            rows = cursor.fetchall()
-            
-            # Get total count for pagination
-            count_query = '''
-                SELECT COUNT(*) FROM expenses WHERE 1=1
-            '''
-            count_params = []
-            
-            if category:
-                count_query += " AND category = ?"
-                count_params.append(category)
-            
+        try:
             if date_from:
-                count_query += " AND date >= ?"
-                count_params.append(date_from)
+                filters += " AND date >= ?"
+                params.append(to_epoch(date_from))
             
             if date_to:
-                count_query += " AND date <= ?"
-                count_params.append(date_to)
-            
-            cursor.execute(count_query, count_params)
-            total_count = cursor.fetchone()[0]
+                filters += " AND date <= ?"
+                params.append(to_epoch(date_to))
+        except ValueError:
+            raise ValueError(f"Invalid date filter: {date_from or ''}..{date_to or ''}") from None
+        
+        query += filters
+        page_params = list(params)
+        direction = 'next'
+        
+        if cursor:
+            direction, cursor_date, cursor_id = decode_cursor(cursor)
+            if direction == 'next':
+                query += " AND (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?"
+            else:
+                # Walk backwards in ascending order, then flip the page
+                query += " AND (date, id) > (?, ?) ORDER BY date ASC, id ASC LIMIT ?"
+            page_params.extend([cursor_date, cursor_id, limit + 1])
+        else:
+            query += " ORDER BY date DESC, id DESC LIMIT ? OFFSET ?"
+            page_params.extend([limit + 1, offset])
+        
+        with db_connection(user_id) as conn:
+            cursor_obj = conn.cursor()
+            cursor_obj.execute(query, page_params)
+            rows = cursor_obj.fetchall()
+            
+            # One extra row tells us whether another page exists
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            if direction == 'prev':
+                rows.reverse()
+            
+            total_count = None
+            if include_total:
+                if filters:
+                    cursor_obj.execute(f"SELECT COUNT(*) FROM expenses WHERE user_id = ?{filters}", params)
+                    total_count = cursor_obj.fetchone()[0]
+                else:
+                    total_count = _get_row_count(cursor_obj, 'expenses', user_id)
             
-            # Format response for UI
+            # Format response for UI; day names come from the memoized _format_day
+            names = _category_names(conn, {row['category_id'] for row in rows})
             expenses = []
             for row in rows:
+                timestamp = row['date']
                 expenses.append({
                     'id': row['id'],
-                    'amount': float(row['amount']),  # Format for UI
+                    'amount': to_dollars(row['amount']),  # Format for UI
                     'description': row['description'],
-                    'category': row['category'],
-                    'date': row['date'],
-                    'formatted_date': datetime.strptime(row['date'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %Y')  # Friendly date
+                    'category': names[row['category_id']],
+                    'date': format_epoch(timestamp),
+                    'timestamp': timestamp,
+                    'formatted_date': _format_day(timestamp // SECONDS_PER_DAY)[1]  # Friendly date
                 })
             
+            # Work out which neighbouring pages exist
+            if direction == 'next':
+                has_next = has_more
+                has_prev = bool(cursor) or offset > 0
+            else:
+                has_next = True
+                has_prev = has_more
+            
+            next_cursor = None
+            prev_cursor = None
+            if expenses and has_next:
+                next_cursor = encode_cursor('next', expenses[-1]['timestamp'], expenses[-1]['id'])
+            if expenses and has_prev:
+                prev_cursor = encode_cursor('prev', expenses[0]['timestamp'], expenses[0]['id'])
+            
             return {
                 'expenses': expenses,
                 'pagination': {
                     'total': total_count,
-                    'page': offset // limit + 1,
+                    'page': None if cursor else offset // limit + 1,
                     'limit': limit,
-                    'pages': (total_count + limit - 1) // limit
+                    'pages': (total_count + limit - 1) // limit if total_count is not None else None,
+                    'has_more': has_next,
+                    'next_cursor': next_cursor,
+                    'prev_cursor': prev_cursor
                 }
             }
     except sqlite3.Error as e:
         logger.error(f"Error retrieving expenses: {e}")
         raise
 
-def delete_expense(expense_id):
-    """Delete an expense with proper transaction handling"""
+def delete_expense(expense_id, user_id=DEFAULT_USER_ID):
+    """Delete one of a user's expenses with proper transaction handling"""
     try:
-        with db_connection() as conn:
+        with write_connection(user_id) as conn:
             cursor = conn.cursor()
-            cursor.execute('BEGIN TRANSACTION')
             
-            # Get expense details
+            # Get expense details; other users' expenses are reported as not found
             cursor.execute('''
-                SELECT amount, category FROM expenses WHERE id = ?
-            ''', (expense_id,))
+                SELECT amount, category_id, date FROM expenses WHERE id = ? AND user_id = ?
+            ''', (expense_id, user_id))
             
             expense = cursor.fetchone()
             
@@ -329,17 +1827,23 @@ def delete_expense(expense_id):
                 conn.rollback()
                 raise ValueError(f"Expense with ID {expense_id} not found")
             
-            amount, category = expense['amount'], expense['category']
+            amount, category_id, date = expense['amount'], expense['category_id'], expense['date']
             
             # Delete the expense
             cursor.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
             
-            # Update budget in a single query
-            cursor.execute('''
-                UPDATE budgets
-                SET spent_amount = MAX(0, spent_amount - ?)
-                WHERE category = ?
-            ''', (amount, category))
+            # Update the expense's budget period in a single query; dropping back
+            # under a threshold lowers alert_level so crossing it again notifies again
+            cursor.execute(f'''
+                UPDATE budget_periods
+                SET spent_amount = MAX(0, spent_amount - :amount),
+                    alert_level = {_alert_level_sql('MAX(0, spent_amount - :amount)', 'limit_amount')}
+                WHERE user_id = :user_id AND category_id = :category_id
+                  AND period_start = (
+                      SELECT {_period_start_sql('period', "datetime(:date, 'unixepoch')")} FROM budgets
+                      WHERE user_id = :user_id AND category_id = :category_id
+                  )
+            ''', {'user_id': user_id, 'amount': amount, 'category_id': category_id, 'date': date})
             
             conn.commit()
             logger.info(f"Deleted expense ID {expense_id}")
@@ -348,93 +1852,256 @@ def delete_expense(expense_id):
         logger.error(f"Error deleting expense: {e}")
         raise
 
-def get_expenses_summary(period=None):
-    """Get expense summary with optional time period filtering"""
+# Days covered by the daily spending trend returned with every summary
+SUMMARY_TREND_DAYS = 30
+
+def resolve_period(period=None, date_from=None, date_to=None, now=None):
+    """Turn a period name or custom range into a half-open [start, end) date range
+
+    Supported periods are 'all', 'week' (rolling 7 days), 'month' and 'year'
+    (calendar, current), 'last_<N>_days' (rolling) and 'custom', which uses
+    the inclusive ``date_from``/``date_to`` ('YYYY-MM-DD'). Bounds are
+    returned as 'YYYY-MM-DD' strings, or None when unbounded, so they compare
+    directly against the day column of expense_daily_rollup.
+    """
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+
+    if date_from or date_to:
+        period = 'custom'
+
+    if not period or period == 'all':
+        return None, None
+    if period == 'week':
+        return (today - timedelta(days=7)).strftime('%Y-%m-%d'), None
+    if period == 'month':
+        start = today.replace(day=1)
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')
+    if period == 'year':
+        return f"{today.year}-01-01", f"{today.year + 1}-01-01"
+
+    rolling = re.fullmatch(r'last_(\d+)_days', period)
+    if rolling:
+        return (today - timedelta(days=int(rolling.group(1)))).strftime('%Y-%m-%d'), None
+
+    if period == 'custom':
+        start = end = None
+        if date_from:
+            start = datetime.strptime(str(date_from)[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
+        if date_to:
+            end = (datetime.strptime(str(date_to)[:10], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+        return start, end
+
+    raise ValueError(f"Unknown summary period: {period}")
+
+def get_expenses_summary(period=None, date_from=None, date_to=None, user_id=DEFAULT_USER_ID):
+    """Get a user's expense summary with optional time period filtering
+
+    The category breakdown and the daily trend are read from the
+    expense_daily_rollup table in one statement, so the cost depends on the
+    number of days in range rather than the number of expenses. The total is
+    the sum of the category rows.
+    """
     try:
-        query_params = []
-        date_filter = ""
+        start, end = resolve_period(period, date_from, date_to)
+        trend_start = (datetime.now() - timedelta(days=SUMMARY_TREND_DAYS)).strftime('%Y-%m-%d')
         
-        if period:
-            today = datetime.now()
-            if period == 'week':
-                # Last 7 days
-                date_filter = "WHERE date >= date('now', '-7 days')"
-            elif period == 'month':
-                # Current month
-                date_filter = "WHERE strftime('%Y-%m', date) = strftime('%Y-%m', 'now')"
-            elif period == 'year':
-                # Current year
-                date_filter = "WHERE strftime('%Y', date) = strftime('%Y', 'now')"
+        # Build a day range filter for the requested period
+        period_conditions = ["user_id = ?"]
+        query_params = [user_id]
+        if start:
+            period_conditions.append("day >= ?")
+            query_params.append(start)
+        if end:
+            period_conditions.append("day < ?")
+            query_params.append(end)
+        date_filter = f"WHERE {' AND '.join(period_conditions)}"
         
-        with db_connection() as conn:
+        with db_connection(user_id) as conn:
             cursor = conn.cursor()
             
-            # Get total expenses
+            # Category breakdown for the period and day-by-day trend (last 30 days)
             cursor.execute(f'''
-                SELECT SUM(amount) FROM expenses {date_filter}
-            ''', query_params)
+                SELECT 'category' AS kind, category_id AS label, SUM(total_amount) AS amount
+                FROM expense_daily_rollup
+                {date_filter}
+                GROUP BY category_id
+                UNION ALL
+                SELECT 'day' AS kind, day AS label, SUM(total_amount) AS amount
+                FROM expense_daily_rollup
+                WHERE user_id = ? AND day >= ?
+                GROUP BY day
+            ''', query_params + [user_id, trend_start])
             
-            total = cursor.fetchone()[0] or 0
+            category_rows = []
+            daily_spending = []
+            for kind, label, amount in cursor.fetchall():
+                if kind == 'category':
+                    category_rows.append((label, amount))
+                else:
+                    daily_spending.append({'date': label, 'amount': to_dollars(amount)})
             
-            # Get breakdown by category
-            cursor.execute(f'''
-                SELECT category, SUM(amount) as amount
-                FROM expenses
-                {date_filter}
-                GROUP BY category
-                ORDER BY amount DESC
-            ''', query_params)
+            total = sum(amount for _, amount in category_rows)
+            category_rows.sort(key=lambda row: row[1], reverse=True)
+            daily_spending.sort(key=lambda day: day['date'])
             
+            names = _category_names(conn, [category_id for category_id, _ in category_rows])
             categories = []
-            for row in cursor.fetchall():
+            for category_id, amount in category_rows:
                 categories.append({
-                    'category': row[0],
-                    'amount': float(row[1]),
-                    'percentage': round((float(row[1]) / total * 100) if total > 0 else 0, 1)
+                    'category': names[category_id],
+                    'amount': to_dollars(amount),
+                    'percentage': round((amount / total * 100) if total > 0 else 0, 1)
                 })
             
-            # Get day-by-day spending for trend analysis (last 30 days)
+            return {
+                'total_expenses': to_dollars(total),
+                'categories': categories,
+                'daily_trend': daily_spending,
+                'period': period or ('custom' if date_from or date_to else 'all'),
+                'date_from': start,
+                'date_to': end
+            }
+    except sqlite3.Error as e:
+        logger.error(f"Error getting expense summary: {e}")
+        raise
+
+def get_dashboard_stats(top_n=3, user_id=DEFAULT_USER_ID):
+    """Get a user's category totals, grand total, top categories and date span for the dashboard
+
+    Everything comes from a single aggregate over the user's expense_daily_rollup rows.
+    """
+    try:
+        with db_connection(user_id) as conn:
+            cursor = conn.cursor()
+            
             cursor.execute('''
-                SELECT date(date) as day, SUM(amount) as daily_total
-                FROM expenses
-                WHERE date >= date('now', '-30 days')
-                GROUP BY day
-                ORDER BY day
-            ''')
+                SELECT category_id, SUM(total_amount) AS amount, SUM(expense_count) AS count,
+                       MIN(day) AS first_day, MAX(day) AS last_day
+                FROM expense_daily_rollup
+                WHERE user_id = ?
+                GROUP BY category_id
+            ''', (user_id,))
+            rows = cursor.fetchall()
             
-            daily_spending = [{'date': row[0], 'amount': float(row[1])} for row in cursor.fetchall()]
+            names = _category_names(conn, [row['category_id'] for row in rows])
+            categories = sorted(({'category': names[row['category_id']], 'amount': to_dollars(row['amount'])}
+                                 for row in rows), key=lambda category: category['category'])
+            total = to_dollars(sum(row['amount'] for row in rows))
+            top_categories = sorted(categories, key=lambda category: category['amount'], reverse=True)[:top_n]
+            first_day = min((row['first_day'] for row in rows), default=None)
+            last_day = max((row['last_day'] for row in rows), default=None)
+            
+            # Calculate monthly average over the span of recorded expenses
+            monthly_avg = total
+            if first_day and last_day:
+                days = (datetime.strptime(last_day, '%Y-%m-%d') - datetime.strptime(first_day, '%Y-%m-%d')).days
+                monthly_avg = total / max(1, days / 30)
             
             return {
-                'total_expenses': float(total),
                 'categories': categories,
-                'daily_trend': daily_spending,
-                'period': period or 'all'
+                'total_expenses': total,
+                'expense_count': sum(row['count'] for row in rows),
+                'top_categories': top_categories,
+                'first_date': first_day,
+                'last_date': last_day,
+                'monthly_avg': monthly_avg
             }
     except sqlite3.Error as e:
-        logger.error(f"Error getting expense summary: {e}")
+        logger.error(f"Error getting dashboard stats: {e}")
         raise
 
-def get_budget_insights(category=None):
-    """Get budget insights for UI display"""
+# Local date of the current roll, and the (database path, user_id) pairs
+# whose budgets this process already rolled into their current period then;
+# the oldest pairs are forgotten beyond BUDGET_ROLL_MEMO_SIZE
+_budget_periods_rolled_on = None
+_budget_periods_rolled = OrderedDict()
+_budget_periods_rolled_lock = threading.Lock()
+BUDGET_ROLL_MEMO_SIZE = 10000
+
+def _roll_budget_periods(cursor, user_id):
+    """Open the current period for every budget of a user, at most once a day per database
+
+    Runs inside the caller's write transaction (_record_budget_spend and
+    set_budget), so reads never take the write lock. Spend is recorded into
+    its period by the write path, so rolling over only has to create empty
+    rows carrying each category's current limit; this keeps the history
+    complete and gives a new user the default budgets. Reads show default
+    budgets that have no row yet through _current_budget_sql.
+    """
+    global _budget_periods_rolled_on
+    today = datetime.now().strftime('%Y-%m-%d')
+    key = (cursor.connection.db_path, user_id)
+    with _budget_periods_rolled_lock:
+        if _budget_periods_rolled_on != today:
+            _budget_periods_rolled_on = today
+            _budget_periods_rolled.clear()
+        if key in _budget_periods_rolled:
+            return
+    
+    _ensure_default_budgets(cursor, user_id)
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO budget_periods (user_id, category_id, period_start, limit_amount)
+        SELECT user_id, category_id, {_period_start_sql('period', ':now')}, limit_amount
+        FROM budgets WHERE user_id = :user_id
+    ''', {'user_id': user_id, 'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
+    
+    with _budget_periods_rolled_lock:
+        _budget_periods_rolled[key] = today
+        while len(_budget_periods_rolled) > BUDGET_ROLL_MEMO_SIZE:
+            _budget_periods_rolled.popitem(last=False)
+
+def _current_budget_sql(where=''):
+    """SELECT of a user's budgets joined to their current period's spend, bound to :user_id and :now
+
+    Default budgets the user has no row for yet are included with their
+    default limit, so reads never have to create them.
+    """
+    defaults = ', '.join(f'({category_id}, {cents})' for category_id, cents in _DEFAULT_BUDGET_CENTS.items())
+    return f'''
+        WITH default_budgets(category_id, limit_amount) AS (VALUES {defaults}),
+        b AS (
+            SELECT user_id, category_id, limit_amount, period FROM budgets WHERE user_id = :user_id
+            UNION ALL
+            SELECT :user_id, d.category_id, d.limit_amount, 'monthly' FROM default_budgets d
+            WHERE NOT EXISTS (
+                SELECT 1 FROM budgets WHERE user_id = :user_id AND category_id = d.category_id
+            )
+        )
+        SELECT b.category_id, COALESCE(p.limit_amount, b.limit_amount) AS limit_amount, b.period,
+               COALESCE(p.spent_amount, 0) AS spent_amount,
+               COALESCE(p.alert_level, 0) AS alert_level,
+               {_period_start_sql('b.period', ':now')} AS period_start
+        FROM b
+        LEFT JOIN budget_periods p
+            ON p.user_id = b.user_id AND p.category_id = b.category_id
+            AND p.period_start = {_period_start_sql('b.period', ':now')}
+        WHERE b.user_id = :user_id {where}
+    '''
+
+def get_budget_insights(category=None, user_id=DEFAULT_USER_ID):
+    """Get a user's budget insights for UI display"""
     try:
-        with db_connection() as conn:
+        with db_connection(user_id) as conn:
             cursor = conn.cursor()
             
             if category:
-                # Single category insights
-                cursor.execute('''
-                    SELECT category, limit_amount, spent_amount 
-                    FROM budgets WHERE category = ?
-                ''', (category,))
+                # Single category insights for the current period
+                where = 'AND ' + CATEGORY_NAME_FILTER.format(column='b.category_id', name=':category')
+                cursor.execute(_current_budget_sql(where), {
+                    'user_id': user_id,
+                    'category': category,
+                    'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+                })
                 
                 result = cursor.fetchone()
                 
                 if not result:
                     return {"message": f"Budget for '{category}' not found. Please set a budget first."}
                 
-                limit_amount = float(result['limit_amount'])
-                spent_amount = float(result['spent_amount'])
-                remaining = limit_amount - spent_amount
+                limit_amount = result['limit_amount']
+                spent_amount = result['spent_amount']
                 percentage = round((spent_amount / limit_amount * 100) if limit_amount > 0 else 0, 1)
                 
                 # Calculate status for UI
@@ -445,17 +2112,19 @@ def get_budget_insights(category=None):
                     status = "warning"
                 
                 return {
-                    "category": result['category'],
-                    "limit_amount": limit_amount,
-                    "spent_amount": spent_amount,
-                    "remaining": remaining,
+                    "category": _category_names(conn, [result['category_id']])[result['category_id']],
+                    "period": result['period'],
+                    "period_start": result['period_start'],
+                    "limit_amount": to_dollars(limit_amount),
+                    "spent_amount": to_dollars(spent_amount),
+                    "remaining": to_dollars(limit_amount - spent_amount),
                     "percentage": percentage,
                     "status": status,
                     "advice": get_budget_advice(percentage)
                 }
             else:
                 # All categories summary
-                return get_budget_overview()
+                return get_budget_overview(user_id=user_id)
     except sqlite3.Error as e:
         logger.error(f"Error getting budget insights: {e}")
         raise
@@ -473,25 +2142,39 @@ def get_budget_advice(percentage):
     else:
         return "You're well within your budget. Great job managing your finances!"
 
-def set_budget(category, limit_amount):
-    """Set or update a budget with validation"""
+def set_budget(category, limit_amount, user_id=DEFAULT_USER_ID):
+    """Set or update one of a user's budgets with validation"""
     try:
-        if not category or not category.strip():
+        if not category or (isinstance(category, str) and not category.strip()):
             raise ValueError("Category cannot be empty")
             
-        if not limit_amount or float(limit_amount) < 0:
+        if not limit_amount or to_cents(limit_amount) < 0:
             raise ValueError("Budget limit must be a non-negative number")
             
-        with db_connection() as conn:
+        with write_connection(user_id) as conn:
             cursor = conn.cursor()
             
             # Upsert operation for budget
+            _roll_budget_periods(cursor, user_id)
+            category_id = _category_id(cursor, category)
             cursor.execute('''
-                INSERT INTO budgets (category, limit_amount)
-                VALUES (?, ?)
-                ON CONFLICT(category) DO UPDATE SET
-                limit_amount = ?
-            ''', (category, float(limit_amount), float(limit_amount)))
+                INSERT INTO budgets (user_id, category_id, limit_amount)
+                VALUES (?, ?, ?)
+                ON CONFLICT(user_id, category_id) DO UPDATE SET
+                limit_amount = excluded.limit_amount
+            ''', (user_id, category_id, to_cents(limit_amount)))
+            
+            # The new limit applies to the current period (past periods keep
+            # theirs); its alert level is reset without notifying, so only
+            # later spending can trigger alerts
+            cursor.execute(f'''
+                INSERT INTO budget_periods (user_id, category_id, period_start, limit_amount)
+                SELECT user_id, category_id, {_period_start_sql('period', ':now')}, limit_amount
+                FROM budgets WHERE user_id = :user_id AND category_id = :category_id
+                ON CONFLICT(user_id, category_id, period_start) DO UPDATE SET
+                    limit_amount = excluded.limit_amount,
+                    alert_level = {_alert_level_sql('spent_amount', 'excluded.limit_amount')}
+            ''', {'user_id': user_id, 'category_id': category_id, 'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
             
             conn.commit()
             logger.info(f"Budget set: {category} = ${limit_amount}")
@@ -500,13 +2183,13 @@ def set_budget(category, limit_amount):
         logger.error(f"Error setting budget: {e}")
         raise
 
-def add_savings_goal(goal_name, target_amount, deadline=None):
-    """Add a savings goal with validation and proper date handling"""
+def add_savings_goal(goal_name, target_amount, deadline=None, user_id=DEFAULT_USER_ID):
+    """Add a savings goal for a user with validation and proper date handling"""
     try:
         if not goal_name or not goal_name.strip():
             raise ValueError("Goal name cannot be empty")
             
-        if not target_amount or float(target_amount) <= 0:
+        if not target_amount or to_cents(target_amount) <= 0:
             raise ValueError("Target amount must be a positive number")
             
         # Handle deadline date
@@ -517,25 +2200,25 @@ def add_savings_goal(goal_name, target_amount, deadline=None):
             except ValueError:
                 deadline = None
         
-        with db_connection() as conn:
+        with write_connection(user_id) as conn:
             cursor = conn.cursor()
             
             # Check if goal with same name exists
-            cursor.execute('SELECT goal_name FROM savings_goals WHERE goal_name = ?', (goal_name,))
+            cursor.execute('SELECT goal_name FROM savings_goals WHERE user_id = ? AND goal_name = ?', (user_id, goal_name))
             if cursor.fetchone():
                 raise ValueError(f"A savings goal named '{goal_name}' already exists")
             
             # Insert new goal
             if deadline:
                 cursor.execute('''
-                    INSERT INTO savings_goals (goal_name, target_amount, deadline)
-                    VALUES (?, ?, ?)
-                ''', (goal_name, float(target_amount), deadline))
+                    INSERT INTO savings_goals (user_id, goal_name, target_amount, deadline)
+                    VALUES (?, ?, ?, ?)
+                ''', (user_id, goal_name, to_cents(target_amount), deadline))
             else:
                 cursor.execute('''
-                    INSERT INTO savings_goals (goal_name, target_amount)
-                    VALUES (?, ?)
-                ''', (goal_name, float(target_amount)))
+                    INSERT INTO savings_goals (user_id, goal_name, target_amount)
+                    VALUES (?, ?, ?)
+                ''', (user_id, goal_name, to_cents(target_amount)))
             
             conn.commit()
             logger.info(f"Added savings goal: {goal_name} with target ${target_amount}")
@@ -544,26 +2227,27 @@ def add_savings_goal(goal_name, target_amount, deadline=None):
         logger.error(f"Error adding savings goal: {e}")
         raise
 
-def update_savings_goal(goal_id=None, goal_name=None, current_savings=None, target_amount=None):
-    """Update a savings goal with flexible parameters"""
+def update_savings_goal(goal_id=None, goal_name=None, current_savings=None, target_amount=None,
+                        user_id=DEFAULT_USER_ID):
+    """Update one of a user's savings goals with flexible parameters"""
     try:
         if not goal_id and not goal_name:
             raise ValueError("Either goal ID or goal name must be provided")
             
-        if current_savings is not None and float(current_savings) < 0:
+        if current_savings is not None and to_cents(current_savings) < 0:
             raise ValueError("Current savings cannot be negative")
             
-        if target_amount is not None and float(target_amount) <= 0:
+        if target_amount is not None and to_cents(target_amount) <= 0:
             raise ValueError("Target amount must be positive")
             
-        with db_connection() as conn:
+        with write_connection(user_id) as conn:
             cursor = conn.cursor()
             
             # Find the goal
             if goal_id:
-                cursor.execute('SELECT id FROM savings_goals WHERE id = ?', (goal_id,))
+                cursor.execute('SELECT id FROM savings_goals WHERE id = ? AND user_id = ?', (goal_id, user_id))
             else:
-                cursor.execute('SELECT id FROM savings_goals WHERE goal_name = ?', (goal_name,))
+                cursor.execute('SELECT id FROM savings_goals WHERE user_id = ? AND goal_name = ?', (user_id, goal_name))
                 
             goal = cursor.fetchone()
             if not goal:
@@ -575,11 +2259,11 @@ def update_savings_goal(goal_id=None, goal_name=None, current_savings=None, targ
             
             if current_savings is not None:
                 updates.append("current_savings = ?")
-                params.append(float(current_savings))
+                params.append(to_cents(current_savings))
                 
             if target_amount is not None:
                 updates.append("target_amount = ?")
-                params.append(float(target_amount))
+                params.append(to_cents(target_amount))
                 
             if updates:
                 query = f"UPDATE savings_goals SET {', '.join(updates)} WHERE id = ?"
@@ -595,31 +2279,32 @@ def update_savings_goal(goal_id=None, goal_name=None, current_savings=None, targ
         logger.error(f"Error updating savings goal: {e}")
         raise
 
-def get_savings_goals():
-    """Get all savings goals with progress information"""
+def get_savings_goals(user_id=DEFAULT_USER_ID):
+    """Get all of a user's savings goals with progress information"""
     try:
-        with db_connection() as conn:
+        with db_connection(user_id) as conn:
             cursor = conn.cursor()
             
             cursor.execute('''
                 SELECT id, goal_name, target_amount, current_savings, deadline, created_at
                 FROM savings_goals
+                WHERE user_id = ?
                 ORDER BY created_at DESC
-            ''')
+            ''', (user_id,))
             
             rows = cursor.fetchall()
             goals = []
             
             for row in rows:
-                target = float(row['target_amount'])
-                current = float(row['current_savings'])
+                target = row['target_amount']
+                current = row['current_savings'] or 0
                 percentage = round((current / target * 100) if target > 0 else 0, 1)
                 
                 goals.append({
                     'id': row['id'],
                     'name': row['goal_name'],
-                    'target_amount': target,
-                    'current_savings': current,
+                    'target_amount': to_dollars(target),
+                    'current_savings': to_dollars(current),
                     'deadline': row['deadline'],
                     'progress': percentage,
                     'created_at': row['created_at']
@@ -630,31 +2315,34 @@ def get_savings_goals():
         logger.error(f"Error retrieving savings goals: {e}")
         raise
 
-def get_notifications(limit=5, include_read=False):
-    """Get notifications with improved filtering"""
+def get_notifications(limit=5, include_read=False, user_id=DEFAULT_USER_ID):
+    """Get a user's notifications with improved filtering"""
     try:
-        with db_connection() as conn:
+        with db_connection(user_id) as conn:
             cursor = conn.cursor()
             
-            status_filter = "" if include_read else "WHERE status = 'unread'"
+            status_filter = "" if include_read else "AND status = 'unread'"
             
             cursor.execute(f'''
                 SELECT id, message, status, type, created_at 
                 FROM notifications
-                {status_filter}
+                WHERE user_id = ? {status_filter}
                 ORDER BY created_at DESC
                 LIMIT ?
-            ''', (limit,))
+            ''', (user_id, limit))
             
             notifications = []
             for row in cursor.fetchall():
+                timestamp = row['created_at']
+                day, seconds = divmod(timestamp, SECONDS_PER_DAY)
                 notifications.append({
                     "id": row['id'],
                     "message": row['message'],
                     "status": row['status'],
                     "type": row['type'],
-                    "date": row['created_at'],
-                    "formatted_date": datetime.strptime(row['created_at'], '%Y-%m-%d %H:%M:%S').strftime('%b %d, %H:%M')
+                    "date": format_epoch(timestamp),
+                    "timestamp": timestamp,
+                    "formatted_date": f"{_format_day(day)[2]}, {seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
                 })
             
             return notifications
@@ -662,13 +2350,13 @@ def get_notifications(limit=5, include_read=False):
         logger.error(f"Error retrieving notifications: {e}")
         raise
 
-def mark_notification_read(notification_id):
-    """Mark a notification as read with validation"""
+def mark_notification_read(notification_id, user_id=DEFAULT_USER_ID):
+    """Mark one of a user's notifications as read with validation"""
     try:
-        with db_connection() as conn:
+        with write_connection(user_id) as conn:
             cursor = conn.cursor()
             
-            cursor.execute('SELECT id FROM notifications WHERE id = ?', (notification_id,))
+            cursor.execute('SELECT id FROM notifications WHERE id = ? AND user_id = ?', (notification_id, user_id))
             if not cursor.fetchone():
                 raise ValueError(f"Notification ID {notification_id} not found")
                 
@@ -679,38 +2367,136 @@ def mark_notification_read(notification_id):
             ''', (notification_id,))
             
             conn.commit()
-            return True
+        
+        _maybe_compact_notifications(user_id)
+        return True
     except (ValueError, sqlite3.Error) as e:
         logger.error(f"Error retrieving notifications: {e}")
         raise
 
-def get_budget_overview():
-    """Get comprehensive budget overview with status and summary statistics"""
+# Read notifications older than this are moved to notifications_archive
+NOTIFICATION_READ_RETENTION_DAYS = 30
+
+# Oldest archived notifications beyond this count are dropped
+NOTIFICATION_ARCHIVE_MAX_ROWS = 5000
+
+# Minimum seconds between compactions of one database triggered by
+# mark_notification_read
+NOTIFICATION_COMPACT_INTERVAL = 3600
+
+# Monotonic time of the last compaction per database path; the oldest
+# entries are forgotten beyond NOTIFICATION_COMPACT_MEMO_SIZE
+_notification_compactions = OrderedDict()
+_notification_compaction_lock = threading.Lock()
+NOTIFICATION_COMPACT_MEMO_SIZE = 10000
+
+def compact_notifications(retention_days=NOTIFICATION_READ_RETENTION_DAYS,
+                          max_archived=NOTIFICATION_ARCHIVE_MAX_ROWS, shard_of=None):
+    """Archive old read notifications of all users and cap the archive size
+
+    Each shard is compacted on its own, so ``max_archived`` applies per
+    shard. With ``shard_of`` only the database holding that user is
+    compacted. Returns a dict with the number of notifications archived and
+    the number of archived rows dropped.
+    """
+    cutoff = int(time.time()) - int(retention_days) * SECONDS_PER_DAY
+    
+    def compact(conn):
+        cursor = conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO notifications_archive (id, user_id, message, type, created_at)
+            SELECT id, user_id, message, type, created_at FROM notifications
+            WHERE status = 'read' AND created_at < ?
+        ''', (cutoff,))
+        cursor.execute('''
+            DELETE FROM notifications
+            WHERE status = 'read' AND created_at < ?
+        ''', (cutoff,))
+        archived = cursor.rowcount
+        
+        cursor.execute('''
+            DELETE FROM notifications_archive WHERE id IN (
+                SELECT id FROM notifications_archive
+                ORDER BY id DESC
+                LIMIT -1 OFFSET ?
+            )
+        ''', (max_archived,))
+        dropped = cursor.rowcount
+        
+        conn.commit()
+        return archived, dropped
+    
     try:
-        with db_connection() as conn:
+        if shard_of is not None:
+            with write_connection(shard_of) as conn:
+                results = [compact(conn)]
+        else:
+            results = map_shards(compact, write=True).values()
+        archived = sum(result[0] for result in results)
+        dropped = sum(result[1] for result in results)
+        if archived or dropped:
+            logger.info(f"Archived {archived} read notifications, dropped {dropped} old archived ones")
+        return {'archived': archived, 'dropped': dropped}
+    except sqlite3.Error as e:
+        logger.error(f"Error compacting notifications: {e}")
+        raise
+
+def _maybe_compact_notifications(user_id):
+    """Compact the database holding ``user_id`` at most once per NOTIFICATION_COMPACT_INTERVAL
+
+    Only that user's shard is touched, so a request never fans out across
+    tenants; ``python database.py compact-notifications`` sweeps them all.
+    """
+    key = get_pool(user_id).db_path
+    now = time.monotonic()
+    with _notification_compaction_lock:
+        last = _notification_compactions.get(key)
+        if last is not None and now - last < NOTIFICATION_COMPACT_INTERVAL:
+            return
+        _notification_compactions[key] = now
+        _notification_compactions.move_to_end(key)
+        while len(_notification_compactions) > NOTIFICATION_COMPACT_MEMO_SIZE:
+            _notification_compactions.popitem(last=False)
+    try:
+        compact_notifications(shard_of=user_id)
+    except sqlite3.Error:
+        # Compaction is housekeeping; the next interval will retry
+        pass
+
+def get_budget_overview(user_id=DEFAULT_USER_ID):
+    """Get a user's budget overview with status and summary statistics
+
+    Figures are for each budget's current period: one primary-key lookup in
+    budget_periods per category, however many expenses exist.
+    """
+    try:
+        with db_connection(user_id) as conn:
             conn.row_factory = sqlite3.Row
             cursor = conn.cursor()
             
             # Get budget data with percentage calculation in SQL
-            cursor.execute('''
+            cursor.execute(f'''
                 SELECT 
-                    category, 
+                    category_id, 
                     limit_amount, 
                     spent_amount,
+                    alert_level,
                     CASE WHEN limit_amount > 0 
-                        THEN (spent_amount / limit_amount) * 100
+                        THEN spent_amount * 100.0 / limit_amount
                         ELSE 0 
                     END as percentage
-                FROM budgets
+                FROM ({_current_budget_sql()})
                 ORDER BY percentage DESC
-            ''')
+            ''', {'user_id': user_id, 'now': datetime.now().strftime('%Y-%m-%d %H:%M:%S')})
             
             results = []
             total_limit = 0
             total_spent = 0
             
-            for row in cursor.fetchall():
-                category = row['category']
+            rows = cursor.fetchall()
+            names = _category_names(conn, [row['category_id'] for row in rows])
+            for row in rows:
+                category = names[row['category_id']]
                 limit = row['limit_amount']
                 spent = row['spent_amount']
                 percentage = row['percentage']
@@ -720,28 +2506,28 @@ def get_budget_overview():
                 total_limit += limit
                 total_spent += spent
                 
-                # Determine budget status
-                if percentage >= 100:
+                # Budget status comes from the alert level kept by the write path
+                if row['alert_level'] >= 100:
                     status = "exceeded"
-                elif percentage >= 80:
+                elif row['alert_level'] >= 80:
                     status = "warning"
                 else:
                     status = "normal"
                     
                 results.append({
                     'category': category,
-                    'limit': round(limit, 2),
-                    'spent': round(spent, 2),
-                    'remaining': round(remaining, 2),
+                    'limit': to_dollars(limit),
+                    'spent': to_dollars(spent),
+                    'remaining': to_dollars(remaining),
                     'percentage': round(percentage, 1),
                     'status': status
                 })
             
             # Add summary information
             summary = {
-                'total_limit': round(total_limit, 2),
-                'total_spent': round(total_spent, 2),
-                'total_remaining': round(total_limit - total_spent, 2),
+                'total_limit': to_dollars(total_limit),
+                'total_spent': to_dollars(total_spent),
+                'total_remaining': to_dollars(total_limit - total_spent),
                 'overall_percentage': round((total_spent / total_limit * 100) if total_limit > 0 else 0, 1)
             }
             
@@ -753,6 +2539,290 @@ def get_budget_overview():
         logger.error(f"Error retrieving budget overview: {e}")
         raise
 
+def get_budget_history(category=None, periods=12, user_id=DEFAULT_USER_ID):
+    """Get a user's spend against limit for the most recent budget periods
+
+    With ``category`` the last ``periods`` periods of that category are
+    returned; otherwise every category's rows for the last ``periods``
+    distinct period starts. Rows are newest first.
+    """
+    try:
+        with db_connection(user_id) as conn:
+            cursor = conn.cursor()
+            
+            if category:
+                cursor.execute(f'''
+                    SELECT category_id, period_start, limit_amount, spent_amount, alert_level
+                    FROM budget_periods
+                    WHERE user_id = ? AND {CATEGORY_NAME_FILTER.format(column='category_id', name='?')}
+                    ORDER BY period_start DESC
+                    LIMIT ?
+                ''', (user_id, category, periods))
+            else:
+                cursor.execute('''
+                    SELECT category_id, period_start, limit_amount, spent_amount, alert_level
+                    FROM budget_periods
+                    WHERE user_id = :user_id AND period_start >= (
+                        SELECT MIN(period_start) FROM (
+                            SELECT DISTINCT period_start FROM budget_periods
+                            WHERE user_id = :user_id
+                            ORDER BY period_start DESC
+                            LIMIT :periods
+                        )
+                    )
+                    ORDER BY period_start DESC, category_id
+                ''', {'user_id': user_id, 'periods': periods})
+            
+            rows = cursor.fetchall()
+            names = _category_names(conn, {row['category_id'] for row in rows})
+            history = []
+            for row in rows:
+                limit_amount = row['limit_amount']
+                spent_amount = row['spent_amount']
+                history.append({
+                    'category': names[row['category_id']],
+                    'period_start': row['period_start'],
+                    'limit': to_dollars(limit_amount),
+                    'spent': to_dollars(spent_amount),
+                    'remaining': to_dollars(limit_amount - spent_amount),
+                    'percentage': round((spent_amount / limit_amount * 100) if limit_amount > 0 else 0, 1),
+                    'status': "exceeded" if row['alert_level'] >= 100 else "warning" if row['alert_level'] >= 80 else "normal"
+                })
+            
+            return history
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving budget history: {e}")
+        raise
+
+def add_chat_message(user_id, role, content):
+    """Append one chat turn to a user's persisted history"""
+    try:
+        if role not in ('user', 'model'):
+            raise ValueError(f"Invalid chat role: {role}")
+        
+        with write_connection(user_id) as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO chat_messages (user_id, role, content)
+                VALUES (?, ?, ?)
+            ''', (user_id, role, content))
+            conn.commit()
+            return cursor.lastrowid
+    except (ValueError, sqlite3.Error) as e:
+        logger.error(f"Error adding chat message: {e}")
+        raise
+
+def get_chat_history(user_id):
+    """Get a user's rolling summary and remaining chat turns, oldest first"""
+    try:
+        with db_connection(user_id) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT summary FROM chat_summaries WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            summary = row['summary'] if row else None
+            
+            cursor.execute('''
+                SELECT role, content FROM chat_messages
+                WHERE user_id = ?
+                ORDER BY id
+            ''', (user_id,))
+            turns = [{"role": row['role'], "parts": [row['content']]} for row in cursor.fetchall()]
+            
+            return summary, turns
+    except sqlite3.Error as e:
+        logger.error(f"Error retrieving chat history: {e}")
+        raise
+
+def compact_chat_history(user_id, max_turns, keep_turns, summarize):
+    """Fold old chat turns into the user's rolling summary
+
+    Nothing happens until the user has more than ``max_turns`` turns; then
+    all but the newest ``keep_turns`` are passed to
+    ``summarize(previous_summary, dropped_turns)`` and deleted. Returns the
+    number of turns removed.
+    """
+    try:
+        with write_connection(user_id) as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('SELECT COUNT(*) FROM chat_messages WHERE user_id = ?', (user_id,))
+            if cursor.fetchone()[0] <= max_turns:
+                return 0
+            
+            cursor.execute('''
+                SELECT id, role, content FROM chat_messages
+                WHERE user_id = ?
+                ORDER BY id DESC
+                LIMIT -1 OFFSET ?
+            ''', (user_id, keep_turns))
+            dropped = cursor.fetchall()[::-1]
+            
+            cursor.execute('SELECT summary FROM chat_summaries WHERE user_id = ?', (user_id,))
+            row = cursor.fetchone()
+            summary = summarize(
+                row['summary'] if row else None,
+                [{"role": turn['role'], "parts": [turn['content']]} for turn in dropped]
+            )
+            
+            cursor.execute('''
+                DELETE FROM chat_messages WHERE user_id = ? AND id <= ?
+            ''', (user_id, dropped[-1]['id']))
+            cursor.execute('''
+                INSERT INTO chat_summaries (user_id, summary, updated_at)
+                VALUES (?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(user_id) DO UPDATE SET
+                summary = excluded.summary, updated_at = excluded.updated_at
+            ''', (user_id, summary))
+            
+            conn.commit()
+            return len(dropped)
+    except sqlite3.Error as e:
+        logger.error(f"Error compacting chat history: {e}")
+        raise
+
+def delete_chat_history(user_id=None, idle_seconds=None, shard_of=None):
+    """Delete one user's chat history, or every history idle for ``idle_seconds``
+
+    The idle sweep visits every shard unless ``shard_of`` names a user, in
+    which case only the database holding that user is swept; request paths
+    pass the current user so they never fan out across tenants.
+    """
+    def delete(conn):
+        cursor = conn.cursor()
+        
+        if user_id is not None:
+            users = [user_id]
+        else:
+            cursor.execute('''
+                SELECT user_id FROM chat_messages
+                GROUP BY user_id
+                HAVING MAX(created_at) < datetime('now', ?)
+            ''', (f'-{int(idle_seconds)} seconds',))
+            users = [row['user_id'] for row in cursor.fetchall()]
+        
+        for user in users:
+            cursor.execute('DELETE FROM chat_messages WHERE user_id = ?', (user,))
+            cursor.execute('DELETE FROM chat_summaries WHERE user_id = ?', (user,))
+        
+        conn.commit()
+        return len(users)
+    
+    try:
+        if user_id is None and idle_seconds is None:
+            raise ValueError("Either user_id or idle_seconds must be provided")
+        
+        if user_id is not None or shard_of is not None:
+            with write_connection(user_id if user_id is not None else shard_of) as conn:
+                return delete(conn)
+        return sum(map_shards(delete, write=True).values())
+    except (ValueError, sqlite3.Error) as e:
+        logger.error(f"Error deleting chat history: {e}")
+        raise
+
+# Seconds between last_used updates of one cache entry; LRU eviction does
+# not need finer timestamps, and hits within the interval then only read
+RESPONSE_CACHE_TOUCH_INTERVAL = 60
+
+# Hits counted since each entry's last_used was last written, per process;
+# keys of expired or evicted entries are dropped by the next read or store
+_pending_cache_hits = {}
+_pending_cache_hits_lock = threading.Lock()
+
+def get_cached_response(cache_key, ttl):
+    """Return a cached LLM response younger than ``ttl`` seconds, or None
+
+    A hit only takes the write lock to record itself when the entry's
+    last_used is older than RESPONSE_CACHE_TOUCH_INTERVAL; hit counts in
+    between are buffered and written with that update.
+    """
+    try:
+        now = time.time()
+        with db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT response, last_used FROM llm_response_cache
+                WHERE cache_key = ? AND created_at >= ?
+            ''', (cache_key, now - ttl))
+            row = cursor.fetchone()
+        
+        if row is None:
+            with _pending_cache_hits_lock:
+                _pending_cache_hits.pop(cache_key, None)
+            return None
+        
+        with _pending_cache_hits_lock:
+            hits = _pending_cache_hits.pop(cache_key, 0) + 1
+            if now - row['last_used'] < RESPONSE_CACHE_TOUCH_INTERVAL:
+                _pending_cache_hits[cache_key] = hits
+                return row['response']
+        
+        # Record the hits for LRU eviction
+        with write_connection() as conn:
+            conn.execute('''
+                UPDATE llm_response_cache
+                SET last_used = ?, hits = hits + ?
+                WHERE cache_key = ?
+            ''', (now, hits, cache_key))
+            conn.commit()
+        return row['response']
+    except sqlite3.Error as e:
+        logger.error(f"Error reading response cache: {e}")
+        raise
+
+def store_cached_response(cache_key, response, ttl, max_entries):
+    """Cache an LLM response, evicting expired and least recently used entries"""
+    try:
+        now = time.time()
+        with write_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                INSERT INTO llm_response_cache (cache_key, response, created_at, last_used, hits)
+                VALUES (?, ?, ?, ?, 0)
+                ON CONFLICT(cache_key) DO UPDATE SET
+                response = excluded.response, created_at = excluded.created_at,
+                last_used = excluded.last_used
+            ''', (cache_key, response, now, now))
+            
+            cursor.execute('DELETE FROM llm_response_cache WHERE created_at < ?', (now - ttl,))
+            evicted = cursor.rowcount
+            cursor.execute('''
+                DELETE FROM llm_response_cache WHERE cache_key IN (
+                    SELECT cache_key FROM llm_response_cache
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (max_entries,))
+            evicted += cursor.rowcount
+            
+            # Forget buffered hits of entries that no longer exist
+            if evicted:
+                with _pending_cache_hits_lock:
+                    pending = list(_pending_cache_hits)
+                if pending:
+                    placeholders = ','.join('?' * len(pending))
+                    cursor.execute(f'SELECT cache_key FROM llm_response_cache WHERE cache_key IN ({placeholders})',
+                                   pending)
+                    live = {row['cache_key'] for row in cursor.fetchall()}
+                    with _pending_cache_hits_lock:
+                        for key in pending:
+                            if key not in live:
+                                _pending_cache_hits.pop(key, None)
+            
+            conn.commit()
+            return evicted
+    except sqlite3.Error as e:
+        logger.error(f"Error writing response cache: {e}")
+        raise
+
 if __name__ == '__main__':
     init_db()
+    if 'rebuild-rollups' in sys.argv[1:]:
+        print(f"Rebuilt rollup: {rebuild_rollups()} day/category groups.")
+    if 'purge-chat-history' in sys.argv[1:]:
+        idle_seconds = int(os.getenv('CHAT_HISTORY_TTL', 6 * 3600))
+        print(f"Purged {delete_chat_history(idle_seconds=idle_seconds)} idle chat histories.")
+    if 'compact-notifications' in sys.argv[1:]:
+        result = compact_notifications()
+        print(f"Archived {result['archived']} read notifications, dropped {result['dropped']} archived ones.")
     print("Database initialized successfully.")
\ No newline at end of file
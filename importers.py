@@ -0,0 +1,158 @@
+import csv
+import io
+import re
+from datetime import datetime
+
+# Header names accepted for each expense field in CSV exports. 'direction'
+# is a DEBIT/CREDIT style column; 'credit' is a separate money-in column
+CSV_FIELD_ALIASES = {
+    'amount': ['amount', 'debit', 'value', 'sum'],
+    'credit': ['credit'],
+    'direction': ['type', 'transaction type', 'debit/credit', 'dr/cr', 'direction'],
+    'description': ['description', 'memo', 'payee', 'name', 'details', 'narrative'],
+    'category': ['category'],
+    'date': ['date', 'posted', 'transaction date', 'posting date']
+}
+
+# Values of a direction column that mark money coming in
+CREDIT_DIRECTIONS = {'credit', 'cr', 'c', 'deposit', 'income'}
+
+OFX_TAG_PATTERN = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<\r\n]*)')
+
+def _parse_amount(value):
+    """Parse '$1,234.50', '-12.00' or '(12.00)' style amounts, keeping the sign"""
+    if value is None:
+        return None
+    value = value.strip().replace('$', '').replace(',', '')
+    if not value:
+        return None
+    if value.startswith('(') and value.endswith(')'):
+        return -float(value[1:-1])
+    return float(value)
+
+def _parse_date(value):
+    """Convert common statement date formats to 'YYYY-MM-DD'
+
+    Unrecognized dates are returned unchanged, so bulk_add_expenses
+    rejects the row instead of filing it under today.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    for fmt in ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%m/%d/%Y', '%d.%m.%Y', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d')
+        except ValueError:
+            continue
+    return value
+
+def _is_csv_credit(row, columns, amount, signed):
+    """Whether a CSV row is money coming in (income, refunds) rather than spending
+
+    A direction column decides when present, then a separate credit column.
+    A single amount column only marks direction by sign when ``signed``,
+    i.e. the file has negative amounts; money going out is then negative,
+    as in OFX. Otherwise every amount is spending.
+    """
+    if 'direction' in columns:
+        return (row.get(columns['direction']) or '').strip().lower() in CREDIT_DIRECTIONS
+    if 'credit' in columns:
+        try:
+            return bool(_parse_amount(row.get(columns['credit'])))
+        except ValueError:
+            return False
+    return signed and amount is not None and amount > 0
+
+def _open_csv(binary_stream, encoding):
+    """Return (text stream, DictReader, {field: header}) with headers matched against CSV_FIELD_ALIASES"""
+    text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+    reader = csv.DictReader(text_stream)
+    columns = {}
+    normalized = {name.strip().lower(): name for name in reader.fieldnames or () if name}
+    for field, aliases in CSV_FIELD_ALIASES.items():
+        for alias in aliases:
+            if alias in normalized:
+                columns[field] = normalized[alias]
+                break
+    return text_stream, reader, columns
+
+def _has_negative_amounts(reader, column):
+    for row in reader:
+        try:
+            amount = _parse_amount(row.get(column))
+        except ValueError:
+            continue
+        if amount is not None and amount < 0:
+            return True
+    return False
+
+def iter_csv_expenses(binary_stream, encoding='utf-8-sig'):
+    """Yield expense dicts from a CSV upload one row at a time
+
+    The header row is matched against CSV_FIELD_ALIASES, so exports that call
+    the description column 'Memo' or 'Payee' still import. Credit rows are
+    yielded with ``credit`` set, like in iter_ofx_expenses, so
+    bulk_add_expenses counts them as skipped; see _is_csv_credit. When
+    only the amount's sign can tell credits apart, a seekable upload is
+    read once up front to see whether it has any negative amounts.
+    """
+    start = binary_stream.tell() if binary_stream.seekable() else None
+    text_stream, reader, columns = _open_csv(binary_stream, encoding)
+    if not reader.fieldnames:
+        return
+
+    signed = False
+    if start is not None and 'amount' in columns and not {'direction', 'credit'} & columns.keys():
+        signed = _has_negative_amounts(reader, columns['amount'])
+        text_stream.detach()
+        binary_stream.seek(start)
+        text_stream, reader, columns = _open_csv(binary_stream, encoding)
+
+    for row in reader:
+        try:
+            amount = _parse_amount(row.get(columns.get('amount')))
+        except ValueError:
+            amount = None
+        yield {
+            'amount': abs(amount) if amount is not None else None,
+            'description': row.get(columns.get('description')),
+            'category': row.get(columns.get('category')) if 'category' in columns else None,
+            'date': _parse_date(row.get(columns.get('date'))),
+            'credit': _is_csv_credit(row, columns, amount, signed)
+        }
+
+def iter_ofx_expenses(binary_stream, encoding='latin-1'):
+    """Yield transactions from an OFX (SGML or XML) statement line by line, credits marked ``credit``"""
+    text_stream = io.TextIOWrapper(binary_stream, encoding=encoding, newline='')
+    transaction = None
+
+    for line in text_stream:
+        for closing, tag, value in OFX_TAG_PATTERN.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    transaction = {}
+                elif transaction is not None:
+                    expense = _ofx_transaction_to_expense(transaction)
+                    if expense:
+                        yield expense
+                    transaction = None
+            elif transaction is not None and not closing:
+                transaction[tag] = value.strip()
+
+def _ofx_transaction_to_expense(transaction):
+    """Map an OFX STMTTRN block to an expense dict; credits (positive amounts) are marked ``credit``"""
+    try:
+        amount = float(transaction.get('TRNAMT', '0').replace(',', '.'))
+    except ValueError:
+        return None
+
+    description = transaction.get('NAME') or transaction.get('MEMO') or transaction.get('PAYEE')
+    posted = transaction.get('DTPOSTED', '')[:8]
+    return {
+        'amount': abs(amount),
+        'description': description,
+        'category': None,
+        'date': _parse_date(posted),
+        'credit': amount > 0
+    }
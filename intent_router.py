@@ -0,0 +1,169 @@
+import re
+import threading
+
+import database
+
+# Money amount such as "45", "$1,250.50" or "12.5"
+AMOUNT = r'\$?\s*(?P<amount>\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)(?:\s*(?:dollars|usd|bucks))?'
+# Optional polite or first-person lead-in before the command verb
+LEAD = r'(?:(?:please|hey|ok|okay)[, ]+)?(?:can you\s+)?(?:i\s+(?:just\s+)?)?'
+CATEGORY = r'(?P<category>[a-z][a-z &-]{0,30}?)'
+DATE = r'(?P<deadline>\d{4}-\d{2}-\d{2})'
+
+# Ordered grammars: the first pattern that matches the whole message wins
+GRAMMARS = [
+    ('add_savings_goal', [
+        rf'^{LEAD}(?:add|create|set up|set|start|new)\s+(?:a\s+)?(?:new\s+)?savings?\s+goal\s+(?:called\s+|named\s+|for\s+)?(?P<name>.+?)\s+(?:of|for|to|at)\s+{AMOUNT}(?:\s+by\s+{DATE})?$',
+        rf'^{LEAD}(?:want to\s+)?save\s+{AMOUNT}\s+for\s+(?:a\s+|an\s+|my\s+)?(?P<name>.+?)(?:\s+by\s+{DATE})?$',
+    ]),
+    ('update_savings_goal', [
+        rf'^{LEAD}(?:add|put|deposit|saved|moved)\s+{AMOUNT}\s+(?:to|into|in|towards?|for)\s+(?:my\s+|the\s+)?(?P<name>.+?)\s+(?:savings\s+)?(?:goal|fund|savings)$',
+        rf'^{LEAD}(?P<set>update|set)\s+(?:my\s+|the\s+)?(?P<name>.+?)\s+(?:savings\s+)?goal\s+(?:savings\s+|progress\s+)?to\s+{AMOUNT}$',
+    ]),
+    ('set_budget', [
+        rf'^{LEAD}(?:set|change|update|make)\s+(?:a\s+|my\s+|the\s+)?budget\s+(?:for|on)\s+{CATEGORY}\s+(?:to|at|=)\s+{AMOUNT}$',
+        rf'^{LEAD}(?:set|change|update|make)\s+(?:a\s+|my\s+|the\s+)?{CATEGORY}\s+budget\s+(?:to|at|=)\s+{AMOUNT}$',
+    ]),
+    ('show_budget', [
+        rf'^(?:what(?:\'s|\s+is)|show(?:\s+me)?|check|how(?:\'s|\s+is))\s+(?:my\s+|the\s+)?budgets?(?:\s+(?:for|on)\s+{CATEGORY})?$',
+        rf'^(?:what(?:\'s|\s+is)|show(?:\s+me)?|check|how(?:\'s|\s+is))\s+(?:my\s+|the\s+)?{CATEGORY}\s+budget$',
+        rf'^how\s+much\s+(?:budget\s+)?(?:do\s+i\s+have\s+)?(?:is\s+)?left\s+(?:in|for|on)\s+(?:my\s+)?{CATEGORY}(?:\s+budget)?$',
+    ]),
+    ('list_expenses', [
+        rf'^(?:show|list|display|what\s+are|see)\s+(?:me\s+)?(?:my\s+)?(?:the\s+)?(?:(?:last|latest|recent)\s+(?:(?P<count>\d{{1,3}})\s+)?)?expenses(?:\s+(?:for|in|on)\s+{CATEGORY})?$',
+    ]),
+    ('read_notifications', [
+        r'^(?:show|read|check|list|any|see|what\s+are)\s+(?:me\s+)?(?:my\s+)?(?:new\s+|unread\s+)?(?:notifications|alerts)$',
+    ]),
+    ('add_expense', [
+        rf'^{LEAD}(?:add(?:ed)?|spent|paid|log(?:ged)?|record(?:ed)?)\s+(?:an?\s+expense\s+of\s+)?{AMOUNT}\s+(?:for|on|at)\s+(?P<description>.+)$',
+        rf'^{LEAD}(?:bought|purchased|paid for|got)\s+(?P<description>.+?)\s+for\s+{AMOUNT}$',
+    ]),
+]
+
+def normalize_message(message):
+    """Lower-case, collapse whitespace and drop trailing punctuation"""
+    return ' '.join(message.lower().split()).rstrip('?!. ')
+
+def _amount(groups):
+    return float(groups['amount'].replace(',', ''))
+
+class IntentRouter:
+    """Answers well-formed finance commands locally before they reach the LLM
+
+    Each intent has a few anchored regex grammars compiled once. ``match``
+    only parses; ``dispatch`` also runs the matching handler against
+    database.py and returns the reply text.
+    """
+
+    def __init__(self, grammars=GRAMMARS):
+        self._routes = [
+            (intent, [re.compile(pattern) for pattern in patterns])
+            for intent, patterns in grammars
+        ]
+        self._lock = threading.Lock()
+        self._stats = {'routed': 0, 'fallthrough': 0}
+
+    def match(self, message):
+        """Return (intent, params) for a command message, or None"""
+        text = normalize_message(message)
+        for intent, patterns in self._routes:
+            for pattern in patterns:
+                found = pattern.match(text)
+                if found:
+                    params = {key: value.strip() if isinstance(value, str) else value
+                              for key, value in found.groupdict().items()}
+                    return intent, params
+        return None
+
+    def dispatch(self, message, user_id=database.DEFAULT_USER_ID):
+        """Handle a command message for ``user_id`` locally, returning (intent, reply) or None"""
+        matched = self.match(message)
+        with self._lock:
+            self._stats['routed' if matched else 'fallthrough'] += 1
+        if not matched:
+            return None
+
+        intent, params = matched
+        try:
+            return intent, getattr(self, f'_handle_{intent}')(params, user_id)
+        except ValueError as e:
+            return intent, f"I couldn't do that: {e}"
+
+    def stats(self):
+        """Return how many messages were answered locally vs. sent to the LLM"""
+        with self._lock:
+            stats = dict(self._stats)
+        total = stats['routed'] + stats['fallthrough']
+        stats['local_fraction'] = round(stats['routed'] / total, 3) if total else 0.0
+        return stats
+
+    def _handle_add_expense(self, params, user_id):
+        amount = _amount(params)
+        description = params['description']
+        category_id = database.categorize_expense(description)
+        database.add_expense(amount, description, category_id, user_id=user_id)
+        category = database.category_name(category_id, user_id=user_id)
+        return (f"I've added your expense of ${amount:.2f} for {description} in the "
+                f"{category.capitalize()} category. You can view your spending breakdown in the dashboard.")
+
+    def _handle_set_budget(self, params, user_id):
+        amount = _amount(params)
+        database.set_budget(params['category'], amount, user_id=user_id)
+        return f"I've set your budget for {params['category']} to ${amount:.2f}."
+
+    def _handle_show_budget(self, params, user_id):
+        category = params.get('category')
+        if category:
+            insight = database.get_budget_insights(category, user_id=user_id)
+            if 'message' in insight:
+                return insight['message']
+            return (f"Your {insight['category']} budget is ${insight['limit_amount']:.2f}. "
+                    f"You've spent ${insight['spent_amount']:.2f} ({insight['percentage']}%), "
+                    f"leaving ${insight['remaining']:.2f}. {insight['advice']}")
+
+        overview = database.get_budget_overview(user_id=user_id)
+        lines = [f"- {row['category'].capitalize()}: ${row['spent']:.2f} of ${row['limit']:.2f} ({row['percentage']}%)"
+                 for row in overview['categories']]
+        summary = overview['summary']
+        lines.append(f"Total: ${summary['total_spent']:.2f} of ${summary['total_limit']:.2f} ({summary['overall_percentage']}%)")
+        return "Here's your budget overview:\n" + '\n'.join(lines)
+
+    def _handle_list_expenses(self, params, user_id):
+        limit = int(params['count']) if params.get('count') else 5
+        result = database.get_all_expenses(limit=limit, category=params.get('category'), include_total=False,
+                                           user_id=user_id)
+        if not result['expenses']:
+            return "You don't have any expenses recorded yet."
+        lines = [f"- {expense['formatted_date']}: ${expense['amount']:.2f} for {expense['description']} ({expense['category']})"
+                 for expense in result['expenses']]
+        return "Here are your most recent expenses:\n" + '\n'.join(lines)
+
+    def _handle_add_savings_goal(self, params, user_id):
+        amount = _amount(params)
+        database.add_savings_goal(params['name'], amount, params.get('deadline'), user_id=user_id)
+        deadline = f" by {params['deadline']}" if params.get('deadline') else ""
+        return f"I've created a savings goal '{params['name']}' for ${amount:.2f}{deadline}."
+
+    def _handle_update_savings_goal(self, params, user_id):
+        amount = _amount(params)
+        goals = database.get_savings_goals(user_id=user_id)
+        goal = next((goal for goal in goals if goal['name'].lower() == params['name']), None)
+        if goal is None:
+            raise ValueError(f"no savings goal named '{params['name']}'")
+
+        # "add $X to goal" is a deposit; "set goal to $X" replaces the saved amount
+        current = amount if params.get('set') else goal['current_savings'] + amount
+        database.update_savings_goal(goal_id=goal['id'], current_savings=current, user_id=user_id)
+        progress = round(current / goal['target_amount'] * 100, 1) if goal['target_amount'] else 0
+        return (f"Your '{goal['name']}' goal now has ${current:.2f} saved of "
+                f"${goal['target_amount']:.2f} ({progress}%).")
+
+    def _handle_read_notifications(self, params, user_id):
+        notifications = database.get_notifications(limit=10, user_id=user_id)
+        if not notifications:
+            return "You have no new notifications."
+        for notification in notifications:
+            database.mark_notification_read(notification['id'], user_id=user_id)
+        lines = [f"- {notification['formatted_date']}: {notification['message']}" for notification in notifications]
+        return "Here are your notifications:\n" + '\n'.join(lines)
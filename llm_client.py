@@ -0,0 +1,385 @@
+import hashlib
+import logging
+import os
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+import database
+from metrics import REGISTRY, record_request_time
+from chat_store import build_history_window, estimate_tokens, turn_tokens
+
+logger = logging.getLogger('llm_client')
+
+# Upper bound on Gemini calls in flight across all request threads
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '8'))
+
+# Seconds to wait for a free LLM slot, for the first chunk and for the whole reply
+LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', '5'))
+LLM_FIRST_CHUNK_TIMEOUT = float(os.getenv('LLM_FIRST_CHUNK_TIMEOUT', '20'))
+LLM_TOTAL_TIMEOUT = float(os.getenv('LLM_TOTAL_TIMEOUT', '90'))
+
+# Timed-out calls whose worker may still be stuck in the model call after
+# their slot was handed to the next request
+LLM_MAX_ABANDONED = int(os.getenv('LLM_MAX_ABANDONED', '4'))
+
+# Estimated prompt tokens a live chat session may grow to before it is rebuilt
+CHAT_TOKEN_BUDGET = int(os.getenv('CHAT_TOKEN_BUDGET', '6000'))
+
+# Seconds an unused chat session is kept alive
+CHAT_SESSION_IDLE_TIMEOUT = float(os.getenv('CHAT_SESSION_IDLE_TIMEOUT', '900'))
+
+class LLMError(Exception):
+    """Raised when a completion cannot be produced"""
+
+class LLMBusyError(LLMError):
+    """Raised when every LLM slot is taken for longer than the queue timeout"""
+
+class LLMTimeoutError(LLMError):
+    """Raised when the model stops producing output within the timeouts"""
+
+_DONE = object()
+
+class LLMClient:
+    """Runs blocking model calls on a bounded thread pool and streams their output
+
+    Request threads only wait on a queue of text chunks, with timeouts, so a
+    slow completion is cut off instead of holding its worker indefinitely,
+    and at most ``max_concurrency`` completions run at once. Model calls
+    also carry a transport timeout of ``total_timeout`` so their workers
+    exit. Until they do, up to ``max_abandoned`` timed-out calls give their
+    slot to the next request early; beyond that they keep it.
+    """
+
+    def __init__(self, model, max_concurrency=LLM_MAX_CONCURRENCY, queue_timeout=LLM_QUEUE_TIMEOUT,
+                 first_chunk_timeout=LLM_FIRST_CHUNK_TIMEOUT, total_timeout=LLM_TOTAL_TIMEOUT,
+                 max_abandoned=LLM_MAX_ABANDONED):
+        self.model = model
+        self.queue_timeout = queue_timeout
+        self.first_chunk_timeout = first_chunk_timeout
+        self.total_timeout = total_timeout
+        self.max_abandoned = max_abandoned
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._slot_lock = threading.Lock()
+        self._abandoned = 0
+        # Abandoned workers still occupy a thread, so leave room for them
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency + max_abandoned, thread_name_prefix='llm')
+
+    @property
+    def request_options(self):
+        """Transport options for the SDK so a hung call fails instead of blocking its worker"""
+        return {'timeout': self.total_timeout}
+
+    def _release_slot(self, job, abandon=False):
+        """Give back a call's slot exactly once
+
+        The worker calls this when it exits. A waiter that gave up on the
+        call passes ``abandon`` to release the slot before the worker is done,
+        which is allowed for at most ``max_abandoned`` calls at a time.
+        """
+        with self._slot_lock:
+            if job['state'] == 'running':
+                if abandon:
+                    if self._abandoned >= self.max_abandoned:
+                        return
+                    self._abandoned += 1
+                    job['state'] = 'abandoned'
+                else:
+                    job['state'] = 'done'
+            elif job['state'] == 'abandoned' and not abandon:
+                self._abandoned -= 1
+                job['state'] = 'done'
+                return
+            else:
+                return
+        self._slots.release()
+
+    def _run(self, call, chunks, cancelled, job):
+        """Worker body: push each chunk's text onto the queue, then a sentinel"""
+        try:
+            for chunk in call():
+                if cancelled.is_set():
+                    break
+                text = getattr(chunk, 'text', '')
+                if text:
+                    chunks.put(text)
+        except Exception as e:
+            chunks.put(LLMError(str(e)))
+        finally:
+            chunks.put(_DONE)
+            self._release_slot(job)
+
+    def _stream(self, call):
+        started = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            record_request_time('llm', time.perf_counter() - started)
+            raise LLMBusyError("All LLM slots are busy")
+
+        chunks = queue.Queue()
+        cancelled = threading.Event()
+        job = {'state': 'running'}
+        try:
+            self._executor.submit(self._run, call, chunks, cancelled, job)
+        except Exception:
+            self._slots.release()
+            raise
+
+        deadline = time.monotonic() + self.total_timeout
+        timeout = self.first_chunk_timeout
+        # Only time spent waiting on the model counts, not the caller's work between chunks
+        waited = time.perf_counter() - started
+        try:
+            while True:
+                remaining = deadline - time.monotonic()
+                wait_started = time.perf_counter()
+                try:
+                    item = chunks.get(timeout=max(0, min(timeout, remaining)))
+                except queue.Empty:
+                    raise LLMTimeoutError("The model did not respond in time")
+                finally:
+                    waited += time.perf_counter() - wait_started
+                if item is _DONE:
+                    return
+                if isinstance(item, LLMError):
+                    raise item
+                timeout = self.total_timeout
+                yield item
+        finally:
+            # Lets the worker stop early if the client went away, and frees
+            # the slot if it is still stuck waiting on the model
+            cancelled.set()
+            self._release_slot(job, abandon=True)
+            record_request_time('llm', waited)
+
+    def stream_generate(self, contents):
+        """Stream a one-shot completion for ``contents``"""
+        return self._stream(lambda: self.model.generate_content(
+            contents, stream=True, request_options=self.request_options))
+
+    def stream_chat(self, history, message):
+        """Stream the reply to ``message`` in a chat seeded with ``history``"""
+        def call():
+            convo = self.model.start_chat(history=history)
+            return convo.send_message(message, stream=True, request_options=self.request_options)
+        return self._stream(call)
+
+    def stream_session(self, session, message):
+        """Stream the reply to ``message`` on an existing chat session"""
+        return self._stream(lambda: session.send_message(
+            message, stream=True, request_options=self.request_options))
+
+    def generate(self, contents):
+        """Blocking one-shot completion, still bounded by the client's limits"""
+        return ''.join(self.stream_generate(contents))
+
+    def chat(self, history, message):
+        """Blocking chat reply, still bounded by the client's limits"""
+        return ''.join(self.stream_chat(history, message))
+
+class ChatSessionCache:
+    """Keeps one live chat session per user so each turn only sends the new message
+
+    A session is built from a token-budgeted window over the stored history
+    (system prompt, rolling summary, recent turns) and reused until it
+    would exceed ``token_budget``, goes idle for ``idle_timeout`` seconds or
+    is invalidated. Sessions are checked out while a reply is streaming, so
+    two concurrent messages from one user never share a session.
+    """
+
+    def __init__(self, llm, system_prompt, token_budget=CHAT_TOKEN_BUDGET,
+                 idle_timeout=CHAT_SESSION_IDLE_TIMEOUT, max_sessions=1000):
+        self.llm = llm
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._sessions = {}  # user_id -> {'session', 'tokens', 'last_used'}
+        self._stats = {'reused': 0, 'rebuilt': 0, 'turns': 0, 'prompt_tokens': 0, 'max_prompt_tokens': 0}
+
+    def _checkout(self, user_id):
+        """Remove and return a live session entry, evicting idle ones first"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [key for key, entry in self._sessions.items() if now - entry['last_used'] > self.idle_timeout]
+            for key in idle:
+                del self._sessions[key]
+            return self._sessions.pop(user_id, None)
+
+    def _checkin(self, user_id, entry):
+        entry['last_used'] = time.monotonic()
+        with self._lock:
+            if user_id in self._sessions or len(self._sessions) < self.max_sessions:
+                self._sessions[user_id] = entry
+
+    def invalidate(self, user_id):
+        """Drop a user's session, e.g. after turns were added outside the LLM"""
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def stream_reply(self, user_id, load_history, message):
+        """Stream the reply to ``message``, calling ``load_history()`` only to rebuild"""
+        message_tokens = estimate_tokens(message)
+        entry = self._checkout(user_id)
+
+        if entry is None or entry['tokens'] + message_tokens > self.token_budget:
+            # Fill only half the budget so the session has room to grow before the next rebuild
+            window = build_history_window(self.system_prompt, load_history(), self.token_budget // 2)
+            entry = {
+                'session': self.llm.model.start_chat(history=window),
+                'tokens': sum(turn_tokens(turn) for turn in window)
+            }
+            outcome = 'rebuilt'
+        else:
+            outcome = 'reused'
+
+        prompt_tokens = entry['tokens'] + message_tokens
+        with self._lock:
+            self._stats[outcome] += 1
+            self._stats['turns'] += 1
+            self._stats['prompt_tokens'] += prompt_tokens
+            self._stats['max_prompt_tokens'] = max(self._stats['max_prompt_tokens'], prompt_tokens)
+        logger.debug(f"Chat turn for {user_id}: ~{prompt_tokens} prompt tokens (session {outcome})")
+
+        parts = []
+        for chunk in self.llm.stream_session(entry['session'], message):
+            parts.append(chunk)
+            yield chunk
+
+        # Only a session whose reply completed is safe to reuse
+        entry['tokens'] = prompt_tokens + estimate_tokens(''.join(parts))
+        self._checkin(user_id, entry)
+
+    def stats(self):
+        """Return session reuse counts and prompt size per turn"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['live_sessions'] = len(self._sessions)
+        stats['avg_prompt_tokens'] = round(stats['prompt_tokens'] / stats['turns']) if stats['turns'] else 0
+        return stats
+
+class _FakeChunk:
+    def __init__(self, text):
+        self.text = text
+
+class _FakeResponse:
+    """Iterable like a streamed Gemini response, with .text like a blocking one"""
+
+    def __init__(self, words, delay):
+        self._words = words
+        self._delay = delay
+        self.text = ''.join(words)
+
+    def __iter__(self):
+        for word in self._words:
+            if self._delay:
+                time.sleep(self._delay)
+            yield _FakeChunk(word)
+
+class _FakeChat:
+    def __init__(self, model, history):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, message, stream=False, request_options=None):
+        response = self.model.generate_content(message, stream=stream, request_options=request_options)
+        self.history.append({"role": "user", "parts": [message]})
+        self.history.append({"role": "model", "parts": [response.text]})
+        return response
+
+class FakeModel:
+    """Local stand-in for the Gemini model, selected with LLM_BACKEND=fake
+
+    Replies echo the prompt word by word with ``chunk_delay`` seconds between
+    chunks, which is enough to exercise streaming, timeouts and concurrency
+    limits without network access.
+    """
+
+    def __init__(self, reply=None, chunk_delay=0.05):
+        self.reply = reply
+        self.chunk_delay = chunk_delay
+
+    def generate_content(self, contents, stream=False, request_options=None):
+        if isinstance(contents, (list, tuple)):
+            prompt = str(contents[-1])
+        else:
+            prompt = str(contents)
+        text = self.reply or f"(fake model) You said: {prompt}"
+        words = [word + ' ' for word in text.split(' ')]
+        words[-1] = words[-1].rstrip()
+        return _FakeResponse(words, self.chunk_delay if stream else 0)
+
+    def start_chat(self, history=None):
+        return _FakeChat(self, history)
+
+# Live response caches, exported on /metrics by namespace
+_response_caches = weakref.WeakSet()
+
+class ResponseCache:
+    """Persistent cache of LLM responses keyed by a hash of the prompt
+
+    Entries live in the llm_response_cache table so they survive restarts
+    and are shared by all workers; ``ttl`` and ``max_entries`` bound their
+    age and number. Hit/miss counters are kept per process and exported
+    on /metrics.
+    """
+
+    def __init__(self, namespace, ttl=24 * 3600, max_entries=500):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'errors': 0}
+        _response_caches.add(self)
+
+    def key(self, contents):
+        """Fingerprint a prompt (string or list of strings)"""
+        if isinstance(contents, (list, tuple)):
+            contents = '\x1e'.join(str(part) for part in contents)
+        digest = hashlib.sha256(contents.encode('utf-8')).hexdigest()
+        return f"{self.namespace}:{digest}"
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_or_generate(self, contents, generate):
+        """Return the cached response for ``contents`` or call ``generate(contents)`` and cache it"""
+        cache_key = self.key(contents)
+        try:
+            cached = database.get_cached_response(cache_key, self.ttl)
+        except Exception:
+            cached = None
+            self._count('errors')
+        if cached is not None:
+            self._count('hits')
+            return cached
+
+        self._count('misses')
+        response = generate(contents)
+        try:
+            database.store_cached_response(cache_key, response, self.ttl, self.max_entries)
+        except Exception:
+            self._count('errors')
+        return response
+
+    def stats(self):
+        """Return hit/miss counters and the hit rate"""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 3) if lookups else 0.0
+        return stats
+
+def _collect_response_cache_metrics():
+    stats = {cache.namespace: cache.stats() for cache in list(_response_caches)}
+    yield ('aiwealth_llm_response_cache_requests_total', 'counter', 'Response cache lookups by outcome',
+           ('namespace', 'outcome'), {(namespace, outcome): cache_stats[outcome]
+                                      for namespace, cache_stats in stats.items()
+                                      for outcome in ('hits', 'misses', 'errors')})
+    yield ('aiwealth_llm_response_cache_hit_ratio', 'gauge', 'Share of response cache lookups served from the cache',
+           ('namespace',), {(namespace,): cache_stats['hit_rate'] for namespace, cache_stats in stats.items()})
+
+REGISTRY.add_collector(_collect_response_cache_metrics)
@@ -0,0 +1,106 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, request
+
+from metrics import REGISTRY, start_request_timings
+
+logger = logging.getLogger('aiwealth.requests')
+
+# Set REQUEST_LOG=0 to keep the metrics but drop the per-request JSON log line
+REQUEST_LOG = os.getenv('REQUEST_LOG', '1') != '0'
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    'aiwealth_http_request_seconds', 'Request latency until the response body was sent', ['route', 'method'])
+REQUEST_DB_SECONDS = REGISTRY.histogram(
+    'aiwealth_http_request_db_seconds', 'Time per request spent inside SQLite', ['route'])
+REQUEST_LLM_SECONDS = REGISTRY.histogram(
+    'aiwealth_http_request_llm_seconds', 'Time per request spent waiting on the LLM', ['route'])
+REQUESTS_IN_FLIGHT = REGISTRY.gauge(
+    'aiwealth_http_requests_in_flight', 'Requests currently being handled', ['route'])
+RESPONSES = REGISTRY.counter(
+    'aiwealth_http_responses_total', 'Responses by status code', ['route', 'method', 'status'])
+
+def start_log_queue():
+    """Move the root logger's handlers behind a queue drained by a background thread
+
+    Request threads then only enqueue records; formatting and the blocking
+    stream writes happen on the listener thread. Returns the listener, or
+    None if the root logger is already queued or has no handlers.
+    """
+    root = logging.getLogger()
+    if not root.handlers or any(isinstance(handler, QueueHandler) for handler in root.handlers):
+        return None
+
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [QueueHandler(log_queue)]
+    listener.start()
+    # Flush what is still queued when the process exits
+    atexit.register(listener.stop)
+    return listener
+
+class RequestMetrics:
+    """Per-route latency, in-flight, status and DB/LLM time for every request
+
+    Routes are labelled by their URL rule (``/delete_expense/<int:expense_id>``)
+    so the label set stays bounded. Timings are recorded when the response is
+    closed, so streamed replies such as /chat/stream are measured until their
+    last chunk was sent. Each request also produces one JSON log line on the
+    ``aiwealth.requests`` logger unless ``log_requests`` is off.
+    """
+
+    def __init__(self, app=None, log_requests=REQUEST_LOG):
+        self.log_requests = log_requests
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+
+    def _start_request(self):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUESTS_IN_FLIGHT.inc(route=route)
+        g.request_metrics = (route, time.perf_counter(), start_request_timings())
+
+    def _finish_request(self, response):
+        state = g.pop('request_metrics', None)
+        if state is None:
+            return response
+
+        route, started, timings = state
+        method = request.method
+        path = request.path
+        status = response.status_code
+
+        def record():
+            duration = time.perf_counter() - started
+            REQUESTS_IN_FLIGHT.dec(route=route)
+            REQUEST_SECONDS.observe(duration, route=route, method=method)
+            RESPONSES.inc(route=route, method=method, status=status)
+            db_seconds = timings.seconds.get('db', 0.0)
+            llm_seconds = timings.seconds.get('llm', 0.0)
+            REQUEST_DB_SECONDS.observe(db_seconds, route=route)
+            if 'llm' in timings.seconds:
+                REQUEST_LLM_SECONDS.observe(llm_seconds, route=route)
+
+            if self.log_requests and logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({
+                    'method': method,
+                    'route': route,
+                    'path': path,
+                    'status': status,
+                    'duration_ms': round(duration * 1000, 2),
+                    'db_ms': round(db_seconds * 1000, 2),
+                    'db_queries': timings.counts.get('db', 0),
+                    'llm_ms': round(llm_seconds * 1000, 2),
+                }))
+
+        response.call_on_close(record)
+        return response
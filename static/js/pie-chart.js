@@ -0,0 +1,163 @@
+// Small canvas pie chart with a legend and hover tooltip, replacing the
+// full Chart.js bundle for the dashboard's single expense breakdown.
+//
+//   const chart = new PieChart(canvas, { labels, data, colors, formatTooltip });
+//   chart.setData(labels, data, colors);
+(function() {
+    const LEGEND_ROW_HEIGHT = 22;
+    const LEGEND_SWATCH = 12;
+    const FONT = '12px -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto, sans-serif';
+
+    class PieChart {
+        constructor(canvas, options) {
+            this.canvas = canvas;
+            this.context = canvas.getContext('2d');
+            this.formatTooltip = options.formatTooltip || ((label, value) => `${label}: ${value}`);
+            this.hoverIndex = -1;
+            this.slices = [];
+            this.setData(options.labels, options.data, options.colors);
+
+            canvas.addEventListener('mousemove', event => this.onHover(event));
+            canvas.addEventListener('mouseleave', () => this.setHover(-1));
+            window.addEventListener('resize', () => this.draw());
+        }
+
+        setData(labels, data, colors) {
+            this.labels = labels;
+            this.data = data;
+            this.colors = colors;
+            this.hoverIndex = -1;
+            this.draw();
+        }
+
+        resize() {
+            const ratio = window.devicePixelRatio || 1;
+            const width = this.canvas.parentElement.clientWidth;
+            const height = this.canvas.parentElement.clientHeight;
+            this.canvas.style.width = `${width}px`;
+            this.canvas.style.height = `${height}px`;
+            this.canvas.width = Math.round(width * ratio);
+            this.canvas.height = Math.round(height * ratio);
+            this.context.setTransform(ratio, 0, 0, ratio, 0, 0);
+            return { width, height };
+        }
+
+        layoutLegend(width) {
+            // Lay legend items out in centred rows below the pie
+            const ctx = this.context;
+            ctx.font = FONT;
+            const rows = [[]];
+            let rowWidth = 0;
+            this.labels.forEach((label, index) => {
+                const itemWidth = LEGEND_SWATCH + 6 + ctx.measureText(label).width + 16;
+                if (rowWidth + itemWidth > width && rows[rows.length - 1].length) {
+                    rows.push([]);
+                    rowWidth = 0;
+                }
+                rows[rows.length - 1].push({ label, index, width: itemWidth });
+                rowWidth += itemWidth;
+            });
+            return rows;
+        }
+
+        draw() {
+            const { width, height } = this.resize();
+            const ctx = this.context;
+            ctx.clearRect(0, 0, width, height);
+
+            const legendRows = this.layoutLegend(width);
+            const legendHeight = legendRows.length * LEGEND_ROW_HEIGHT + 10;
+            const total = this.data.reduce((a, b) => a + b, 0);
+
+            this.centerX = width / 2;
+            this.centerY = (height - legendHeight) / 2;
+            this.radius = Math.max(0, Math.min(width, height - legendHeight) / 2 - 10);
+
+            // Slices start at 12 o'clock and run clockwise
+            let angle = -Math.PI / 2;
+            this.slices = this.data.map((value, index) => {
+                const sweep = total ? (value / total) * Math.PI * 2 : 0;
+                const slice = { start: angle, end: angle + sweep, index };
+                angle += sweep;
+                return slice;
+            });
+
+            this.slices.forEach(slice => {
+                const grow = slice.index === this.hoverIndex ? 6 : 0;
+                ctx.beginPath();
+                ctx.moveTo(this.centerX, this.centerY);
+                ctx.arc(this.centerX, this.centerY, this.radius + grow, slice.start, slice.end);
+                ctx.closePath();
+                ctx.fillStyle = this.colors[slice.index];
+                ctx.fill();
+                ctx.strokeStyle = '#ffffff';
+                ctx.lineWidth = 1;
+                ctx.stroke();
+            });
+
+            ctx.font = FONT;
+            ctx.textBaseline = 'middle';
+            legendRows.forEach((row, rowIndex) => {
+                const rowWidth = row.reduce((sum, item) => sum + item.width, 0);
+                let x = (width - rowWidth) / 2;
+                const y = height - legendHeight + 10 + rowIndex * LEGEND_ROW_HEIGHT + LEGEND_ROW_HEIGHT / 2;
+                row.forEach(item => {
+                    ctx.fillStyle = this.colors[item.index];
+                    ctx.fillRect(x, y - LEGEND_SWATCH / 2, LEGEND_SWATCH, LEGEND_SWATCH);
+                    ctx.fillStyle = '#666';
+                    ctx.fillText(item.label, x + LEGEND_SWATCH + 6, y);
+                    x += item.width;
+                });
+            });
+
+            if (this.hoverIndex >= 0) {
+                this.drawTooltip(this.hoverIndex, total);
+            }
+        }
+
+        drawTooltip(index, total) {
+            const ctx = this.context;
+            const slice = this.slices[index];
+            const middle = (slice.start + slice.end) / 2;
+            const text = this.formatTooltip(this.labels[index], this.data[index], total);
+            const x = this.centerX + Math.cos(middle) * this.radius * 0.6;
+            const y = this.centerY + Math.sin(middle) * this.radius * 0.6;
+
+            ctx.font = FONT;
+            const boxWidth = ctx.measureText(text).width + 16;
+            const boxX = Math.min(Math.max(4, x - boxWidth / 2), this.canvas.clientWidth - boxWidth - 4);
+            ctx.fillStyle = 'rgba(0, 0, 0, 0.8)';
+            ctx.fillRect(boxX, y - 14, boxWidth, 28);
+            ctx.fillStyle = '#ffffff';
+            ctx.textBaseline = 'middle';
+            ctx.fillText(text, boxX + 8, y);
+        }
+
+        onHover(event) {
+            const rect = this.canvas.getBoundingClientRect();
+            const dx = event.clientX - rect.left - this.centerX;
+            const dy = event.clientY - rect.top - this.centerY;
+            if (Math.hypot(dx, dy) > this.radius) {
+                this.setHover(-1);
+                return;
+            }
+
+            // Normalise to the same [-PI/2, 3PI/2) range the slices use
+            let angle = Math.atan2(dy, dx);
+            if (angle < -Math.PI / 2) {
+                angle += Math.PI * 2;
+            }
+            const slice = this.slices.find(s => angle >= s.start && angle < s.end);
+            this.setHover(slice ? slice.index : -1);
+        }
+
+        setHover(index) {
+            if (index !== this.hoverIndex) {
+                this.hoverIndex = index;
+                this.draw();
+            }
+        }
+    }
+
+    window.PieChart = PieChart;
+})();
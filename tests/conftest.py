@@ -0,0 +1,82 @@
+import os
+import sqlite3
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import database  # noqa: E402
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh, unsharded database in a temporary directory"""
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'test.db'))
+    monkeypatch.setattr(database, 'DB_SHARDING', 'none')
+    database.init_db()
+    yield database
+    database.get_pool().close()
+
+@pytest.fixture
+def client(db):
+    """A Flask test client bound to the ``db`` database"""
+    import app
+    app.app.config['TESTING'] = True
+    with app.app.test_client() as client:
+        yield client
+
+# Schema of the first release, before per-user storage and integer columns
+BASELINE_SCHEMA = '''
+    CREATE TABLE expenses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        amount REAL NOT NULL CHECK (amount > 0),
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_expenses_category ON expenses(category);
+    CREATE INDEX idx_expenses_date ON expenses(date);
+    CREATE TABLE budgets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        category TEXT UNIQUE NOT NULL,
+        limit_amount REAL NOT NULL CHECK (limit_amount >= 0),
+        spent_amount REAL DEFAULT 0 CHECK (spent_amount >= 0),
+        period TEXT DEFAULT 'monthly'
+    );
+    CREATE TABLE savings_goals (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        goal_name TEXT UNIQUE NOT NULL,
+        target_amount REAL NOT NULL CHECK (target_amount > 0),
+        current_savings REAL DEFAULT 0 CHECK (current_savings >= 0),
+        deadline DATE,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        message TEXT NOT NULL,
+        status TEXT DEFAULT 'unread' CHECK (status IN ('read', 'unread')),
+        type TEXT DEFAULT 'info' CHECK (type IN ('info', 'warning', 'alert')),
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+'''
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    """A baseline-schema database; call the fixture with seed SQL to load it and run init_db"""
+    path = str(tmp_path / 'baseline.db')
+    monkeypatch.setattr(database, 'DB_PATH', path)
+    monkeypatch.setattr(database, 'DB_SHARDING', 'none')
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.commit()
+
+    def upgrade(seed_sql=''):
+        conn.executescript(seed_sql)
+        conn.commit()
+        conn.close()
+        assert database.init_db()
+        return database
+
+    yield upgrade
+    conn.close()
+    database.get_pool().close()
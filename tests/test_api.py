@@ -0,0 +1,46 @@
+import pytest
+
+@pytest.mark.parametrize('query, limit, page', [
+    ('limit=0', 1, 1),
+    ('limit=-5&offset=-3', 1, 1),
+    ('limit=9999', 500, 1),
+    ('limit=2&offset=2', 2, 2),
+])
+def test_expenses_api_clamps_paging_values(client, db, query, limit, page):
+    with client.session_transaction() as session:
+        session['user_id'] = 'alice'
+    for n in range(3):
+        db.add_expense(10 + n, f'lunch {n}', 'food', user_id='alice')
+
+    response = client.get(f'/api/expenses?{query}')
+
+    assert response.status_code == 200
+    pagination = response.get_json()['pagination']
+    assert (pagination['limit'], pagination['page']) == (limit, page)
+    assert pagination['total'] == 3
+
+def test_get_all_expenses_rejects_out_of_range_paging(db):
+    with pytest.raises(ValueError, match='Invalid pagination'):
+        db.get_all_expenses(limit=0)
+    with pytest.raises(ValueError, match='Invalid pagination'):
+        db.get_all_expenses(offset=-1)
+
+def test_each_visitor_gets_their_own_session_user(client, db):
+    users = set()
+    for _ in range(2):
+        client.delete_cookie('session')
+        client.get('/')
+        with client.session_transaction() as session:
+            users.add(session['user_id'])
+
+    assert len(users) == 2
+    assert db.DEFAULT_USER_ID not in users
+
+def test_api_requests_without_a_session_do_not_share_the_default_user(client, db):
+    db.add_expense(25, 'default user lunch', 'food')
+
+    response = client.get('/api/expenses')
+
+    assert response.get_json()['expenses'] == []
+    with client.session_transaction() as session:
+        assert session['user_id'].startswith('user_')
@@ -0,0 +1,64 @@
+import pytest
+
+def test_builtin_categories_have_fixed_ids(db):
+    assert db.CATEGORY_IDS == {'food': 1, 'housing': 2, 'transport': 3, 'entertainment': 4,
+                               'shopping': 5, 'health': 6, 'other': 7}
+    assert db.categorize_expense('Dinner at a restaurant') == db.CATEGORY_IDS['food']
+    assert db.category_name(db.CATEGORY_IDS['health']) == 'health'
+
+def test_custom_categories_get_ids_from_the_custom_range(db):
+    db.add_expense(12, 'Dog food', 'pets')
+    db.add_expense(30, 'Night class', 'education')
+    db.add_expense(8, 'Treats', 'pets')
+
+    with db.db_connection() as conn:
+        ids = dict(conn.execute('SELECT name, id FROM categories WHERE id >= ?', (db.CUSTOM_CATEGORY_MIN_ID,)).fetchall())
+    assert ids == {'pets': db.CUSTOM_CATEGORY_MIN_ID, 'education': db.CUSTOM_CATEGORY_MIN_ID + 1}
+    assert db.category_name(ids['pets']) == 'pets'
+
+    page = db.get_all_expenses(category='pets')
+    assert [e['description'] for e in page['expenses']] == ['Treats', 'Dog food']
+    assert {e['category'] for e in page['expenses']} == {'pets'}
+
+def test_category_ids_resolve_and_unknown_ids_are_rejected(db):
+    db.add_expense(5, 'Gift wrap', 'gifts')
+    gifts = db.CUSTOM_CATEGORY_MIN_ID
+
+    expense_id = db.add_expense(15, 'Birthday card', gifts)
+    assert db.get_all_expenses(category='gifts')['expenses'][0]['id'] == expense_id
+
+    with pytest.raises(ValueError, match='Unknown category id'):
+        db.add_expense(5, 'Mystery', gifts + 1)
+
+def test_bulk_import_resolves_new_categories_once(db):
+    result = db.bulk_add_expenses([
+        {'amount': 4, 'description': 'Seeds', 'category': 'garden', 'date': '2024-05-01'},
+        {'amount': 6, 'description': 'Pots', 'category': 'garden', 'date': '2024-05-02'},
+    ])
+
+    assert result['inserted'] == 2
+    assert result['categories'] == {'garden': 10.0}
+    with db.db_connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM categories WHERE name = 'garden'").fetchone()[0] == 1
+
+def test_rename_keeps_expenses_attached(db):
+    db.add_expense(9, 'Vet visit', 'pets')
+
+    assert db.rename_category('pets', 'animals') == 1
+    assert db.get_all_expenses(category='animals')['expenses'][0]['category'] == 'animals'
+    assert db.get_all_expenses(category='pets')['expenses'] == []
+    with pytest.raises(ValueError, match='already exists'):
+        db.rename_category('animals', 'food')
+
+def test_baseline_custom_categories_are_migrated_to_ids(baseline_db):
+    db = baseline_db('''
+        INSERT INTO expenses (amount, description, category, date) VALUES
+            (20, 'Vet', 'pets', '2024-01-02'),
+            (15, 'Lunch', 'food', '2024-01-03');
+    ''')
+
+    with db.db_connection() as conn:
+        rows = dict(conn.execute('SELECT description, category_id FROM expenses').fetchall())
+    assert rows['Lunch'] == db.CATEGORY_IDS['food']
+    assert rows['Vet'] >= db.CUSTOM_CATEGORY_MIN_ID
+    assert db.category_name(rows['Vet']) == 'pets'
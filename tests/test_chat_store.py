@@ -0,0 +1,89 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import chat_store  # noqa: E402
+import database  # noqa: E402
+from chat_store import ChatHistoryStore, MemoryChatHistoryStore, SQLiteChatHistoryStore  # noqa: E402
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(chat_store.time, 'monotonic', fake)
+    return fake
+
+@pytest.fixture
+def sqlite_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'chat.db'))
+    monkeypatch.setattr(database, 'DB_SHARDING', 'none')
+    database.init_db()
+    yield
+    database.get_pool().close()
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        ChatHistoryStore()
+
+def test_memory_store_purges_idle_sessions_every_n_appends(clock):
+    store = MemoryChatHistoryStore(ttl=60, purge_every=4)
+    store.append('alice', 'user', 'hi')
+    store.append('alice', 'model', 'hello')
+    clock.now += 120
+
+    store.append('bob', 'user', 'hi')
+    assert store.stats()['users'] == 2  # alice is idle but not purged yet
+    store.append('bob', 'model', 'hello')
+    assert store.stats()['users'] == 1
+    assert store.get('bob')
+
+def test_memory_store_without_ttl_never_purges(clock):
+    store = MemoryChatHistoryStore(ttl=0, purge_every=1)
+    store.append('alice', 'user', 'hi')
+    clock.now += 10 ** 6
+    store.append('bob', 'user', 'hi')
+    assert store.purge_expired() == 0
+    assert store.stats()['users'] == 2
+
+def test_sqlite_store_purges_idle_histories_every_n_appends(sqlite_db):
+    store = SQLiteChatHistoryStore(ttl=60, purge_every=3)
+    store.append('alice', 'user', 'hi')
+    store.append('alice', 'model', 'hello')
+    with database.write_connection('alice') as conn:
+        conn.execute("UPDATE chat_messages SET created_at = datetime('now', '-1 hour') WHERE user_id = 'alice'")
+        conn.commit()
+
+    store.append('bob', 'user', 'hi')
+    assert store.get('alice') == []
+    assert store.get('bob') == [{'role': 'user', 'parts': ['hi']}]
+
+def test_sqlite_store_purge_on_append_only_sweeps_the_callers_shard(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'chat.db'))
+    monkeypatch.setattr(database, 'DB_SHARDING', 'user')
+    database.init_db()
+    try:
+        store = SQLiteChatHistoryStore(ttl=60, purge_every=1)
+        for user in ('alice', 'bob'):
+            store.append(user, 'user', 'hi')
+            with database.write_connection(user) as conn:
+                conn.execute("UPDATE chat_messages SET created_at = datetime('now', '-1 hour')")
+                conn.commit()
+
+        store.append('carol', 'user', 'hi')
+        assert store.get('alice') and store.get('bob')
+
+        # The maintenance sweep covers every shard
+        assert database.delete_chat_history(idle_seconds=60) == 2
+        assert store.get('alice') == [] and store.get('bob') == []
+        assert store.get('carol')
+    finally:
+        database.get_tenant_router().close()
+        database.get_pool().close()
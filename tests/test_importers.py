@@ -0,0 +1,52 @@
+import io
+
+import importers
+
+def csv_rows(text):
+    return list(importers.iter_csv_expenses(io.BytesIO(text.encode('utf-8'))))
+
+def spending(rows):
+    return [(row['description'], row['amount']) for row in rows if not row['credit']]
+
+def test_positive_amounts_without_direction_are_spending():
+    rows = csv_rows("Date,Description,Amount\n2024-01-05,Groceries,42.10\n2024-01-06,Netflix,15.99\n")
+    assert spending(rows) == [('Groceries', 42.10), ('Netflix', 15.99)]
+
+def test_negative_amounts_elsewhere_make_positive_ones_credits():
+    rows = csv_rows("Date,Description,Amount\n2024-01-05,Salary,2500.00\n"
+                    "2024-01-06,Netflix,-15.99\n2024-01-07,Shop,(4.00)\n")
+    assert spending(rows) == [('Netflix', 15.99), ('Shop', 4.0)]
+    assert [row['description'] for row in rows if row['credit']] == ['Salary']
+
+def test_direction_column_marks_credits_and_is_not_a_category():
+    rows = csv_rows("Date,Description,Amount,Type\n2024-01-05,Salary,2500.00,CREDIT\n"
+                    "2024-01-06,Netflix,27.99,DEBIT\n")
+    assert spending(rows) == [('Netflix', 27.99)]
+    assert all(row['category'] is None for row in rows)
+
+def test_separate_credit_column():
+    rows = csv_rows("Date,Description,Debit,Credit\n2024-01-05,Salary,,2500.00\n"
+                    "2024-01-06,Gym,30.00,0.00\n")
+    assert spending(rows) == [('Gym', 30.0)]
+
+def test_unparseable_dates_are_passed_through_for_validation():
+    rows = csv_rows("Date,Description,Amount\n13/45/2024,Coffee,3.50\n01/02/2024,Tea,2.00\n")
+    assert [row['date'] for row in rows] == ['13/45/2024', '2024-01-02']
+
+def test_ofx_marks_positive_amounts_as_credits():
+    ofx = (b"<OFX><STMTTRN><TRNAMT>-12.00<DTPOSTED>20240101<NAME>Lunch</STMTTRN>"
+           b"<STMTTRN><TRNAMT>100.00<DTPOSTED>20240102<NAME>Refund</STMTTRN></OFX>")
+    rows = list(importers.iter_ofx_expenses(io.BytesIO(ofx)))
+    assert [(row['description'], row['amount'], row['credit']) for row in rows] == [
+        ('Lunch', 12.0, False), ('Refund', 100.0, True)]
+
+def test_bulk_import_counts_credits_and_bad_dates_as_skipped(db):
+    rows = csv_rows("Date,Description,Amount,Type\n2024-01-05,Salary,2500.00,CREDIT\n"
+                    "2024-01-06,Netflix,27.99,DEBIT\n13/45/2024,Coffee,3.50,DEBIT\n")
+    result = db.bulk_add_expenses(rows)
+
+    assert result['inserted'] == 1
+    assert result['skipped'] == 2
+    assert result['credits'] == 1
+    assert result['errors'] == [{'row': 3, 'error': "Invalid date: '13/45/2024'"}]
+    assert result['categories'] == {'entertainment': 27.99}
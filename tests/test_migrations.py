@@ -0,0 +1,70 @@
+import time
+
+import pytest
+
+SEED = '''
+    INSERT INTO expenses (amount, description, category, date) VALUES
+        (12.5, 'Lunch', 'food', '2024-03-10 00:00:00'),
+        (40.0, 'Train pass', 'transport', '2024-03-10 23:59:59'),
+        (9.99, 'Museum', 'entertainment', 'not a date');
+    INSERT INTO budgets (category, limit_amount) VALUES ('food', 500), ('transport', 300);
+    INSERT INTO notifications (message, status, created_at) VALUES
+        ('Budget warning', 'unread', '2024-03-10 12:00:00');
+'''
+
+@pytest.fixture
+def local_timezone(monkeypatch):
+    """Run under a timezone with DST, switching on 2024-03-10"""
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+def test_baseline_database_is_upgraded_to_the_current_schema(baseline_db):
+    db = baseline_db(SEED)
+
+    assert db.get_schema_version() == db.SCHEMA_VERSION
+    with db.db_connection() as conn:
+        types = {row[0]: row[1] for row in conn.execute("SELECT name, type FROM pragma_table_info('expenses')")}
+        assert (types['date'], types['amount'], types['category_id']) == ('INTEGER', 'INTEGER', 'INTEGER')
+        assert conn.execute("SELECT name FROM sqlite_master WHERE name LIKE '%_legacy'").fetchall() == []
+        assert [row[0] for row in conn.execute('SELECT DISTINCT user_id FROM expenses')] == [db.DEFAULT_USER_ID]
+
+    assert len(db.get_all_expenses()['expenses']) == 3
+    assert db.get_notifications()[0]['message'] == 'Budget warning'
+
+    # Upgrading an up-to-date database is a no-op
+    assert db.init_db()
+    assert db.get_all_expenses()['pagination']['total'] == 3
+
+def test_text_dates_become_wall_clock_epochs(baseline_db):
+    db = baseline_db(SEED)
+
+    expenses = {e['description']: e for e in db.get_all_expenses()['expenses']}
+    assert expenses['Lunch']['timestamp'] == db.to_epoch('2024-03-10')
+    assert expenses['Lunch']['date'] == '2024-03-10 00:00:00'
+    assert expenses['Train pass']['date'] == '2024-03-10 23:59:59'
+    # Unparseable legacy dates fall back to the migration time
+    assert abs(expenses['Museum']['timestamp'] - time.time()) < 24 * 3600
+
+    with db.db_connection() as conn:
+        created_at = conn.execute('SELECT created_at FROM notifications').fetchone()[0]
+    assert created_at == db.to_epoch('2024-03-10 12:00:00')
+
+@pytest.mark.skipif(not hasattr(time, 'tzset'), reason='needs time.tzset')
+def test_local_midnight_on_a_dst_change_stays_on_its_day(db, local_timezone):
+    midnight = db.to_epoch('2024-03-10')
+    assert midnight % db.SECONDS_PER_DAY == 0
+    assert db.to_epoch('2024-03-11') - midnight == db.SECONDS_PER_DAY  # no 23-hour day
+    assert db.format_epoch(midnight) == '2024-03-10 00:00:00'
+
+    db.add_expense(10, 'Breakfast', 'food', date='2024-03-10 00:00:00')
+    db.add_expense(20, 'Late dinner', 'food', date='2024-03-10 23:59:59')
+    db.add_expense(30, 'Next day', 'food', date='2024-03-11 00:00:00')
+
+    page = db.get_all_expenses(date_from='2024-03-10', date_to='2024-03-10 23:59:59')
+    assert [e['description'] for e in page['expenses']] == ['Late dinner', 'Breakfast']
+    with db.db_connection() as conn:
+        days = conn.execute('SELECT day, total_amount FROM expense_daily_rollup ORDER BY day').fetchall()
+    assert [tuple(row) for row in days] == [('2024-03-10', 3000), ('2024-03-11', 3000)]
@@ -0,0 +1,57 @@
+import pytest
+
+@pytest.mark.parametrize('amount, cents', [
+    (0.1 + 0.2, 30),
+    ('19.99', 1999),
+    (1.005, 101),  # half up, not the binary float's 1.00499...
+    (-0.1 - 0.2, -30),
+    ('-12.345', -1235),  # half away from zero
+    (' 7 ', 700),
+])
+def test_to_cents_rounds_decimal_half_up(db, amount, cents):
+    assert db.to_cents(amount) == cents
+
+@pytest.mark.parametrize('amount', ['abc', '', None, float('nan'), float('inf')])
+def test_to_cents_rejects_non_numbers(db, amount):
+    with pytest.raises(ValueError, match='Invalid amount'):
+        db.to_cents(amount)
+
+@pytest.mark.parametrize('cents, dollars, text', [
+    (30, 0.3, '0.30'),
+    (50000, 500.0, '500'),
+    (-1250, -12.5, '-12.50'),
+    (-50000, -500.0, '-500'),
+])
+def test_cents_round_trip_to_dollars(db, cents, dollars, text):
+    assert db.to_dollars(cents) == dollars
+    assert db.format_dollars(cents) == text
+    assert db.to_cents(db.to_dollars(cents)) == cents
+
+def test_totals_of_float_amounts_are_exact(db):
+    for _ in range(10):
+        db.add_expense(0.1, 'coffee', 'food')
+
+    assert db.get_expenses_summary()['total_expenses'] == 1.0
+    food = next(c for c in db.get_budget_overview()['categories'] if c['category'] == 'food')
+    assert (food['spent'], food['remaining']) == (1.0, 499.0)
+
+def test_negative_and_zero_expenses_are_rejected(db):
+    for amount in (-5, -0.001, 0, 0.004):
+        with pytest.raises(ValueError, match='positive'):
+            db.add_expense(amount, 'refund', 'food')
+
+def test_baseline_real_amounts_become_cents(baseline_db):
+    db = baseline_db('''
+        INSERT INTO expenses (amount, description, category, date) VALUES
+            (0.1 + 0.2, 'Gum', 'food', '2024-01-02'),
+            (19.99, 'Book', 'shopping', '2024-01-03');
+        INSERT INTO budgets (category, limit_amount) VALUES ('food', 450.5);
+    ''')
+
+    with db.db_connection() as conn:
+        amounts = [row[0] for row in conn.execute('SELECT amount FROM expenses ORDER BY id')]
+        limit = conn.execute("SELECT limit_amount FROM budgets WHERE category_id = ?",
+                             (db.CATEGORY_IDS['food'],)).fetchone()[0]
+    assert amounts == [30, 1999]
+    assert limit == 45050
+    assert db.get_expenses_summary()['total_expenses'] == 20.29
@@ -0,0 +1,46 @@
+import time
+
+import database
+
+def _old_notification(user_id, status):
+    with database.write_connection(user_id) as conn:
+        cursor = conn.execute('''
+            INSERT INTO notifications (user_id, message, status, type, created_at)
+            VALUES (?, 'Budget exceeded', ?, 'warning', ?)
+        ''', (user_id, status, int(time.time()) - 90 * database.SECONDS_PER_DAY))
+        conn.commit()
+        return cursor.lastrowid
+
+def _archived(user_id):
+    with database.db_connection(user_id) as conn:
+        return conn.execute('SELECT COUNT(*) FROM notifications_archive WHERE user_id = ?', (user_id,)).fetchone()[0]
+
+def test_marking_read_only_compacts_the_callers_shard(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'notify.db'))
+    monkeypatch.setattr(database, 'DB_SHARDING', 'user')
+    monkeypatch.setattr(database, '_notification_compactions', database.OrderedDict())
+    database.init_db()
+    try:
+        _old_notification('alice', 'read')
+        bob_id = _old_notification('bob', 'unread')
+
+        database.mark_notification_read(bob_id, user_id='bob')
+        assert _archived('bob') == 1
+        assert _archived('alice') == 0
+
+        # The maintenance command still sweeps every shard
+        assert database.compact_notifications() == {'archived': 1, 'dropped': 0}
+        assert _archived('alice') == 1
+    finally:
+        database.get_tenant_router().close()
+        database.get_pool().close()
+
+def test_compaction_runs_once_per_interval_per_database(db, monkeypatch):
+    monkeypatch.setattr(database, '_notification_compactions', database.OrderedDict())
+    calls = []
+    monkeypatch.setattr(database, 'compact_notifications', lambda **kwargs: calls.append(kwargs))
+
+    database._maybe_compact_notifications('alice')
+    database._maybe_compact_notifications('bob')
+
+    assert calls == [{'shard_of': 'alice'}]
@@ -0,0 +1,63 @@
+import pytest
+
+def _add_same_day(db, count, date='2024-03-01', category='food'):
+    """Add ``count`` expenses sharing one timestamp so only the id breaks ties"""
+    return [db.add_expense(1 + n, f'{category} {n}', category, date=date) for n in range(count)]
+
+def _walk(db, limit, **filters):
+    """Follow next_cursor from the first page to the last, collecting ids"""
+    page = db.get_all_expenses(limit=limit, **filters)
+    seen = [expense['id'] for expense in page['expenses']]
+    while page['pagination']['next_cursor']:
+        page = db.get_all_expenses(limit=limit, cursor=page['pagination']['next_cursor'], **filters)
+        seen.extend(expense['id'] for expense in page['expenses'])
+    return seen
+
+def test_cursor_round_trips_and_rejects_garbage(db):
+    cursor = db.encode_cursor('prev', 1709251200, 42)
+    assert '=' not in cursor
+    assert db.decode_cursor(cursor) == ('prev', 1709251200, 42)
+
+    for bad in ('not-a-cursor', db.encode_cursor('sideways', 1, 1), ''):
+        with pytest.raises(ValueError, match='Invalid pagination cursor'):
+            db.decode_cursor(bad)
+
+def test_paging_through_a_shared_date_has_no_duplicates_or_gaps(db):
+    ids = _add_same_day(db, 7)
+    db.add_expense(5, 'later', 'food', date='2024-03-02')
+    db.add_expense(5, 'earlier', 'food', date='2024-02-28')
+
+    seen = _walk(db, limit=3)
+
+    assert len(seen) == len(set(seen)) == 9
+    assert seen[1:8] == sorted(ids, reverse=True)
+
+def test_next_cursor_at_a_date_tie_continues_below_the_boundary_id(db):
+    ids = _add_same_day(db, 4)
+
+    first = db.get_all_expenses(limit=2)
+    assert [e['id'] for e in first['expenses']] == [ids[3], ids[2]]
+    second = db.get_all_expenses(limit=2, cursor=first['pagination']['next_cursor'])
+    assert [e['id'] for e in second['expenses']] == [ids[1], ids[0]]
+    assert second['pagination']['next_cursor'] is None
+
+    back = db.get_all_expenses(limit=2, cursor=second['pagination']['prev_cursor'])
+    assert [e['id'] for e in back['expenses']] == [ids[3], ids[2]]
+
+def test_cursor_respects_the_category_filter(db):
+    food = _add_same_day(db, 5, category='food')
+    _add_same_day(db, 5, category='transport')
+
+    seen = _walk(db, limit=2, category='food')
+
+    assert seen == sorted(food, reverse=True)
+
+def test_cursor_takes_precedence_over_offset(db):
+    ids = _add_same_day(db, 6)
+    first = db.get_all_expenses(limit=2)
+
+    page = db.get_all_expenses(limit=2, offset=4, cursor=first['pagination']['next_cursor'])
+
+    assert [e['id'] for e in page['expenses']] == [ids[3], ids[2]]
+    assert page['pagination']['page'] is None
+    assert page['pagination']['prev_cursor'] is not None
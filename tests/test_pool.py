@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+from database import ConnectionPool, sqlite3
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=2, max_open=2, acquire_timeout=0.2)
+    yield pool
+    pool.close()
+
+def test_released_connection_is_reused_by_the_same_thread(pool):
+    first = pool.acquire()
+    second = pool.acquire()
+    pool.release(second)
+    pool.release(first)
+
+    assert pool.acquire() is first
+    assert pool.stats()['hits'] == 1
+
+def test_acquire_times_out_when_every_connection_is_checked_out(pool):
+    held = [pool.acquire(), pool.acquire()]
+
+    started = time.monotonic()
+    with pytest.raises(sqlite3.OperationalError, match='No database connection available'):
+        pool.acquire()
+    assert time.monotonic() - started >= 0.2
+    assert pool.stats()['timeouts'] == 1
+    assert pool.stats()['open'] == 2
+
+    for conn in held:
+        pool.release(conn)
+
+def test_waiting_acquire_gets_the_released_connection(pool):
+    held = [pool.acquire(), pool.acquire()]
+    pool.acquire_timeout = 5
+    acquired = []
+    waiter = threading.Thread(target=lambda: acquired.append(pool.acquire()))
+    waiter.start()
+    time.sleep(0.05)
+
+    pool.release(held[0])
+    waiter.join(timeout=5)
+    assert acquired == [held[0]]
+    assert pool.stats()['waits'] == 1
+
+def test_connections_beyond_max_size_are_closed_on_release(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'), max_size=1, max_open=3)
+    conns = [pool.acquire() for _ in range(3)]
+    for conn in conns:
+        pool.release(conn)
+
+    stats = pool.stats()
+    assert stats['idle'] == 1
+    assert stats['open'] == 1
+    with pytest.raises(sqlite3.ProgrammingError):
+        conns[1].execute('SELECT 1')
+    pool.close()
+
+def test_broken_idle_connection_is_replaced(pool):
+    conn = pool.acquire()
+    pool.release(conn)
+    # Connections idle past health_check_after are probed before reuse
+    pool.health_check_after = 0
+    conn.close()
+    time.sleep(0.01)
+
+    replacement = pool.acquire()
+    assert replacement is not conn
+    assert replacement.execute('SELECT 1').fetchone()[0] == 1
+    stats = pool.stats()
+    assert stats['discarded'] == 1
+    assert stats['open'] == 1
+    pool.release(replacement)
+
+def test_recently_used_connection_is_not_probed(pool, monkeypatch):
+    conn = pool.acquire()
+    pool.release(conn)
+    probes = []
+    monkeypatch.setattr(pool, '_is_healthy', lambda c: probes.append(c) or True)
+
+    assert pool.acquire() is conn
+    assert probes == []
@@ -0,0 +1,33 @@
+import time
+
+from llm_client import ResponseCache
+from metrics import REGISTRY
+
+def test_response_cache_hit_rate_is_exported(db):
+    cache = ResponseCache('metrics_test')
+    cache.get_or_generate('prompt', lambda contents: 'answer')
+    cache.get_or_generate('prompt', lambda contents: 'other answer')
+
+    rendered = REGISTRY.render()
+    assert 'aiwealth_llm_response_cache_requests_total{namespace="metrics_test",outcome="hits"} 1' in rendered
+    assert 'aiwealth_llm_response_cache_hit_ratio{namespace="metrics_test"} 0.5' in rendered
+
+def test_buffered_hits_of_evicted_entries_are_dropped(db):
+    db.store_cached_response('a', 'first', ttl=60, max_entries=1)
+    assert db.get_cached_response('a', ttl=60) == 'first'
+    assert 'a' in db._pending_cache_hits
+
+    db.store_cached_response('b', 'second', ttl=60, max_entries=1)
+
+    assert 'a' not in db._pending_cache_hits
+    assert db.get_cached_response('a', ttl=60) is None
+
+def test_buffered_hits_of_expired_entries_are_dropped_on_read(db):
+    db.store_cached_response('a', 'first', ttl=60, max_entries=10)
+    assert db.get_cached_response('a', ttl=60) == 'first'
+    with db.write_connection() as conn:
+        conn.execute('UPDATE llm_response_cache SET created_at = ?', (time.time() - 120,))
+        conn.commit()
+
+    assert db.get_cached_response('a', ttl=60) is None
+    assert db._pending_cache_hits == {}
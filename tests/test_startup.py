@@ -0,0 +1,21 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+import bench_startup  # noqa: E402
+
+# Heavy modules app.py only needs once a request asks for them
+DEFERRED_MODULES = bench_startup.LAZY_MODULES + ('importers',)
+
+def test_app_import_defers_heavy_modules_and_fits_the_budget(tmp_path):
+    db_path = str(tmp_path / 'startup.db')
+    bench_startup.profile_imports('app', db_path)  # cold start creates the schema
+    entries = bench_startup.profile_imports('app', db_path)
+
+    imported = {name for _, name, _ in entries}
+    assert 'app' in imported
+    assert [name for name in DEFERRED_MODULES if name in imported] == []
+
+    total_ms = sum(cumulative for cumulative, _, depth in entries if depth == 0) / 1000
+    assert total_ms <= bench_startup.DEFAULT_BUDGET_MS
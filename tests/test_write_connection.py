@@ -0,0 +1,40 @@
+import threading
+
+def test_concurrent_writers_never_see_database_locked(db):
+    errors = []
+    threads_count, writes = 12, 25
+
+    def writer(index):
+        try:
+            for n in range(writes):
+                db.add_expense(1 + n, f'writer {index} expense {n}', 'food', user_id=f'user{index % 3}')
+        except Exception as e:  # noqa: BLE001 - collected and asserted below
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(threads_count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with db.db_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM expenses').fetchone()[0] == threads_count * writes
+
+def test_write_connection_runs_in_an_immediate_transaction(db):
+    with db.write_connection() as conn:
+        assert conn.in_transaction
+        conn.execute("INSERT INTO notifications (user_id, message, status, type) VALUES ('u', 'm', 'unread', 'info')")
+        # Left uncommitted: released connections are rolled back
+
+    with db.db_connection() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM notifications').fetchone()[0] == 0
+
+def test_readers_proceed_while_a_writer_holds_the_lock(db):
+    db.add_expense(5, 'coffee', 'food')
+    with db.write_connection() as conn:
+        conn.execute("UPDATE expenses SET description = 'tea'")
+        # WAL lets a reader see the last committed state without waiting
+        expenses = db.get_all_expenses()['expenses']
+        assert [expense['description'] for expense in expenses] == ['coffee']
+        conn.commit()